@@ -2,65 +2,165 @@
 Module used to:
 1. Collect the latencies from the provided logs,
 2. generates a graph for the top N latencies against time
+3. generates a graph of the p50/p90/p99/p999 latencies per time bucket
 
-The input file is a modified file, which contains  latencies are grepped from ceph OSD log for faster run.
+The logs are streamed line by line, so a full ceph OSD log with debug_osd=20 can be
+provided as is, though grepping the latencies first reduces the run time
 -> grep -a dequeue_op.*latency ceph-osd.log > latencies.log
-( Performed to reduce run time, since lots of logging would be generated )
+Logs of many OSDs are analysed in parallel and their results merged.
 
 NOTE : The debug levels for the OSD for the latencies to be captured,
         the Param: debug_osd needs to be set to 20 globally
 """
 
+import heapq
+import os
 import re
-import sys
-from datetime import datetime
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 
+import numpy as np
 import openpyxl
 from docopt import docopt
 from openpyxl.chart import LineChart, Reference
 
 doc = """
 Usage:
-  generate_latency_graph.py --latencies-log <file_name> [--num-ops <ops>]
+  generate_latency_graph.py (--latencies-log <file_name>)... [--num-ops <ops>] [--bucket-secs <secs>] [--workers <num>] [--output <name>]
 
 Options:
   --latencies-log <name>                Name of the file, where the latencies are grepped from ceph OSD log
                                         -> grep -a dequeue_op.*latency ceph-osd.log > latencies.log
-  ----num-ops <num>                     Top N latencies to be collected for the graph
+                                        can be given once per OSD log
+  --num-ops <num>                       Top N latencies to be collected for the graph [default: 10000]
+  --bucket-secs <secs>                  Time bucket for the latency percentiles [default: 60]
+  --workers <num>                       Logs analysed in parallel [default: 4]
+  --output <name>                       Name of the xlsx file, defaults to <first log>.xlsx
 """
 
+LATENCY = re.compile(rb"dequeue_op.* latency (\d+\.\d+)")
+PERCENTILES = (50, 90, 99, 99.9)
 
-class Op(object):
-    def __init__(self, line):
-        self.lat = float(re.search(r"latency (\d+.\\d+)", line).group(1))
-        self.line = line
-        time_format = "%Y-%m-%d %H:%M:%S.%f"
-        self.time = datetime.strptime(line[:23], time_format)
 
+@lru_cache(maxsize=64)
+def day_start(date):
+    """
+    Epoch of the start of a day, ex: b"2023-05-10", cached as a log spans few days
+    """
+    return (
+        datetime.strptime(date.decode(), "%Y-%m-%d")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
 
-def run(args):
-    logfile = args["--latencies-log"]
-    num_ops = int(args.get("--num-ops", 10000))
-    ops = []
-    top_ops = []
-
-    with open(logfile) as f:
-        for line in f.readlines():
-            ops.append(Op(line))
-    ops.sort(key=lambda x: x.time)
-    print(f"{num_ops} longest requests:")
-    for i in range(min(num_ops, len(ops))):
-        top_ops.append((ops[i].lat, ops[i].time, ops[i].line))
-    top_ops.sort(key=lambda x: x[1])
+
+def parse_time(line):
+    """
+    Epoch of the fixed format timestamp starting a log line, with milliseconds,
+    ex: 2023-05-10 10:04:13.123 or 2023-05-10T10:04:13.123+0000
+    """
+    return (
+        day_start(line[:10])
+        + int(line[11:13]) * 3600
+        + int(line[14:16]) * 60
+        + float(line[17:23])
+    )
+
+
+def format_time(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime(
+        "%Y-%m-%d %H:%M:%S.%f"
+    )[:23]
+
+
+class LogStats(object):
+    """
+    Latencies of one or more logs: the top N ops in a bounded heap and every
+    latency in a float array per time bucket
+    """
+
+    def __init__(self, num_ops, bucket_secs):
+        self.num_ops = num_ops
+        self.bucket_secs = bucket_secs
+        self.top = []
+        self.buckets = {}
+        self.count = 0
+        self.first = None
+        self.last = None
+
+    def add(self, lat, time, line):
+        self.count += 1
+        if self.first is None or time < self.first:
+            self.first = time
+        if self.last is None or time > self.last:
+            self.last = time
+        bucket = int(time // self.bucket_secs) * self.bucket_secs
+        if bucket not in self.buckets:
+            self.buckets[bucket] = array("f")
+        self.buckets[bucket].append(lat)
+        if len(self.top) < self.num_ops:
+            heapq.heappush(self.top, (lat, time, line))
+        elif lat > self.top[0][0]:
+            heapq.heapreplace(self.top, (lat, time, line))
+
+    def merge(self, other):
+        self.count += other.count
+        for time in (other.first, other.last):
+            if time is not None:
+                self.first = time if self.first is None else min(self.first, time)
+                self.last = time if self.last is None else max(self.last, time)
+        for bucket, lats in other.buckets.items():
+            self.buckets.setdefault(bucket, array("f")).extend(lats)
+        self.top = heapq.nlargest(self.num_ops, self.top + other.top)
+        heapq.heapify(self.top)
+
+    def percentiles(self):
+        """
+        Returns [(bucket start, ops, p50, p90, p99, p999)] in time order
+        """
+        rows = []
+        for bucket in sorted(self.buckets):
+            lats = np.frombuffer(self.buckets[bucket], dtype=np.float32)
+            values = np.percentile(lats, PERCENTILES)
+            rows.append((bucket, len(lats)) + tuple(float(v) for v in values))
+        return rows
+
+
+def analyse_log(logfile, num_ops, bucket_secs):
+    stats = LogStats(num_ops, bucket_secs)
+    with open(logfile, "rb") as f:
+        for line in f:
+            match = LATENCY.search(line)
+            if not match:
+                continue
+            try:
+                time = parse_time(line)
+            except ValueError:
+                # line without a timestamp, ex: a truncated line
+                continue
+            stats.add(float(match.group(1)), time, line)
+    # decode the kept lines only
+    stats.top = [
+        (lat, time, line.decode(errors="replace")) for lat, time, line in stats.top
+    ]
+    print(f"{logfile}: {stats.count} ops")
+    return stats
+
+
+def write_workbook(stats, fname):
+    top_ops = sorted(stats.top, key=lambda x: x[1])
     # Creating workbook and adding data to it
     wb = openpyxl.Workbook()
     sheet = wb.active
-    text = f"Operations from Timestamp :{ops[0].time} - {ops[-1].time}"
+    sheet.title = "top latencies"
+    text = f"Operations from Timestamp :{format_time(stats.first)} - {format_time(stats.last)}"
     sheet.append([text])
     for val in top_ops:
-        sheet.append([val[0], val[1]])
+        sheet.append([val[0], format_time(val[1])])
 
-    max_row = sheet.max_row  # if sheet.max_row < 100 else 100
+    max_row = sheet.max_row
     values = Reference(sheet, min_col=1, min_row=2, max_col=1, max_row=max_row)
     # Create object of LineChart class
     chart = LineChart()
@@ -71,10 +171,51 @@ def run(args):
     chart.y_axis.title = " Time in sec "
     sheet.add_chart(chart, "E2")
 
-    # save the file
-    fname = f"{sys.argv[1]}.xlsx"
+    sheet = wb.create_sheet("percentiles")
+    sheet.append(["time", "ops", "p50", "p90", "p99", "p999"])
+    for row in stats.percentiles():
+        sheet.append([format_time(row[0])] + list(row[1:]))
+    values = Reference(sheet, min_col=3, min_row=1, max_col=6, max_row=sheet.max_row)
+    times = Reference(sheet, min_col=1, min_row=2, max_row=sheet.max_row)
+    chart = LineChart()
+    chart.add_data(values, titles_from_data=True)
+    chart.set_categories(times)
+    chart.title = f" Latency percentiles per {stats.bucket_secs} secs"
+    chart.x_axis.title = " Time progression ----> "
+    chart.y_axis.title = " Time in sec "
+    sheet.add_chart(chart, "H2")
+
     wb.save(fname)
-    print("Done!")
+
+
+def run(args):
+    logfiles = args["--latencies-log"]
+    num_ops = int(args["--num-ops"])
+    bucket_secs = int(args["--bucket-secs"])
+    workers = min(int(args["--workers"]), len(logfiles))
+    stats = LogStats(num_ops, bucket_secs)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(analyse_log, logfile, num_ops, bucket_secs)
+            for logfile in logfiles
+        ]
+        for future in futures:
+            stats.merge(future.result())
+    if not stats.count:
+        raise Exception(f"no latencies found in {logfiles}")
+
+    print(f"{min(num_ops, stats.count)} longest requests of {stats.count}:")
+    for lat, time, line in heapq.nlargest(10, stats.top):
+        print(line.rstrip())
+    print("Latency percentiles (secs): time, ops, p50, p90, p99, p999")
+    for row in stats.percentiles():
+        print(format_time(row[0]), *(round(v, 6) for v in row[1:]))
+
+    # save the file
+    fname = args["--output"] or f"{os.path.basename(logfiles[0])}.xlsx"
+    write_workbook(stats, fname)
+    print(f"Done! graphs written to {fname}")
 
 
 if __name__ == "__main__":
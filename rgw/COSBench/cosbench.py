@@ -2,12 +2,14 @@
 import argparse
 import json
 import logging
+import re
 import subprocess
 import sys
 from os.path import dirname, join
 from tempfile import NamedTemporaryFile
 from typing import Dict, Optional, Tuple
 
+import results
 from jinja2 import Template
 from yaml import safe_load
 
@@ -205,7 +207,40 @@ def submit_workload(config: argparse.Namespace) -> int:
     LOG.info("Preparing to submit workload.")
     data = generate_payload(config)
     workload = render_xml(data)
-    return exec_command(cmd=f"cd {APP_DIR} && ./cli.sh submit {workload}").returncode
+    proc = exec_command(cmd=f"cd {APP_DIR} && ./cli.sh submit {workload}")
+
+    # the controller replies with "Accepted with ID: w12"
+    match = re.search(r"ID:\s*(w\d+)", proc.stdout.decode())
+    if match:
+        LOG.info("Workload submitted with ID %s", match.group(1))
+    return proc.returncode
+
+
+def collect_results(config: argparse.Namespace) -> int:
+    """Collects the results of a completed workload and checks them against a baseline.
+
+    Args:
+        config:     CLI parameters passed for results subcommand.
+
+    Returns:
+        0 on Success else 1 on a performance regression
+    """
+    if config.workload.endswith(".csv"):
+        results_csv = config.workload
+    else:
+        results_csv = results.find_workload_csv(config.workload, f"{APP_DIR}/archive")
+
+    LOG.info("Collecting the results from %s", results_csv)
+    return results.gate(
+        results_csv,
+        config.baseline,
+        tolerance=config.tolerance,
+        tolerances={
+            metric: float(value)
+            for metric, value in (x.split("=") for x in config.metric_tolerance)
+        },
+        update_baseline=config.update_baseline,
+    )
 
 
 def run(config: argparse.Namespace) -> int:
@@ -227,6 +262,9 @@ def run(config: argparse.Namespace) -> int:
     if config.ops == "submit":
         return submit_workload(config)
 
+    if config.ops == "results":
+        return collect_results(config)
+
 
 def module_args() -> argparse.Namespace:
     """Specifies the arguments for the module."""
@@ -246,6 +284,36 @@ def module_args() -> argparse.Namespace:
     cancel_p = sub_p.add_parser("cancel", help="cancel a work in progress job.")
     cancel_p.add_argument("job_id", help="workload to be cancelled.")
 
+    # results options
+    results_p = sub_p.add_parser(
+        "results", help="compare the results of a workload with a baseline."
+    )
+    results_p.add_argument(
+        "workload", help="ID of the completed workload or path of its CSV."
+    )
+    results_p.add_argument(
+        "--baseline", required=True, help="Baseline results of the workload (json)."
+    )
+    results_p.add_argument(
+        "--tolerance",
+        type=float,
+        default=results.DEFAULT_TOLERANCE,
+        help="Allowed relative change of the metrics, ex: 0.1 for 10%%.",
+    )
+    results_p.add_argument(
+        "--metric-tolerance",
+        dest="metric_tolerance",
+        action="append",
+        default=list(),
+        help="Tolerance of a metric, ex: 99%%-ResTime=0.25. Can be repeated.",
+    )
+    results_p.add_argument(
+        "--update-baseline",
+        dest="update_baseline",
+        action="store_true",
+        help="Store the results as the new baseline.",
+    )
+
     return p.parse_args()
 
 
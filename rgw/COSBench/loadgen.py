@@ -0,0 +1,617 @@
+"""Native load generator for the COS Bench workload definitions.
+
+Runs the workloads of conf/*.yaml against RGW through S3 or Swift without a COS Bench
+controller. The workers of a stage are spread over processes, each running a thread
+per worker, and the results are reported with the COS Bench metrics: throughput
+(op/s), bandwidth, average and percentile response times and success ratio, per
+stage and operation.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import results
+from cosbench import get_s3_keys, get_swauth_secret, load_config
+
+LOG = logging.getLogger(__name__)
+
+# COS Bench uses decimal units for the object sizes
+UNITS = {"": 1, "B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+SELECTOR = re.compile(r"^\s*([cursh])\((.*)\)\s*([A-Za-z]*)\s*$")
+PERCENTILES = (60, 80, 90, 95, 99, 100)
+CSV_HEADER = (
+    ["Stage", "Op-Name", "Op-Type", "Op-Count", "Byte-Count", "Avg-ResTime"]
+    + ["Avg-ProcTime"]
+    + [f"{p}%-ResTime" for p in PERCENTILES]
+    + ["Throughput", "Bandwidth", "Succ-Ratio"]
+)
+MIXED_OPS = ("read", "write", "delete", "list")
+# a worker gives up after this many failed operations in a row
+MAX_CONSECUTIVE_FAILURES = 100
+
+
+class Selector:
+    """COS Bench value selector, ex: c(64)KB, u(1,100), r(1,5), s(1,5) or a histogram
+    h(1|1|50,64|64|50)KB of low|high|weight ranges.
+
+    Constant, uniform and histogram selectors are random, range and sequential ones
+    are split between the workers and iterated in order.
+    """
+
+    def __init__(self, expr: str):
+        match = SELECTOR.match(str(expr))
+        if not match:
+            raise ValueError(f"invalid selector: {expr}")
+
+        self.kind, args, unit = match.groups()
+        self.unit = UNITS[unit.upper()]
+        if self.kind == "h":
+            self.buckets = []
+            for bucket in args.split(","):
+                low, high, weight = (int(x) for x in bucket.split("|"))
+                self.buckets.append((low, high))
+            self.weights = [int(b.split("|")[2]) for b in args.split(",")]
+        else:
+            values = [int(x) for x in args.split(",")]
+            self.low, self.high = values[0], values[-1]
+
+    def values(self, worker: int, workers: int, rng: random.Random) -> Iterator[int]:
+        """Yields the values a worker uses, the range of r() and s() is partitioned.
+
+        Args:
+            worker (int):           index of the worker, from 0
+            workers (int):          number of workers of the stage
+            rng (random.Random):    random generator of the worker
+
+        Returns:
+            generator of values, endless for random selectors
+        """
+        if self.kind in ("r", "s"):
+            span = self.high - self.low + 1
+            start = self.low + span * worker // workers
+            end = self.low + span * (worker + 1) // workers
+            for value in range(start, end):
+                yield value * self.unit
+            return
+
+        while True:
+            if self.kind == "c":
+                yield self.low * self.unit
+            elif self.kind == "u":
+                yield rng.randint(self.low, self.high) * self.unit
+            else:
+                low, high = rng.choices(self.buckets, self.weights)[0]
+                yield rng.randint(low, high) * self.unit
+
+    @property
+    def bounded(self) -> bool:
+        return self.kind in ("r", "s")
+
+
+class S3Storage:
+    """S3 operations on a boto3 client, one per worker thread."""
+
+    def __init__(self, endpoint, access_key, secret_key, timeout=300, retry=3):
+        import boto3
+        from botocore.config import Config
+
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=Config(
+                s3={"addressing_style": "path"},
+                read_timeout=timeout,
+                retries={"max_attempts": retry},
+            ),
+        )
+
+    def create_container(self, container):
+        try:
+            self.client.create_bucket(Bucket=container)
+        except self.client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+    def delete_container(self, container):
+        self.client.delete_bucket(Bucket=container)
+
+    def write(self, container, name, data):
+        self.client.put_object(Bucket=container, Key=name, Body=data)
+
+    def read(self, container, name):
+        return len(self.client.get_object(Bucket=container, Key=name)["Body"].read())
+
+    def delete(self, container, name):
+        self.client.delete_object(Bucket=container, Key=name)
+
+    def list(self, container):
+        self.client.list_objects_v2(Bucket=container)
+
+
+class SwiftStorage:
+    """Swift operations on a swiftclient connection, one per worker thread."""
+
+    def __init__(self, auth_url, username, password, timeout=300, retry=3):
+        from swiftclient import client
+
+        self.conn = client.Connection(
+            authurl=auth_url,
+            user=username,
+            key=password,
+            retries=retry,
+            timeout=timeout,
+        )
+
+    def create_container(self, container):
+        self.conn.put_container(container)
+
+    def delete_container(self, container):
+        self.conn.delete_container(container)
+
+    def write(self, container, name, data):
+        self.conn.put_object(container, name, contents=data)
+
+    def read(self, container, name):
+        _, body = self.conn.get_object(container, name)
+        return len(body)
+
+    def delete(self, container, name):
+        self.conn.delete_object(container, name)
+
+    def list(self, container):
+        self.conn.get_container(container)
+
+
+def get_storage(storage: Dict):
+    """Returns the storage client for the settings made by storage_settings."""
+    if storage["type"] == "s3":
+        return S3Storage(
+            storage["endpoint"],
+            storage["access_key"],
+            storage["secret_key"],
+            storage["timeout"],
+            storage["retry"],
+        )
+
+    return SwiftStorage(
+        storage["auth_url"],
+        storage["username"],
+        storage["password"],
+        storage["timeout"],
+        storage["retry"],
+    )
+
+
+def storage_settings(conf: Dict, args: argparse.Namespace) -> Dict:
+    """Returns the picklable storage settings of the workload.
+
+    The credentials are those of cosbench01, as used for the COS Bench workloads,
+    unless given on the command line, ex: for a stand-in server.
+    """
+    storage = conf["workload"]["storage"]
+    config = storage.get("config", {})
+    # COS Bench timeouts are in milliseconds
+    settings = {
+        "type": args.storage or storage["type"],
+        "timeout": int(config.get("timeout", 300000)) / 1000,
+        "retry": int(config.get("retry", 3)),
+    }
+
+    if settings["type"] == "s3":
+        if args.access_key:
+            access_key, secret_key = args.access_key, args.secret_key
+        else:
+            access_key, secret_key = get_s3_keys()
+        settings.update(
+            endpoint=args.rgw_endpoint, access_key=access_key, secret_key=secret_key
+        )
+    else:
+        settings.update(
+            auth_url=f"{args.rgw_endpoint}/auth/v1.0",
+            username=args.username or "cosbench01:swift",
+            password=args.secret_key or get_swauth_secret(),
+        )
+
+    return settings
+
+
+class OpStats:
+    """Counters and response times of an operation."""
+
+    def __init__(self, op_type: str):
+        self.op_type = op_type
+        self.count = 0
+        self.failures = 0
+        self.bytes = 0
+        self.res_times = array("d")
+
+    def add(self, res_time: float, nbytes: int = 0, failed: bool = False):
+        if failed:
+            self.failures += 1
+            return
+
+        self.count += 1
+        self.bytes += nbytes
+        self.res_times.append(res_time)
+
+    def merge(self, other: "OpStats"):
+        self.count += other.count
+        self.failures += other.failures
+        self.bytes += other.bytes
+        self.res_times.extend(other.res_times)
+
+
+def merge_stats(results: List[Dict]) -> Dict:
+    merged = dict()
+    for stats in results:
+        for name, op_stats in stats.items():
+            if name not in merged:
+                merged[name] = OpStats(op_stats.op_type)
+            merged[name].merge(op_stats)
+
+    return merged
+
+
+class Worker:
+    """One COS Bench worker of a stage, running its operations until the stage ends."""
+
+    def __init__(self, stage: Dict, storage: Dict, index: int, deadline: float):
+        self.stage = stage
+        self.storage = get_storage(storage)
+        self.index = index
+        self.workers = int(stage.get("workers", 1))
+        self.deadline = deadline
+        self.rng = random.Random(f"{stage['name']}-{index}")
+        self.stats = dict()
+        # this worker's share of the stage totals
+        self.total_ops = self.share(stage.get("totalOps"))
+        self.total_bytes = self.share(stage.get("totalBytes"))
+        self.ops = 0
+        self.bytes = 0
+        self.consecutive_failures = 0
+
+    def share(self, total) -> Optional[int]:
+        if not total:
+            return None
+        return int(total) // self.workers + (self.index < int(total) % self.workers)
+
+    def done(self) -> bool:
+        return (
+            time.time() >= self.deadline
+            or (self.total_ops is not None and self.ops >= self.total_ops)
+            or (self.total_bytes is not None and self.bytes >= self.total_bytes)
+            or self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES
+        )
+
+    def selectors(self, config: Dict) -> Dict:
+        cprefix = config.get("cprefix", "mycontainers")
+        oprefix = config.get("oprefix", "myobjects")
+        rtn = {"cprefix": cprefix, "oprefix": oprefix}
+        for key in ("containers", "objects", "sizes"):
+            if key in config:
+                selector = Selector(config[key])
+                rtn[key] = selector
+                rtn[f"{key}_values"] = selector.values(
+                    self.index, self.workers, self.rng
+                )
+
+        return rtn
+
+    def timed(self, name: str, op_type: str, func, *args) -> bool:
+        """Runs one operation and records its response time and bytes.
+
+        Failed operations count toward the totalOps and totalBytes limits as
+        attempts, so that a failing stage without a runtime still ends.
+        """
+        stats = self.stats.setdefault(name, OpStats(op_type))
+        start = time.perf_counter()
+        self.ops += 1
+        try:
+            nbytes = func(*args) or 0
+        except Exception as err:  # noqa
+            LOG.debug("%s failed: %s", name, err)
+            stats.add(0, failed=True)
+            if op_type == "write":
+                self.bytes += len(args[-1])
+            self.consecutive_failures += 1
+            if self.consecutive_failures == MAX_CONSECUTIVE_FAILURES:
+                LOG.error(
+                    "worker %d of %s stopped after %d failures in a row, last: %s",
+                    self.index,
+                    self.stage["name"],
+                    self.consecutive_failures,
+                    err,
+                )
+            return False
+
+        if op_type == "write":
+            nbytes = len(args[-1])
+        stats.add(time.perf_counter() - start, nbytes)
+        self.bytes += nbytes
+        self.consecutive_failures = 0
+        return True
+
+    def run(self) -> Dict:
+        stage_type = self.stage.get("type", "normal")
+        if self.stage.get("operations"):
+            self.run_mixed()
+        elif stage_type in ("init", "dispose"):
+            self.run_containers(stage_type)
+        elif stage_type in ("prepare", "cleanup"):
+            self.run_objects(stage_type)
+        elif stage_type == "delay":
+            time.sleep(max(0, self.deadline - time.time()))
+        else:
+            raise ValueError(f"unsupported stage type: {stage_type}")
+
+        return self.stats
+
+    def run_containers(self, stage_type: str):
+        sel = self.selectors(self.stage.get("config", {}))
+        for container in sel["containers_values"]:
+            if self.done():
+                break
+
+            name = f"{sel['cprefix']}{container}"
+            if stage_type == "init":
+                self.timed("init", "init", self.storage.create_container, name)
+            else:
+                self.timed("dispose", "dispose", self.storage.delete_container, name)
+
+    def run_objects(self, stage_type: str):
+        config = self.stage.get("config", {})
+        sel = self.selectors(config)
+        if not sel["objects"].bounded:
+            raise ValueError(f"{stage_type} needs a r() or s() objects selector")
+
+        # every worker covers all containers with its part of the objects
+        containers = Selector(config["containers"]).values(0, 1, self.rng)
+        objects = list(sel["objects_values"])
+        for container in containers:
+            for obj in objects:
+                if self.done():
+                    return
+
+                args = (f"{sel['cprefix']}{container}", f"{sel['oprefix']}{obj}")
+                if stage_type == "prepare":
+                    data = bytes(next(sel["sizes_values"]))
+                    self.timed("prepare", "write", self.storage.write, *args, data)
+                else:
+                    self.timed("cleanup", "delete", self.storage.delete, *args)
+
+    def run_mixed(self):
+        operations = self.stage["operations"]
+        for op in operations:
+            if op["type"] not in MIXED_OPS:
+                raise ValueError(f"unsupported operation type: {op['type']}")
+
+        weights = [float(op.get("ratio", 100)) for op in operations]
+        selectors = [self.selectors(op.get("config", {})) for op in operations]
+        while not self.done():
+            index = self.rng.choices(range(len(operations)), weights)[0]
+            op, sel = operations[index], selectors[index]
+            name = op.get("name", op["type"])
+            try:
+                container = f"{sel['cprefix']}{next(sel['containers_values'])}"
+                if op["type"] == "list":
+                    self.timed(name, "list", self.storage.list, container)
+                    continue
+
+                args = (container, f"{sel['oprefix']}{next(sel['objects_values'])}")
+            except StopIteration:
+                # a sequential selector is exhausted
+                return
+
+            if op["type"] == "write":
+                data = bytes(next(sel["sizes_values"]))
+                self.timed(name, "write", self.storage.write, *args, data)
+            else:
+                self.timed(name, op["type"], getattr(self.storage, op["type"]), *args)
+
+
+def run_workers(stage: Dict, storage: Dict, indexes: List[int], deadline: float):
+    """Runs the given workers of a stage in threads and returns their merged stats."""
+
+    def run_one(index):
+        return Worker(stage, storage, index, deadline).run()
+
+    with ThreadPoolExecutor(max_workers=len(indexes)) as pool:
+        return merge_stats(list(pool.map(run_one, indexes)))
+
+
+def run_stage(stage: Dict, storage: Dict, processes: int, max_runtime=None) -> Dict:
+    """Executes a workflow stage.
+
+    Args:
+        stage (dict):       workflow entry of the workload configuration
+        storage (dict):     storage settings
+        processes (int):    processes to spread the workers over
+        max_runtime (int):  cap on the runtime of the stage, in seconds
+
+    Returns:
+        dict of operation name and OpStats, with the elapsed time under "elapsed"
+    """
+    workers = int(stage.get("workers", 1))
+    runtime = int(stage.get("runtime", 0)) or float("inf")
+    if max_runtime:
+        runtime = min(runtime, max_runtime)
+
+    processes = max(1, min(processes, workers))
+    groups = [list(range(workers))[p::processes] for p in range(processes)]
+    LOG.info(
+        "Running stage %s with %s workers in %s processes",
+        stage["name"],
+        workers,
+        processes,
+    )
+
+    start = time.time()
+    deadline = start + runtime
+    if processes == 1:
+        stats = run_workers(stage, storage, groups[0], deadline)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(run_workers, stage, storage, group, deadline)
+                for group in groups
+            ]
+            stats = merge_stats([f.result() for f in futures])
+
+    return {"ops": stats, "elapsed": time.time() - start}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, int(round(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def report(stage_name: str, result: Dict) -> List[Dict]:
+    """Returns the COS Bench metrics of a stage, one row per operation.
+
+    Response times are in milliseconds, throughput in op/s and bandwidth in B/s.
+    """
+    rows = list()
+    elapsed = result["elapsed"] or 1
+    for name, stats in result["ops"].items():
+        res_times = sorted(stats.res_times)
+        attempts = stats.count + stats.failures
+        avg = sum(res_times) / len(res_times) if res_times else 0
+        row = {
+            "Stage": stage_name,
+            "Op-Name": name,
+            "Op-Type": stats.op_type,
+            "Op-Count": stats.count,
+            "Byte-Count": stats.bytes,
+            "Avg-ResTime": round(avg * 1000, 2),
+            # the processing time of COS Bench excludes the transfer of the
+            # data, which is not measured apart here
+            "Avg-ProcTime": "N/A",
+        }
+        for pct in PERCENTILES:
+            row[f"{pct}%-ResTime"] = round(percentile(res_times, pct) * 1000, 2)
+        row["Throughput"] = round(stats.count / elapsed, 2)
+        row["Bandwidth"] = round(stats.bytes / elapsed, 2)
+        ratio = stats.count / attempts * 100 if attempts else 0
+        row["Succ-Ratio"] = f"{ratio:.2f}%"
+        rows.append(row)
+
+    return rows
+
+
+def write_report(rows: List[Dict], fname: str):
+    """Writes the rows as a COS Bench like workload CSV."""
+    with open(fname, "w", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=CSV_HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run(args: argparse.Namespace) -> int:
+    """Runs every stage of the workload and writes the report.
+
+    Returns:
+        0 if all operations succeeded else 1
+    """
+    conf = load_config(args.conf_file)
+    storage = storage_settings(conf, args)
+    name = conf["workload"].get("name", "workload")
+
+    rows = list()
+    for index, stage in enumerate(conf["workload"]["workflows"], start=1):
+        stage.setdefault("name", f"stage{index}")
+        result = run_stage(stage, storage, args.processes, args.max_runtime)
+        for row in report(stage["name"], result):
+            LOG.info(json.dumps(row))
+            rows.append(row)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    fname = os.path.join(args.output_dir, f"{name}-{int(time.time())}.csv")
+    write_report(rows, fname)
+    LOG.info("Workload report written to %s", fname)
+
+    if args.baseline and results.gate(fname, args.baseline, args.tolerance):
+        return 1
+
+    if any(row["Succ-Ratio"] != "100.00%" for row in rows):
+        return 1
+    return 0
+
+
+def module_args() -> argparse.Namespace:
+    """Specifies the arguments for the module."""
+    p = argparse.ArgumentParser(description="Native COS Bench workload runner.")
+    p.add_argument("conf_file", help="Workload configuration, in conf/.")
+    p.add_argument(
+        "--rgw-endpoint",
+        dest="rgw_endpoint",
+        required=True,
+        help="Endpoint against which workloads are executed.",
+    )
+    p.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes the workers of a stage are spread over.",
+    )
+    p.add_argument(
+        "--max-runtime",
+        dest="max_runtime",
+        type=int,
+        help="Cap on the runtime of each stage in seconds, ex: for a smoke run.",
+    )
+    p.add_argument(
+        "--storage",
+        choices=("s3", "swift"),
+        help="Storage API to use instead of the one of the workload.",
+    )
+    p.add_argument("--access-key", dest="access_key", help="S3 access key.")
+    p.add_argument(
+        "--secret-key", dest="secret_key", help="S3 secret key or swift password."
+    )
+    p.add_argument("--username", help="Swift user, defaults to cosbench01:swift.")
+    p.add_argument(
+        "--output-dir", dest="output_dir", default=".", help="Directory of the report."
+    )
+    p.add_argument(
+        "--baseline", help="Baseline results (json) to compare the report with."
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=results.DEFAULT_TOLERANCE,
+        help="Allowed relative change of the metrics compared with the baseline.",
+    )
+
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s : %(message)s", level=logging.INFO
+    )
+    args = module_args()
+    rc = 0
+
+    try:
+        rc = run(args)
+    except BaseException as be:  # noqa
+        LOG.exception("Got an exception")
+        sys.exit(1)
+
+    if rc != 0:
+        LOG.info("Execution completed with errors")
+        sys.exit(rc)
+
+    LOG.info("Execution completed successfully.")
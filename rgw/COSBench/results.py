@@ -0,0 +1,223 @@
+"""Module to collect COS Bench results and compare them with a baseline.
+
+The workload CSV of a run (archive/<id>-<name>/<id>-<name>.csv, or the report of
+loadgen.py) holds a row per stage and operation. It is stored in a compact columnar
+JSON, one list of values per metric, and compared with a baseline of the same
+workload to catch performance regressions.
+"""
+import csv
+import json
+import logging
+import os
+from glob import glob
+from typing import Dict, List, Optional
+
+LOG = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "/opt/cosbench/archive"
+KEY_COLUMNS = ("Stage", "Op-Name", "Op-Type")
+DEFAULT_TOLERANCE = 0.1
+
+# metrics compared with the baseline, True when higher is better
+HIGHER_IS_BETTER = {
+    "Throughput": True,
+    "Bandwidth": True,
+    "Succ-Ratio": True,
+    "Avg-ResTime": False,
+    "95%-ResTime": False,
+    "99%-ResTime": False,
+}
+# tolerance of the metrics not following the default one
+METRIC_TOLERANCE = {"Succ-Ratio": 0.01}
+
+
+def to_number(value: str):
+    """Converts a COS Bench CSV value to a number, ex: 99.5% -> 99.5 or N/A -> None."""
+    value = value.strip().rstrip("%")
+    if value in ("", "N/A", "NaN"):
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def find_workload_csv(workload_id: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Returns the workload CSV of a run in the controller's archive.
+
+    Args:
+        workload_id (str):  ID returned on submission, ex: w12
+        archive_dir (str):  archive directory of the controller
+
+    Returns:
+        path of the CSV
+    """
+    matches = glob(
+        os.path.join(archive_dir, f"{workload_id}-*", f"{workload_id}-*.csv")
+    )
+    # skip the per worker and per driver CSVs
+    matches = [
+        x
+        for x in matches
+        if os.path.basename(x)[:-4] == os.path.basename(os.path.dirname(x))
+    ]
+    if not matches:
+        raise FileNotFoundError(f"No results of {workload_id} under {archive_dir}")
+
+    return matches[0]
+
+
+def load_csv(path: str) -> Dict:
+    """Parses a workload CSV into columns.
+
+    Returns:
+        dict with the column names under "columns" and a list of values per column
+        under "data"
+    """
+    with open(path, newline="") as fh:
+        reader = csv.reader(fh)
+        columns = [x.strip() for x in next(reader)]
+        data = {x: list() for x in columns}
+        for row in reader:
+            if not any(row):
+                continue
+
+            for column, value in zip(columns, row):
+                if column in KEY_COLUMNS:
+                    data[column].append(value.strip())
+                else:
+                    data[column].append(to_number(value))
+
+    return {"columns": columns, "data": data}
+
+
+def load_stage_csv(path: str) -> Dict:
+    """Parses a stage CSV (archive/<run>/s1-<stage>.csv), a time series with a
+    metric header row and an operation header row.
+
+    Returns:
+        dict of "<metric>/<op>" columns and their values, ex: "Throughput/write"
+    """
+    with open(path, newline="") as fh:
+        reader = csv.reader(fh)
+        metrics, ops = next(reader), next(reader)
+        columns, metric = list(), ""
+        for name, op in zip(metrics, ops):
+            # a metric name spans the columns of its operations
+            metric = name.strip() or metric
+            columns.append(f"{metric}/{op.strip()}" if op.strip() else metric)
+
+        data = {x: list() for x in columns}
+        for row in reader:
+            for column, value in zip(columns, row):
+                data[column].append(to_number(value))
+
+    return {"columns": columns, "data": data}
+
+
+def rows(results: Dict) -> Dict:
+    """Returns the metrics of the results per (stage, op name, op type)."""
+    data = results["data"]
+    count = len(data[KEY_COLUMNS[0]])
+    rtn = dict()
+    for i in range(count):
+        key = tuple(data[x][i] for x in KEY_COLUMNS)
+        rtn[key] = {x: data[x][i] for x in results["columns"] if x not in KEY_COLUMNS}
+
+    return rtn
+
+
+def save(results: Dict, path: str):
+    """Saves the columnar results as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(results, fh)
+    LOG.info("Results saved to %s", path)
+
+
+def load(path: str) -> Dict:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(
+    results: Dict,
+    baseline: Dict,
+    tolerance: float = DEFAULT_TOLERANCE,
+    tolerances: Optional[Dict] = None,
+) -> List[str]:
+    """Compares the results with a baseline of the same workload.
+
+    Args:
+        results (dict):     columnar results of the run
+        baseline (dict):    columnar results of the baseline run
+        tolerance (float):  allowed relative change, ex: 0.1 for 10%
+        tolerances (dict):  tolerance per metric, ex: {"99%-ResTime": 0.25}
+
+    Returns:
+        list of regressions, empty when the run is within tolerance
+    """
+    tolerances = tolerances or dict()
+    current = rows(results)
+    regressions = list()
+    for key, expected in rows(baseline).items():
+        name = "/".join(key)
+        if key not in current:
+            regressions.append(f"{name}: operation missing in the results")
+            continue
+
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            base, value = expected.get(metric), current[key].get(metric)
+            if not isinstance(base, float) or not isinstance(value, float):
+                continue
+
+            allowed = tolerances.get(metric, METRIC_TOLERANCE.get(metric, tolerance))
+            if higher_is_better:
+                regressed = value < base * (1 - allowed)
+            else:
+                regressed = value > base * (1 + allowed)
+
+            change = (value - base) / base * 100 if base else 0
+            msg = f"{name} {metric}: {value} vs baseline {base} ({change:+.1f}%)"
+            if regressed:
+                regressions.append(msg)
+            LOG.info("%s%s", "REGRESSION " if regressed else "", msg)
+
+    return regressions
+
+
+def gate(
+    results_csv: str,
+    baseline_path: str,
+    tolerance: float = DEFAULT_TOLERANCE,
+    tolerances: Optional[Dict] = None,
+    update_baseline: bool = False,
+) -> int:
+    """Collects the results of a run and compares them with the baseline.
+
+    The results are saved next to the CSV, the baseline is created from them if it
+    does not exist or update_baseline is set.
+
+    Returns:
+        0 when within tolerance else 1
+    """
+    results = load_csv(results_csv)
+    # time series of the stages of a COS Bench run, kept along for reference
+    stage_csvs = glob(os.path.join(os.path.dirname(results_csv), "s[0-9]*-*.csv"))
+    if stage_csvs:
+        results["stages"] = {
+            os.path.basename(x)[:-4]: load_stage_csv(x) for x in sorted(stage_csvs)
+        }
+    save(results, f"{os.path.splitext(results_csv)[0]}.json")
+
+    if update_baseline or not os.path.exists(baseline_path):
+        save(results, baseline_path)
+        LOG.info("Baseline %s updated, nothing to compare with", baseline_path)
+        return 0
+
+    regressions = compare(results, load(baseline_path), tolerance, tolerances)
+    for msg in regressions:
+        LOG.error("Performance regression: %s", msg)
+
+    return 1 if regressions else 0
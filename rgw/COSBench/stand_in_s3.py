@@ -0,0 +1,161 @@
+"""In-memory S3 server standing in for RGW, to try out loadgen.py workloads.
+
+Supports path style bucket create/delete/list and object put/get/head/delete,
+requests are not authenticated.
+
+    python stand_in_s3.py --port 8000
+    python loadgen.py ci-swift-initial-cluster-fill.yaml --storage s3 \
+        --rgw-endpoint http://localhost:8000 --access-key x --secret-key x
+"""
+import argparse
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+LOG = logging.getLogger(__name__)
+
+
+class Store:
+    """Buckets and objects of the stand-in server."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, Dict[str, bytes]] = dict()
+
+
+def read_body(handler: BaseHTTPRequestHandler) -> bytes:
+    """Reads the request body, decoding aws-chunked uploads of newer SDKs."""
+    body = handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+    if "aws-chunked" not in handler.headers.get("Content-Encoding", ""):
+        return body
+
+    data, pos = b"", 0
+    while True:
+        end = body.index(b"\r\n", pos)
+        size = int(body[pos:end].split(b";")[0], 16)
+        if size == 0:
+            return data
+        data += body[end + 2 : end + 2 + size]
+        pos = end + 4 + size
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        LOG.debug(fmt, *args)
+
+    def parse(self):
+        url = urlparse(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        return bucket, key, parse_qs(url.query)
+
+    def reply(self, status: int, body: bytes = b"", headers: Dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def error(self, status: int, code: str):
+        body = f"<Error><Code>{code}</Code></Error>".encode()
+        self.reply(status, body, {"Content-Type": "application/xml"})
+
+    def do_PUT(self):
+        store = self.server.store
+        bucket, key, _ = self.parse()
+        body = read_body(self)
+        with store.lock:
+            if not key:
+                if bucket in store.buckets:
+                    return self.error(409, "BucketAlreadyOwnedByYou")
+                store.buckets[bucket] = dict()
+                return self.reply(200)
+
+            if bucket not in store.buckets:
+                return self.error(404, "NoSuchBucket")
+            store.buckets[bucket][key] = body
+
+        self.reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def do_GET(self):
+        store = self.server.store
+        bucket, key, query = self.parse()
+        with store.lock:
+            if bucket not in store.buckets:
+                return self.error(404, "NoSuchBucket")
+            objects = store.buckets[bucket]
+            if key:
+                if key not in objects:
+                    return self.error(404, "NoSuchKey")
+                return self.reply(200, objects[key])
+
+            prefix = query.get("prefix", [""])[0]
+            max_keys = int(query.get("max-keys", ["1000"])[0])
+            keys = sorted(k for k in objects if k.startswith(prefix))[:max_keys]
+            contents = "".join(
+                f"<Contents><Key>{escape(k)}</Key><Size>{len(objects[k])}</Size>"
+                "<LastModified>2000-01-01T00:00:00.000Z</LastModified></Contents>"
+                for k in keys
+            )
+
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><ListBucketResult>'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(keys)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>"
+            f"<IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+        )
+        self.reply(200, body.encode(), {"Content-Type": "application/xml"})
+
+    def do_HEAD(self):
+        store = self.server.store
+        bucket, key, _ = self.parse()
+        with store.lock:
+            objects = store.buckets.get(bucket)
+            if objects is None or (key and key not in objects):
+                return self.reply(404)
+            size = len(objects[key]) if key else 0
+
+        self.reply(200, headers={"Content-Length": str(size)})
+
+    def do_DELETE(self):
+        store = self.server.store
+        bucket, key, _ = self.parse()
+        with store.lock:
+            if bucket not in store.buckets:
+                return self.error(404, "NoSuchBucket")
+            if not key:
+                if store.buckets[bucket]:
+                    return self.error(409, "BucketNotEmpty")
+                del store.buckets[bucket]
+            else:
+                store.buckets[bucket].pop(key, None)
+
+        self.reply(204)
+
+
+def serve(host: str = "localhost", port: int = 8000) -> ThreadingHTTPServer:
+    """Returns the stand-in server, call serve_forever() on it to start serving."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.store = Store()
+    return server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s : %(message)s", level=logging.INFO
+    )
+    p = argparse.ArgumentParser(description="In-memory stand-in S3 server.")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=8000)
+    args = p.parse_args()
+
+    LOG.info("Serving a stand-in S3 endpoint at http://%s:%s", args.host, args.port)
+    serve(args.host, args.port).serve_forever()
@@ -1,11 +1,11 @@
 import configparser
-import hashlib
 import json
 import os
 import subprocess
 from random import randint
 
 import yaml
+from v2.utils.checksum import file_checksums
 
 from . import log
 
@@ -25,8 +25,7 @@ def exec_shell_cmd(command):
 
 def get_md5(fname):
     log.info("fname: %s" % fname)
-    return hashlib.md5(open(fname, "rb").read()).hexdigest()
-    # return "@424242"
+    return file_checksums(fname)["md5"]
 
 
 def get_file_size(min, max):
@@ -0,0 +1,131 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import json
+import logging
+import subprocess
+import time
+
+from v2.lib.exceptions import TestExecError
+from v2.utils.executor import stream_lines
+
+log = logging.getLogger()
+
+decoder = json.JSONDecoder()
+
+
+def iter_json_array(lines):
+    """
+    Parses a json array incrementally and yields its entries, holding one
+    entry in memory at a time
+
+    Parameters:
+        lines: iterable of text lines of a json array, ex: a command's stdout
+
+    Returns:
+        generator of the array entries
+    """
+    buf = ""
+    started = done = False
+    lines = iter(lines)
+    for line in lines:
+        buf += line
+        head = buf.lstrip().lstrip(",").lstrip()
+        # radosgw-admin pretty prints, an object or array entry can only end
+        # on a line starting with a closing bracket
+        if started and head[:1] in ("{", "[") and line.strip()[:1] not in ("}", "]"):
+            continue
+        buf = head
+        while buf:
+            if not started:
+                if buf[0] != "[":
+                    raise ValueError(f"expected a json array, got: {buf[:80]}")
+                started = True
+                buf = buf[1:]
+            elif buf[0] == "]":
+                done = True
+                break
+            else:
+                try:
+                    entry, end = decoder.raw_decode(buf)
+                except ValueError:
+                    # entry not complete yet
+                    break
+                buf = buf[end:]
+                yield entry
+            buf = buf.lstrip().lstrip(",").lstrip()
+        if done:
+            # drain the rest, so that the command's exit status is checked
+            for _ in lines:
+                pass
+            return
+    raise ValueError("json array ended unexpectedly")
+
+
+def stream_json(cmd):
+    """
+    Runs a radosgw-admin command printing a json array and yields its entries
+    as they are printed, ex: stream_json("radosgw-admin lc list")
+    """
+    try:
+        yield from iter_json_array(stream_lines(cmd))
+    except subprocess.CalledProcessError as e:
+        raise TestExecError(f"cmd execution failed: {cmd}: {e.stderr}")
+    except ValueError as e:
+        raise TestExecError(f"invalid json output of cmd: {cmd}: {e}")
+
+
+def paginate(cmd, max_entries=1000, marker_key="name", latencies=None):
+    """
+    Yields all entries of a listing command with --max-entries and --marker,
+    ex: paginate("radosgw-admin bucket list --bucket=b1")
+
+    Parameters:
+        cmd(char): listing command without --max-entries and --marker
+        max_entries(int): entries listed per command
+        marker_key(char): key of the entry to continue from
+        latencies(list): if given, the duration of each page command is
+            appended to it
+    """
+    marker = None
+    while True:
+        page_cmd = f"{cmd} --max-entries={max_entries}"
+        if marker is not None:
+            page_cmd += f" --marker='{marker}'"
+        count = 0
+        start = time.perf_counter()
+        for entry in stream_json(page_cmd):
+            count += 1
+            marker = entry[marker_key]
+            yield entry
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+        if count < max_entries:
+            return
+
+
+def bucket_list(bucket_name, max_entries=None):
+    """
+    Yields the entries of 'radosgw-admin bucket list', all versions and
+    delete markers included, paginated if max_entries is given
+    """
+    cmd = f"radosgw-admin bucket list --bucket={bucket_name}"
+    if max_entries:
+        return paginate(cmd, max_entries)
+    return stream_json(cmd)
+
+
+def count_lines(cmd):
+    """
+    Returns the number of lines printed by a command without holding its
+    output, ex: for 'radosgw-admin bucket radoslist'
+    """
+    count = 0
+    try:
+        for _ in stream_lines(cmd):
+            count += 1
+    except subprocess.CalledProcessError as e:
+        raise TestExecError(f"cmd execution failed: {cmd}: {e.stderr}")
+    log.info(f"{count} lines in output of cmd: {cmd}")
+    return count
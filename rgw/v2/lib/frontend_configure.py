@@ -129,8 +129,7 @@ class Frontend(RGWSectionOptions):
                 self.section, "rgw frontends", conf_val, ssh_con
             )
 
-            srv_restarted = self._rgw_service.restart(ssh_con)
-            time.sleep(10)
+            srv_restarted = self._rgw_service.restart(ssh_con, wait_ready=True)
             if srv_restarted is False:
                 raise RGWBaseException("RGW service restart failed")
             else:
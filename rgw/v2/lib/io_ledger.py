@@ -0,0 +1,305 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import atexit
+import json
+import logging
+import threading
+
+import yaml
+
+log = logging.getLogger()
+
+IO_INFO_FNAME = "io_info.yaml"
+JOURNAL_EXT = ".jsonl"
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def journal_fname_for(yaml_fname):
+    """
+    Returns the journal file name which backs the given io_info yaml
+
+    Parameters:
+        yaml_fname(char): io_info yaml file name, ex: io_info.yaml
+
+    Returns:
+        journal file name, ex: io_info.jsonl
+    """
+    return os.path.splitext(yaml_fname)[0] + JOURNAL_EXT
+
+
+class IOLedger(object):
+    """
+    Append-only journal of IO information with in-memory indexes.
+
+    Every change is applied to an in-memory copy of the io_info structure and
+    appended as one json line to the journal, so recording an IO costs O(1)
+    instead of a full yaml load and dump. Users are indexed by access_key,
+    buckets by name and keys by (bucket, key name).
+    The functions in this class are
+    1. initialize(): truncate the journal and start with the given data
+    2. record(): apply and journal one operation
+    3. record_many(): apply and journal a batch of operations in one write
+    4. get_data(): io_info structure, same layout as io_info.yaml
+    5. export_yaml(): dump the io_info structure to yaml
+    """
+
+    def __init__(self, yaml_fname=IO_INFO_FNAME):
+        self.yaml_fname = yaml_fname
+        self.journal_fname = journal_fname_for(yaml_fname)
+        self.lock = threading.RLock()
+        self.data = None
+        self.dirty = False
+        self.ops = {
+            "initialize": self._initialize,
+            "add_user": self._add_user,
+            "set_user_deleted": self._set_user_deleted,
+            "add_bucket": self._add_bucket,
+            "set_bucket_deleted": self._set_bucket_deleted,
+            "set_bucket_versioning": self._set_bucket_versioning,
+            "add_bucket_properties": self._add_bucket_properties,
+            "add_key": self._add_key,
+            "set_key_deleted": self._set_key_deleted,
+            "add_key_properties": self._add_key_properties,
+            "add_key_versioning_info": self._add_key_versioning_info,
+            "delete_key_version_info": self._delete_key_version_info,
+            "add_io": self._add_io,
+            "add_io_properties": self._add_io_properties,
+        }
+        self._reset_index()
+
+    def _reset_index(self):
+        self.users = {}
+        self.buckets = {}
+        self.bucket_owner = {}
+        self.keys = {}
+
+    def _index_user(self, user):
+        self.users[user["access_key"]] = user
+        for bucket in user.get("bucket", []):
+            self._index_bucket(user["access_key"], bucket)
+
+    def _index_bucket(self, access_key, bucket):
+        self.buckets[(access_key, bucket["name"])] = bucket
+        self.bucket_owner[bucket["name"]] = access_key
+        keys = self.keys.setdefault((access_key, bucket["name"]), {})
+        for key in bucket.get("keys", []):
+            keys.setdefault(key["name"], key)
+
+    def _build_index(self):
+        self._reset_index()
+        for user in self.data["users"]:
+            self._index_user(user)
+
+    def load(self):
+        """
+        Loads the io_info structure if not already loaded.
+
+        The journal is replayed when it exists, else io_info.yaml is read so
+        that data written by older runs is still readable.
+        """
+        with self.lock:
+            if self.data is not None:
+                return
+            self.data = {"users": list()}
+            if os.path.exists(self.journal_fname):
+                log.info(f"replaying io journal: {self.journal_fname}")
+                with open(self.journal_fname, "r") as fp:
+                    for line in fp:
+                        if line.strip():
+                            record = json.loads(line)
+                            self.ops[record.pop("op")](**record)
+            elif os.path.exists(self.yaml_fname):
+                log.info(f"loading io info from yaml: {self.yaml_fname}")
+                with open(self.yaml_fname, "r") as fp:
+                    self.data = yaml.safe_load(fp) or {"users": list()}
+                self._build_index()
+
+    def reload(self):
+        """
+        Drops the in-memory copy so that the next read replays the journal
+        """
+        with self.lock:
+            self.data = None
+            self._reset_index()
+
+    def record(self, op, **kwargs):
+        """
+        Applies an operation to the in-memory data and appends it to the journal
+
+        Parameters:
+            op(char): name of the operation, ex: add_key
+            kwargs: arguments of the operation
+        """
+        line = json.dumps(dict(op=op, **kwargs), default=str)
+        # apply the decoded line, so that in-memory data matches a replay and
+        # is not aliased with the caller's dicts
+        record = json.loads(line)
+        record.pop("op")
+        with self.lock:
+            if op == "initialize":
+                mode = "w"
+            else:
+                self.load()
+                mode = "a"
+            self.ops[op](**record)
+            with open(self.journal_fname, mode) as fp:
+                fp.write(line + "\n")
+            if not self.dirty:
+                self.dirty = True
+                atexit.register(self.export_yaml)
+
+    def record_many(self, records):
+        """
+        Applies operations and appends them to the journal in a single write
+
+        Parameters:
+            records(list): (op, kwargs) of each operation, initialize is not
+                allowed in a batch
+        """
+        if not records:
+            return
+        lines = [
+            json.dumps(dict(op=op, **kwargs), default=str) for op, kwargs in records
+        ]
+        with self.lock:
+            self.load()
+            for line in lines:
+                record = json.loads(line)
+                self.ops[record.pop("op")](**record)
+            with open(self.journal_fname, "a") as fp:
+                fp.write("".join(line + "\n" for line in lines))
+            if not self.dirty:
+                self.dirty = True
+                atexit.register(self.export_yaml)
+
+    def get_data(self):
+        """
+        Returns the io_info structure in the same layout as io_info.yaml
+        """
+        self.load()
+        return self.data
+
+    def export_yaml(self, yaml_fname=None):
+        """
+        Dumps the io_info structure to yaml
+
+        Parameters:
+            yaml_fname(char): file to write, defaults to the ledger's io_info.yaml
+        """
+        yaml_fname = yaml_fname or self.yaml_fname
+        with self.lock:
+            data = self.get_data()
+            log.info(f"exporting io info to: {yaml_fname}")
+            with open(yaml_fname, "w") as fp:
+                yaml.dump(data, fp, default_flow_style=False)
+        return yaml_fname
+
+    def _key(self, access_key, bucket_name, key_name):
+        return self.keys[(access_key, bucket_name)][key_name]
+
+    def _initialize(self, data):
+        self.data = data
+        self._build_index()
+
+    def _add_user(self, user):
+        self.data["users"].append(user)
+        self._index_user(user)
+
+    def _set_user_deleted(self, access_key):
+        self.users[access_key]["deleted"] = True
+
+    def _add_bucket(self, access_key, bucket):
+        self.users[access_key]["bucket"].append(bucket)
+        self._index_bucket(access_key, bucket)
+
+    def _set_bucket_deleted(self, bucket_name):
+        access_key = self.bucket_owner[bucket_name]
+        self.buckets[(access_key, bucket_name)]["deleted"] = True
+
+    def _set_bucket_versioning(self, access_key, bucket_name, versioning_status):
+        self.buckets[(access_key, bucket_name)][
+            "curr_versioning_status"
+        ] = versioning_status
+
+    def _add_bucket_properties(self, access_key, bucket_name, properties):
+        self.buckets[(access_key, bucket_name)]["properties"].append(properties)
+
+    def _add_key(self, access_key, bucket_name, key):
+        self.buckets[(access_key, bucket_name)]["keys"].append(key)
+        self.keys[(access_key, bucket_name)].setdefault(key["name"], key)
+
+    def _set_key_deleted(self, bucket_name, key_name):
+        access_key = self.bucket_owner[bucket_name]
+        self._key(access_key, bucket_name, key_name)["deleted"] = True
+
+    def _add_key_properties(self, access_key, bucket_name, key_name, properties):
+        self._key(access_key, bucket_name, key_name)["properties"].append(properties)
+
+    def _add_key_versioning_info(
+        self, access_key, bucket_name, key_name, versioning_info
+    ):
+        self._key(access_key, bucket_name, key_name)["versioning_info"].append(
+            versioning_info
+        )
+
+    def _delete_key_version_info(self, access_key, bucket_name, key_name, version_id):
+        key = self._key(access_key, bucket_name, key_name)
+        key["versioning_info"] = [
+            v for v in key["versioning_info"] if v["version_id"] != version_id
+        ]
+
+    def _add_io(self, access_key, io):
+        self.users[access_key]["io"].append(io)
+
+    def _add_io_properties(self, access_key, io_name, properties):
+        for io in self.users[access_key]["io"]:
+            if io["name"] == io_name:
+                io.setdefault("properties", list()).append(properties)
+                break
+
+
+def get_ledger(yaml_fname=IO_INFO_FNAME):
+    """
+    Returns the process wide ledger for the given io_info yaml file
+
+    Parameters:
+        yaml_fname(char): io_info yaml file name
+    """
+    path = os.path.abspath(yaml_fname)
+    with _ledgers_lock:
+        if path not in _ledgers:
+            _ledgers[path] = IOLedger(yaml_fname)
+        return _ledgers[path]
+
+
+def reload_ledgers():
+    """
+    Makes every ledger of this process replay its journal on the next read,
+    ex: after worker processes have appended to the journals
+    """
+    with _ledgers_lock:
+        for ledger in _ledgers.values():
+            ledger.reload()
+
+
+class IOInfoReader(object):
+    """
+    Read-only view over the ledger with the same get_data() as FileOps,
+    used by the verifiers to read the io_info written by the tests.
+    """
+
+    def __init__(self, yaml_fname=IO_INFO_FNAME):
+        self.yaml_fname = yaml_fname
+
+    def get_data(self):
+        return get_ledger(self.yaml_fname).get_data()
+
+
+if __name__ == "__main__":
+    # export io_info.yaml from the journal on demand
+    fname = sys.argv[1] if len(sys.argv) > 1 else IO_INFO_FNAME
+    print(IOLedger(fname).export_yaml())
@@ -2,13 +2,143 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import base64
+import io
 import logging
+import random
 
 import v2.utils.utils as utils
 from v2.lib.exceptions import RGWIOGenException
+from v2.utils import checksum
+from v2.utils.checksum import MultiHasher
 
 log = logging.getLogger()
 
+# size of each generated block, 1M of base64 text from 768K of random bytes
+BLOCK_SIZE = 1024 * 1024
+RAW_BLOCK_SIZE = BLOCK_SIZE // 4 * 3
+
+
+def new_seed():
+    """
+    Returns a random seed to generate reproducible data
+    """
+    return random.SystemRandom().getrandbits(64)
+
+
+def gen_blocks(size, seed):
+    """
+    Generates size bytes of printable pseudo random data in blocks
+
+    The data is base64 text, like 'base64 /dev/urandom', and is the same for
+    the same seed, so expected data can be regenerated instead of stored.
+
+    Parameters:
+        size(int): number of bytes to generate
+        seed(int): seed of the pseudo random generator
+
+    Returns:
+        generator of bytes blocks
+    """
+    rng = random.Random(seed)
+    remaining = size
+    while remaining > 0:
+        raw = rng.getrandbits(RAW_BLOCK_SIZE * 8).to_bytes(RAW_BLOCK_SIZE, "little")
+        block = base64.b64encode(raw)[:remaining]
+        remaining -= len(block)
+        yield block
+
+
+class DataStream(io.RawIOBase):
+    """
+    Read-only file like object yielding the data of gen_blocks, to pass as
+    the body of an upload without writing it to disk.
+    Checksums of the data read so far are available in checksums().
+    """
+
+    def __init__(self, size, seed=None, checksums=("md5",)):
+        self.size = size
+        self.seed = new_seed() if seed is None else seed
+        self.algorithms = checksums
+        self.seek(0)
+
+    def __len__(self):
+        return self.size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        offset = max(0, min(offset, self.size))
+        # data is generated forward only, regenerate from the start
+        self.blocks = gen_blocks(self.size, self.seed)
+        self.buffer = b""
+        self.pos = 0
+        self.hasher = MultiHasher(self.algorithms)
+        while self.pos < offset:
+            self.read(min(BLOCK_SIZE, offset - self.pos))
+        return self.pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.pos
+        chunks = [self.buffer]
+        buffered = len(self.buffer)
+        while buffered < size:
+            block = next(self.blocks, None)
+            if block is None:
+                break
+            chunks.append(block)
+            buffered += len(block)
+        self.buffer = b"".join(chunks)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.pos += len(data)
+        self.hasher.update(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+    def checksums(self):
+        return self.hasher.hexdigests()
+
+
+def write_data(fname, size, seed=None, checksums=("md5",)):
+    """
+    Writes size bytes of pseudo random data to fname, computing the checksums
+    in the same pass
+
+    Parameters:
+        fname(char): file to create
+        size(int): size in bytes
+        seed(int): seed of the data, random if not given
+        checksums(tuple): algorithms to compute, ex: ("md5", "sha256", "crc32c")
+
+    Returns:
+        dict of seed and the hex digest of each algorithm
+    """
+    seed = new_seed() if seed is None else seed
+    hasher = MultiHasher(checksums)
+    with open(fname, "wb", buffering=BLOCK_SIZE) as fp:
+        for block in gen_blocks(size, seed):
+            hasher.update(block)
+            fp.write(block)
+    digests = hasher.hexdigests()
+    checksum.cache.store(fname, digests)
+    return dict(digests, seed=seed)
+
 
 def io_generator(fname, size, type="txt", op="create", **kwargs):
     """
@@ -18,6 +148,8 @@ def io_generator(fname, size, type="txt", op="create", **kwargs):
 
     Parameters:
         op(char): create or append.
+        seed(int): seed of the generated data, random if not given
+        checksums(tuple): checksums to compute besides md5, ex: ("sha256",)
 
     Returns:
         finfo : file information is returned.
@@ -29,12 +161,14 @@ def io_generator(fname, size, type="txt", op="create", **kwargs):
         if op == "create":
             log.info("in create")
             if type == "txt":
-                fcreate = "base64 /dev/urandom | head -c %s > %s" % (size, fname)
-                created = utils.exec_shell_cmd(fcreate)
-                finfo["md5"] = utils.get_md5(fname)
+                checksums = ("md5",) + tuple(kwargs.get("checksums", ()))
+                try:
+                    finfo.update(
+                        write_data(fname, int(size), kwargs.get("seed"), checksums)
+                    )
+                except (OSError, ValueError) as e:
+                    raise RGWIOGenException("file %s creation error: %s" % (fname, e))
                 finfo["size"] = os.stat(fname).st_size
-                if created is False:
-                    raise RGWIOGenException("file %s creation error" % fname)
             return finfo
         if op == "append":
             log.info("in modify or append")
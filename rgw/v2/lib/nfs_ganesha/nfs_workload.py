@@ -0,0 +1,262 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import v2.utils.utils as utils
+from v2.lib.exceptions import TestExecError
+from v2.lib.manage_data import BLOCK_SIZE, gen_blocks, new_seed
+from v2.lib.nfs_ganesha.nfslib import NFS_CONVENTIONS
+from v2.lib.nfs_ganesha.write_io_info import IOInfo
+from v2.utils import checksum
+from v2.utils.checksum import MultiHasher
+from v2.utils.latency import LatencyRecorder
+
+log = logging.getLogger()
+
+DEFAULT_WORKERS = 16
+# io_info records buffered before a ledger write
+LEDGER_BATCH = 100
+
+
+class NFSWorkload(object):
+    """
+    Creates a tree of basedirs, subdirs and files on the nfs mount with a pool
+    of threads, recording the io_info in batches and the latency of each nfs
+    operation: mkdir, create, write, fsync and stat.
+    The functions in this class are
+    1. plan(): the dirs and files to create, as per dir_info of nfslib
+    2. run(): create the planned dirs, then the subdirs and files concurrently
+    3. summary(): latency and throughput of the nfs operations
+    """
+
+    def __init__(
+        self,
+        rgw_user_info,
+        mnt_point,
+        workers=DEFAULT_WORKERS,
+        ledger_batch=LEDGER_BATCH,
+    ):
+        self.rgw_user_info = rgw_user_info
+        self.mnt_point = os.path.abspath(mnt_point)
+        self.workers = workers
+        self.ledger_batch = ledger_batch
+        self.ioinfo = IOInfo()
+        self.latency = LatencyRecorder()
+        self.lock = threading.Lock()
+        self.pending = []
+        self.bytes_written = 0
+        self.elapsed = 0
+
+    def plan(self, basedir_count, subdir_count, file_count, size_range):
+        """
+        Returns the (io_type, path relative to the mount, size) to create
+
+        Parameters:
+            basedir_count(int): basedirs, seen as buckets on s3
+            subdir_count(int): subdirs per basedir
+            file_count(int): files per basedir
+            size_range(dict): min and max size of the files
+        """
+        ios = []
+        for bc in range(basedir_count):
+            basedir = utils.gen_bucket_name_from_userid(
+                self.rgw_user_info["user_id"], rand_no=bc
+            )
+            ios.append(("basedir", basedir, 0))
+            for sd in range(subdir_count):
+                subdir = utils.gen_bucket_name_from_userid(
+                    basedir + ".subdir", rand_no=sd
+                )
+                ios.append(("subdir", os.path.join(basedir, subdir), 0))
+            for fc in range(file_count):
+                fname = utils.gen_bucket_name_from_userid(basedir + ".file", rand_no=fc)
+                size = utils.get_file_size(size_range["min"], size_range["max"])
+                ios.append(("file", os.path.join(basedir, fname), size))
+        return ios
+
+    def _timed(self, op, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.latency.record(op, time.perf_counter() - start)
+        return result
+
+    def _add_io_info(self, io_info):
+        with self.lock:
+            self.pending.append(io_info)
+            if len(self.pending) < self.ledger_batch:
+                return
+            batch, self.pending = self.pending, []
+        self.ioinfo.add_io_infos(self.rgw_user_info["access_key"], batch)
+
+    def flush(self):
+        """
+        Writes the buffered io_info to the ledger
+        """
+        with self.lock:
+            batch, self.pending = self.pending, []
+        self.ioinfo.add_io_infos(self.rgw_user_info["access_key"], batch)
+
+    def mkdir(self, io_type, fname):
+        full_path = os.path.join(self.mnt_point, fname)
+        self._timed("mkdir", os.makedirs, full_path)
+        s3_conv = NFS_CONVENTIONS.get(io_type)
+        self._add_io_info(
+            {
+                "name": os.path.basename(fname),
+                "type": "dir",
+                "s3_convention": s3_conv,
+                "bucket": "self" if s3_conv == "bucket" else fname.split("/")[0],
+                "md5": None,
+            }
+        )
+
+    def write_file(self, fname, size):
+        """
+        Creates a file of pseudo random data, computing its md5 while writing
+        """
+        full_path = os.path.join(self.mnt_point, fname)
+        hasher = MultiHasher(("md5",))
+        fp = self._timed("create", open, full_path, "wb", BLOCK_SIZE)
+        try:
+            start = time.perf_counter()
+            for block in gen_blocks(int(size), new_seed()):
+                hasher.update(block)
+                fp.write(block)
+            fp.flush()
+            self.latency.record("write", time.perf_counter() - start)
+            self._timed("fsync", os.fsync, fp.fileno())
+        finally:
+            fp.close()
+        st = self._timed("stat", os.stat, full_path)
+        if st.st_size != int(size):
+            raise TestExecError(
+                f"{full_path} size is {st.st_size} instead of {int(size)}"
+            )
+        with self.lock:
+            self.bytes_written += st.st_size
+        self._add_io_info(
+            {
+                "name": os.path.basename(fname),
+                "type": "file",
+                "s3_convention": NFS_CONVENTIONS["file"],
+                "bucket": fname.split("/")[0],
+                "md5": hasher.hexdigests()["md5"],
+            }
+        )
+
+    def _do(self, io):
+        io_type, fname, size = io
+        if io_type == "file":
+            self.write_file(fname, size)
+        else:
+            self.mkdir(io_type, fname)
+
+    def run(self, ios):
+        """
+        Creates the basedirs, then their subdirs and files concurrently
+
+        Parameters:
+            ios(list): plan() of the workload
+        """
+        basedirs = [x for x in ios if x[0] == "basedir"]
+        others = [x for x in ios if x[0] != "basedir"]
+        log.info(
+            f"creating {len(basedirs)} basedirs and {len(others)} subdirs and files "
+            f"on {self.mnt_point} with {self.workers} workers"
+        )
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # subdirs and files need their basedir
+                list(pool.map(self._do, basedirs))
+                list(pool.map(self._do, others))
+        finally:
+            self.flush()
+            self.elapsed = time.perf_counter() - start
+        log.info(f"nfs workload summary: {self.summary()}")
+
+    def summary(self):
+        """
+        Returns the latency of each nfs operation and the throughput of the run
+        """
+        latencies = self.latency.summary()
+        files = latencies.get("create", {}).get("count", 0)
+        return {
+            "elapsed": round(self.elapsed, 3),
+            "files_per_sec": round(files / self.elapsed, 2) if self.elapsed else 0,
+            "mb_per_sec": (
+                round(self.bytes_written / self.elapsed / 1024 / 1024, 3)
+                if self.elapsed
+                else 0
+            ),
+            "latency": latencies,
+        }
+
+
+def verify_files(files, workers=DEFAULT_WORKERS):
+    """
+    Verifies the md5 of the files on the nfs mount concurrently
+
+    Parameters:
+        files(list): dicts with the path under "file" and the expected "md5"
+        workers(int): files hashed at a time
+
+    Returns:
+        list of the paths which are missing or whose md5 did not match
+    """
+
+    def verify(each_file):
+        path = each_file["file"]
+        if not os.path.exists(path):
+            log.error(f"{path} does not exist")
+            return path
+        # read from the mount, not the checksums cached while writing
+        md5 = checksum.file_checksums(path, use_cache=False)["md5"]
+        if md5 != each_file["md5"]:
+            log.error(f"md5 of {path}: {md5}, expected: {each_file['md5']}")
+            return path
+        return None
+
+    log.info(f"verifying {len(files)} files with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [x for x in pool.map(verify, files) if x is not None]
+
+
+def verify_objects(rgw_conn, objects, workers=DEFAULT_WORKERS):
+    """
+    Verifies the md5 of the objects on s3 concurrently, streaming their content
+
+    Parameters:
+        rgw_conn: s3 client
+        objects(list): dicts with the "bucket", object "name" and expected "md5"
+        workers(int): objects downloaded at a time
+
+    Returns:
+        list of the bucket/name of the objects which are missing or whose md5
+        did not match
+    """
+
+    def verify(obj):
+        name = f"{obj['bucket']}/{obj['name']}"
+        try:
+            body = rgw_conn.get_object(Bucket=obj["bucket"], Key=obj["name"])["Body"]
+        except Exception as e:
+            log.error(f"unable to get {name}: {e}")
+            return name
+        hasher = MultiHasher(("md5",))
+        for chunk in iter(lambda: body.read(BLOCK_SIZE), b""):
+            hasher.update(chunk)
+        md5 = hasher.hexdigests()["md5"]
+        if md5 != obj["md5"]:
+            log.error(f"md5 of {name}: {md5}, expected: {obj['md5']}")
+            return name
+        return None
+
+    log.info(f"verifying {len(objects)} objects with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [x for x in pool.map(verify, objects) if x is not None]
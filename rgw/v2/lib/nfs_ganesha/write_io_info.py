@@ -3,12 +3,10 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
-from v2.utils.utils import FileOps
+from v2.lib.io_ledger import IO_INFO_FNAME, get_ledger
 
 log = logging.getLogger()
 
-IO_INFO_FNAME = "io_info.yaml"
-
 
 class BasicIOInfoStructure(object):
     def __init__(self):
@@ -44,7 +42,7 @@ class AddIOInfo(object):
     def __init__(self, yaml_fname=IO_INFO_FNAME):
 
         self.yaml_fname = yaml_fname
-        self.file_op = FileOps(self.yaml_fname, type="yaml")
+        self.ledger = get_ledger(self.yaml_fname)
 
 
 class IOInfoInitialize(AddIOInfo):
@@ -56,7 +54,7 @@ class IOInfoInitialize(AddIOInfo):
 
         log.info("initial_data: %s" % (data))
 
-        self.file_op.add_data(data)
+        self.ledger.record("initialize", data=data)
 
 
 class AddUserInfo(AddIOInfo):
@@ -84,15 +82,7 @@ class AddUserInfo(AddIOInfo):
 
         log.info("got user info structure: %s" % user)
 
-        yaml_data = self.file_op.get_data()
-
-        log.info("got yaml data %s" % yaml_data)
-
-        yaml_data["users"].append(user)
-
-        log.info("data to add: %s" % yaml_data)
-
-        self.file_op.add_data(yaml_data)
+        self.ledger.record("add_user", user=user)
 
 
 class IOInfo(AddIOInfo):
@@ -100,7 +90,8 @@ class IOInfo(AddIOInfo):
     This class is add IO information to the yaml
     The functions in this class are
     1. add_io_info()
-    2. add_properties()
+    2. add_io_infos()
+    3. add_properties()
     """
 
     def __init__(self):
@@ -117,18 +108,19 @@ class IOInfo(AddIOInfo):
         Return:
 
         """
-        yaml_data = self.file_op.get_data()
+        self.ledger.record("add_io", access_key=access_key, io=io_info)
 
-        indx = None
-
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                indx = i
-                break
-
-        yaml_data["users"][indx]["io"].append(io_info)
+    def add_io_infos(self, access_key, io_infos):
+        """
+        Function to add the information of many IOs in a single ledger write
 
-        self.file_op.add_data(yaml_data)
+        Parameters:
+            access_key(char):
+            io_infos(list): io_info of each IO
+        """
+        self.ledger.record_many(
+            [("add_io", dict(access_key=access_key, io=x)) for x in io_infos]
+        )
 
     def add_properties(self, access_key, io_name, properties):
         """
@@ -139,24 +131,9 @@ class IOInfo(AddIOInfo):
             io_name(char):
             properties(char):
         """
-        yaml_data = self.file_op.get_data()
-
-        access_key_indx = None
-        io_indx = None
-
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["io"]):
-
-            if k["name"] == io_name:
-                io_indx = i
-                break
-
-        yaml_data["users"][access_key_indx]["io"][io_indx]["properties"].append(
-            properties
+        self.ledger.record(
+            "add_io_properties",
+            access_key=access_key,
+            io_name=io_name,
+            properties=properties,
         )
-
-        self.file_op.add_data(yaml_data)
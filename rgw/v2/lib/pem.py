@@ -31,20 +31,16 @@ def create_pem(ssh_con=None):
             '-subj "/C=IN/ST=KA/L=BLR/O=Carina Company/OU=Redhat/CN=*.ceph.redhat.com"'
         )
         if ssh_con:
-            _, stdout, stderr = ssh_con.exec_command(cmd)
-            _, stdout, _ = ssh_con.exec_command("ls server.* | wc -l ")
-            out = stdout.readline().strip()
-            if len(str(out)) == 0:
-                raise Exception("Key file creation error")
-            out = stderr.read().decode()
-            log.info("output :%s" % out)
+            returncode, out, err = ssh_con.run(cmd)
+            if returncode != 0:
+                raise Exception("Key file creation error: %s" % err)
+            log.info("output :%s" % err)
             cmd2 = "cat server.csr server.key > {pem_file_path}".format(
                 pem_file_path=PEM_FILE_PATH
             )
-            _, stdout, stderr = ssh_con.exec_command(cmd2)
-            cmd_error = stderr.read().decode()
-            if len(cmd_error) != 0:
-                raise Exception("Pem file generation error")
+            returncode, _, err = ssh_con.run(cmd2)
+            if returncode != 0:
+                raise Exception("Pem file generation error: %s" % err)
             log.info("pem file created")
             return PEM_FILE_PATH
         else:
@@ -70,11 +66,7 @@ def create_pem(ssh_con=None):
 
 def check_pem_file_exists(ssh_con=None):
     if ssh_con:
-        _, stdout, _ = ssh_con.exec_command(f"ls {PEM_FILE_PATH}")
-        op = stdout.readline().strip()
-        if op is PEM_FILE_PATH:
-            return True
-        else:
-            return False
+        returncode, _, _ = ssh_con.run(f"ls {PEM_FILE_PATH}")
+        return returncode == 0
     else:
         return os.path.exists(PEM_FILE_PATH)
@@ -2,108 +2,216 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import hashlib
 import logging
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import boto3
 import botocore
 from v2.lib.exceptions import SyncFailedError, TestExecError
+from v2.lib.io_ledger import IO_INFO_FNAME, IOInfoReader
 from v2.utils import utils
 from v2.utils.log import configure_logging
-from v2.utils.utils import FileOps
 
 log = logging.getLogger()
 
 
-IO_INFO_FNAME = "io_info.yaml"
+VERIFY_WORKERS = 16
+CHUNK_SIZE = 1024 * 1024
 
 
-def check_object_exists(obj, bucket):
+def verify_object(client, bucket_name, key_name, size, md5_local, version_id=None):
     """
-    This function verifies if the object exists
+    This function verifies existence, size and md5 of an object with a single GET,
+    streaming the body into the hasher
 
     Parameters:
-    key(char): key to be verified
-    bucket(char): bucket name
+        client: s3 client
+        bucket_name(char): name of the bucket
+        key_name(char): name of the key
+        size(int): expected size
+        md5_local(char): expected md5
+        version_id(char): version to verify, current version if None
     """
-    log.info("check if object exists")
+    kwargs = {"Bucket": bucket_name, "Key": key_name}
+    if version_id is not None:
+        kwargs["VersionId"] = version_id
     try:
-        key_from_s3 = bucket.Object(obj).get()
+        response = client.get_object(**kwargs)
     except botocore.exceptions.ClientError as ex:
         if ex.response["Error"]["Code"] == "NoSuchKey":
             raise SyncFailedError("object not synced! data sync failure")
+        raise
+    if int(size) != int(response["ContentLength"]):
+        raise TestExecError(
+            f"Size not matched, size from yaml: {size}, size from s3: {response['ContentLength']}"
+        )
+    hasher = hashlib.md5()
+    downloaded = 0
+    for chunk in response["Body"].iter_chunks(CHUNK_SIZE):
+        hasher.update(chunk)
+        downloaded += len(chunk)
+    downloaded_md5 = hasher.hexdigest()
+    if downloaded != int(size) or md5_local != downloaded_md5:
+        raise TestExecError(
+            f"Md5 not matched, md5_local: {md5_local}, md5_from_s3: {downloaded_md5}"
+        )
 
 
-def verify_key(each_key, bucket):
+def verify_key(client, bucket_name, each_key):
     """
     This function verifies data of each key in the bucket
 
     Parameters:
         key(char): key to be verified
-        bucket(char): bucket name
+        client: s3 client
+        bucket_name(char): bucket name
     """
-    log.info(f"verifying data for key: {os.path.basename(each_key['name'])}")
-    check_object_exists(os.path.basename(each_key["name"]), bucket)
-    key_from_s3 = bucket.Object(os.path.basename(each_key["name"]))
-    log.info("verifying size")
-    log.info(f"size from yaml: {each_key['size']}")
-    log.info(f"size from s3: {key_from_s3.content_length}")
-    if int(each_key["size"]) != int(key_from_s3.content_length):
-        raise TestExecError("Size not matched")
-    log.info("verifying md5")
-    log.info(f"md5_local: {each_key['md5_local']}")
-    key_from_s3.download_file("download.temp")
-    downloaded_md5 = utils.get_md5("download.temp")
-    log.info(f"md5_from_s3: {downloaded_md5}")
-    if each_key["md5_local"] != downloaded_md5:
-        raise TestExecError("Md5 not matched")
-    utils.exec_shell_cmd("sudo rm -rf download.temp")
-    log.info(f"verification complete for the key: {key_from_s3.key}")
-
-
-def verify_key_with_version(each_key, bucket):
+    key_name = os.path.basename(each_key["name"])
+    log.info(f"verifying data for key: {key_name}")
+    verify_object(
+        client, bucket_name, key_name, each_key["size"], each_key["md5_local"]
+    )
+    log.info(f"verification complete for the key: {key_name}")
+
+
+def verify_key_with_version(client, bucket_name, each_key):
     """
-    This function verifies data of each key in a versioned bucket
+    This function verifies data of each version of a key in a versioned bucket
 
     Parameters:
         key(char): key to be verified
-        bucket(char): name of the versoiined bucket
-
-    Returns:
-
+        client: s3 client
+        bucket_name(char): name of the versioned bucket
     """
-    log.info(f"verifying data for key: {os.path.basename(each_key['name'])}")
-    check_object_exists(os.path.basename(each_key["name"]), bucket)
-    key_from_s3 = bucket.Object(os.path.basename(each_key["name"]))
-    no_of_versions = len(each_key["versioning_info"])
-    log.info(f"no of versions: {no_of_versions}")
+    key_name = os.path.basename(each_key["name"])
+    log.info(f"verifying data for key: {key_name}")
+    log.info(f"no of versions: {len(each_key['versioning_info'])}")
     for each_version in each_key["versioning_info"]:
-        log.info(f"version_id: {each_version['version_id']}")
-        key_from_s3_with_version = key_from_s3.get(VersionId=each_version["version_id"])
-        log.info("verifying size")
-        log.info(f"size from yaml: {each_version['size']}")
-        log.info(f"size from s3 {key_from_s3_with_version['ContentLength']}")
-        if int(each_version["size"] != int(key_from_s3_with_version["ContentLength"])):
-            raise TestExecError("Size not matched")
-        log.info("verifying md5")
-        log.info(f"md5_local: {each_version['md5_local']}")
-        key_from_s3.download_file(
-            "download.temp", ExtraArgs={"VersionId": each_version["version_id"]}
+        verify_object(
+            client,
+            bucket_name,
+            key_name,
+            each_version["size"],
+            each_version["md5_local"],
+            version_id=each_version["version_id"],
         )
-        downloaded_md5 = utils.get_md5("download.temp")
-        log.info(f"md5_from_s3: {downloaded_md5}")
-        if each_version["md5_local"] != downloaded_md5:
-            raise TestExecError("Md5 not matched")
-        utils.exec_shell_cmd("sudo rm -rf download.temp")
         log.info(
-            f"verification complete for the key: {key_from_s3.key} ---> version_id: {each_version['version_id']}"
+            f"verification complete for the key: {key_name} ---> version_id: {each_version['version_id']}"
         )
 
 
+def verify_key_deleted(client, bucket_name, each_key):
+    """
+    This function verifies a deleted key does not exist
+
+    Parameters:
+        key(char): deleted key
+        client: s3 client
+        bucket_name(char): bucket name
+    """
+    key_name = each_key["name"]
+    log.info(f"Verification of deleted key '{key_name}' starts")
+    try:
+        client.head_object(Bucket=bucket_name, Key=os.path.basename(key_name))
+    except botocore.exceptions.ClientError:
+        log.info(f"Verification of deleted object '{key_name}' successful")
+        return
+    raise AssertionError(f"Verification of deleted object '{key_name}' failed")
+
+
+def verify_bucket_deleted(client, bucket_name):
+    """
+    This function verifies a deleted bucket does not exist
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): bucket name
+    """
+    log.info(f"Verification of deleted bucket '{bucket_name}' starts")
+    try:
+        client.head_bucket(Bucket=bucket_name)
+    except botocore.exceptions.ClientError as e:
+        if int(e.response["Error"]["Code"]) == 404:
+            log.info(f"Verification of deleted bucket '{bucket_name}' successful")
+            return
+    raise AssertionError(f"Verification of deleted bucket '{bucket_name}' failed")
+
+
 class ReadIOInfo(object):
-    def __init__(self, yaml_fname=IO_INFO_FNAME):
+    """
+    This class verifies the data recorded in io_info against the cluster.
+    Keys are verified concurrently by a pool of workers, each with its own
+    s3 clients, and all failures are reported at the end.
+    """
+
+    def __init__(self, yaml_fname=IO_INFO_FNAME, workers=VERIFY_WORKERS):
         self.yaml_fname = yaml_fname
-        self.file_op = FileOps(self.yaml_fname, type="yaml")
+        self.file_op = IOInfoReader(self.yaml_fname)
+        self.workers = workers
+        self.clients = threading.local()
+
+    def get_client(self, user):
+        """
+        Returns the s3 client of the user for the calling worker thread
+        """
+        if not hasattr(self.clients, "by_user"):
+            self.clients.by_user = {}
+        client = self.clients.by_user.get(user["access_key"])
+        if client is None:
+            client = boto3.session.Session().client(
+                "s3",
+                aws_access_key_id=user["access_key"],
+                aws_secret_access_key=user["secret_key"],
+                endpoint_url=self.endpoint_url,
+                use_ssl=self.is_secure,
+                verify=False,
+            )
+            self.clients.by_user[user["access_key"]] = client
+        return client
+
+    def gen_tasks(self, users):
+        """
+        Yields (description, function, user, args) for every check to run
+        """
+        for each_user in users:
+            if each_user["deleted"] is not False:
+                continue
+            log.info(f"verifying data for the user: {each_user['user_id']}")
+            for each_bucket in each_user["bucket"]:
+                bucket_name = each_bucket["name"]
+                if each_bucket["deleted"] is not False:
+                    yield bucket_name, verify_bucket_deleted, each_user, (bucket_name,)
+                    continue
+                log.info(
+                    f"bucket: {bucket_name}, no_of_keys: {len(each_bucket['keys'])}"
+                )
+                for each_key in each_bucket["keys"]:
+                    if each_key["deleted"] is not False:
+                        func = verify_key_deleted
+                    elif each_key["versioning_info"]:
+                        func = verify_key_with_version
+                    else:
+                        func = verify_key
+                    description = f"{bucket_name}/{each_key['name']}"
+                    yield description, func, each_user, (bucket_name, each_key)
+
+    def run_task(self, func, user, args):
+        return func(self.get_client(user), *args)
+
+    def verify_deleted_users(self, users):
+        deleted_users = [u["user_id"] for u in users if u["deleted"] is not False]
+        if not deleted_users:
+            return
+        out = utils.exec_shell_cmd("radosgw-admin user list")
+        for user_id in deleted_users:
+            log.info(f"Verification of deleted user '{user_id}' starts")
+            if user_id in out:
+                raise AssertionError(f"Verification of deleted user '{user_id}' failed")
+            log.info(f"Verification of deleted user '{user_id}' successful")
 
     def verify_io(self):
         """
@@ -118,99 +226,37 @@ class ReadIOInfo(object):
         log.info("***************Starting Verification*****************")
         data = self.file_op.get_data()
         users = data["users"]
-        is_secure = True if utils.is_rgw_secure() else False
+        self.is_secure = True if utils.is_rgw_secure() else False
         host = socket.gethostbyname(socket.gethostname())
 
-        endpoint_proto = "https" if is_secure else "http"
+        endpoint_proto = "https" if self.is_secure else "http"
         endpoint_port = utils.get_radosgw_port_no()
-        endpoint_url = f"{endpoint_proto}://{host}:{endpoint_port}"
-
-        for each_user in users:
-            if each_user["deleted"] is False:
-                log.info("verifying data for the user: \n")
-                log.info(f"user_id: {each_user['user_id']}")
-                log.info(f"access_key: {each_user['access_key']}")
-                log.info(f"secret_key: {each_user['secret_key']}")
-                conn = boto3.resource(
-                    "s3",
-                    aws_access_key_id=each_user["access_key"],
-                    aws_secret_access_key=each_user["secret_key"],
-                    endpoint_url=endpoint_url,
-                    use_ssl=is_secure,
-                    verify=False,
-                )
+        self.endpoint_url = f"{endpoint_proto}://{host}:{endpoint_port}"
 
-                for each_bucket in each_user["bucket"]:
-                    if each_bucket["deleted"] is False:
-                        log.info(f"verifying data for bucket: {each_bucket['name']}")
-                        bucket_from_s3 = conn.Bucket(each_bucket["name"])
-                        curr_versioning_status = each_bucket["curr_versioning_status"]
-                        log.info(f"curr_versioning_status: {curr_versioning_status}")
-                        if not each_bucket["keys"]:
-                            log.info("keys are not created")
-                        else:
-                            no_of_keys = len(each_bucket["keys"])
-                            log.info(f"no_of_keys: {no_of_keys}")
-                            for each_key in each_bucket["keys"]:
-                                if each_key["deleted"] is False:
-                                    versioned_keys = len(each_key["versioning_info"])
-                                    log.info(f"versioned_keys: {versioned_keys}")
-                                    if not each_key["versioning_info"]:
-                                        log.info("not versioned key")
-                                        verify_key(each_key, bucket_from_s3)
-                                    else:
-                                        log.info("versioned key")
-                                        verify_key_with_version(
-                                            each_key, bucket_from_s3
-                                        )
-                                else:
-                                    key_name = each_key["name"]
-                                    log.info(
-                                        f"Verification of deleted key '{key_name}' starts"
-                                    )
-                                    try:
-                                        key_from_s3 = bucket_from_s3.Object(
-                                            os.path.basename(key_name)
-                                        )
-                                        log.info(key_from_s3.get())
-                                        raise AssertionError(
-                                            f"Verification of deleted object '{key_name}' failed"
-                                        )
-                                    except botocore.exceptions.ClientError as e:
-                                        log.info(
-                                            f"Verification of deleted object '{key_name}' successful"
-                                        )
-                    else:
-                        bucket_name = each_bucket["name"]
-                        log.info(
-                            f"Verification of deleted bucket '{bucket_name}' starts"
-                        )
-                        try:
-                            conn.meta.client.head_bucket(Bucket=bucket_name)
-                            raise AssertionError(
-                                f"Verification of deleted bucket '{bucket_name}' failed"
-                            )
-                        except botocore.exceptions.ClientError as e:
-                            error_code = int(e.response["Error"]["Code"])
-                            if error_code == 404:
-                                log.info(
-                                    f"Verification of deleted bucket '{bucket_name}' successful"
-                                )
-                            else:
-                                raise AssertionError(
-                                    f"Verification of deleted bucket '{bucket_name}' failed"
-                                )
-            else:
-                user_id = each_user["user_id"]
-                log.info(f"Verification of deleted user '{user_id}' starts")
-                cmd = f"radosgw-admin user list"
-                out = utils.exec_shell_cmd(cmd)
-                if user_id not in out:
-                    log.info(f"Verification of deleted user '{user_id}' successful")
-                else:
-                    raise AssertionError(
-                        f"Verification of deleted user '{user_id}' failed"
-                    )
+        failures = []
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.run_task, func, user, args): description
+                for description, func, user, args in self.gen_tasks(users)
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(f"verification failed for {futures[future]}: {e}")
+                    failures.append((futures[future], e))
+        log.info(
+            f"verified {len(futures)} buckets/keys in {time.time() - start:.2f}s with {self.workers} workers"
+        )
+        try:
+            self.verify_deleted_users(users)
+        except AssertionError as e:
+            failures.append(("deleted users", e))
+        if failures:
+            for description, e in failures:
+                log.error(f"{description}: {e}")
+            raise TestExecError(f"data verification failed for {len(failures)} items")
         log.info("verification of data completed")
 
 
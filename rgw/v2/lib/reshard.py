@@ -0,0 +1,147 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import json
+import logging
+import threading
+import time
+
+import v2.lib.s3.cleanup as cleanup
+import v2.utils.utils as utils
+from v2.lib.exceptions import TestExecError
+from v2.utils.latency import LatencyRecorder
+
+log = logging.getLogger()
+
+BACKGROUND_PREFIX = "reshard-background-io/"
+
+
+def get_num_shards(bucket_name):
+    """
+    Returns num_shards of the bucket from bucket stats
+    """
+    out = utils.exec_shell_cmd(f"radosgw-admin bucket stats --bucket {bucket_name}")
+    if out is False:
+        raise TestExecError(f"bucket stats failed for {bucket_name}")
+    return json.loads(out)["num_shards"]
+
+
+def is_resharding(bucket_name):
+    """
+    Checks if the bucket is queued in reshard list or has a reshard in progress
+    """
+    queued = json.loads(utils.exec_shell_cmd("radosgw-admin reshard list") or "[]")
+    if any(entry.get("bucket_name") == bucket_name for entry in queued):
+        return True
+    out = utils.exec_shell_cmd(f"radosgw-admin reshard status --bucket {bucket_name}")
+    status = json.loads(out) if out else []
+    return any(
+        entry.get("reshard_status") not in ("not-resharding", "not_resharding")
+        for entry in status
+    )
+
+
+def wait_for_reshard(bucket_name, target_shards, timeout=900, delay=5, max_delay=60):
+    """
+    Polls num_shards and reshard status with backoff, returning as soon as the
+    bucket has at least target_shards and no reshard is queued or in progress
+
+    Parameters:
+        bucket_name(char): name of the bucket
+        target_shards(int): num_shards to reach
+        timeout(int): seconds to wait at most
+
+    Returns:
+        dict of num_shards, reached(bool) and elapsed secs
+    """
+    start = time.time()
+    state = {"num_shards": None}
+
+    def check():
+        state["num_shards"] = get_num_shards(bucket_name)
+        log.info(f"num_shards of {bucket_name}: {state['num_shards']}")
+        return state["num_shards"] >= target_shards and not is_resharding(bucket_name)
+
+    reached = utils.poll(check, timeout, delay, max_delay)
+    result = {
+        "bucket": bucket_name,
+        "target_shards": target_shards,
+        "num_shards": state["num_shards"],
+        "reached": reached,
+        "elapsed": round(time.time() - start, 3),
+    }
+    log.info(f"reshard result: {result}")
+    return result
+
+
+class BackgroundIO(object):
+    """
+    Client workload running in a thread while a bucket reshards: PUTs and
+    GETs a small set of keys and records their latency.
+    The functions in this class are
+    1. start(): start the workload
+    2. stop(): stop it, remove its keys and return the latency summary
+    """
+
+    def __init__(self, client, bucket_name, keys=10, size=4096, interval=0.05):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.keys = [f"{BACKGROUND_PREFIX}{i}" for i in range(keys)]
+        self.body = b"r" * size
+        self.interval = interval
+        self.latency = LatencyRecorder()
+        self.errors = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def timed(self, name, func, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = func(Bucket=self.bucket_name, **kwargs)
+            if name == "GET":
+                response["Body"].read()
+        except Exception as e:
+            self.errors += 1
+            log.info(f"background {name} failed: {e}")
+            return
+        self.latency.record(name, time.perf_counter() - start)
+
+    def run(self):
+        count = 0
+        while not self.stopped.is_set():
+            key = self.keys[count % len(self.keys)]
+            self.timed("PUT", self.client.put_object, Key=key, Body=self.body)
+            self.timed("GET", self.client.get_object, Key=key)
+            count += 1
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        log.info(f"starting background io on bucket: {self.bucket_name}")
+        self.started = time.time()
+        self.thread.start()
+
+    def stop(self):
+        """
+        Returns:
+            dict of PUT and GET latency summaries, errors and duration
+        """
+        self.stopped.set()
+        self.thread.join()
+        cleanup.empty_bucket(
+            self.client, self.bucket_name, prefix=BACKGROUND_PREFIX, versions=True
+        )
+        summary = dict(
+            self.latency.summary(),
+            errors=self.errors,
+            duration=round(time.time() - self.started, 3),
+        )
+        log.info(f"background io during reshard: {summary}")
+        return summary
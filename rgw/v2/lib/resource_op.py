@@ -17,11 +17,39 @@ from v2.lib.exceptions import ConfigError
 
 # import v2.lib.frontend_configure as frontend_configure
 from v2.lib.frontend_configure import Frontend, Frontend_CephAdm
+from v2.utils import checksum
 
 log = logging.getLogger()
 
 lib_dir = os.path.abspath(os.path.join(__file__, "../"))
 
+# set by run_suite.py to keep apart the users and buckets of tests running concurrently
+TEST_NAMESPACE = os.environ.get("RGW_TEST_NAMESPACE", "")
+
+
+def user_detail_fname():
+    """
+    Returns the file sharing the users created on the primary with the other sites
+    """
+    if TEST_NAMESPACE:
+        return os.path.join(lib_dir, f"user_details.{TEST_NAMESPACE}.json")
+    return os.path.join(lib_dir, "user_details.json")
+
+
+def gen_user_id():
+    """
+    Returns a random user id, prefixed with the test namespace if any
+    """
+    user_id = (
+        names.get_first_name().lower()
+        + random.choice(string.ascii_lowercase)
+        + "."
+        + str(random.randint(1, 1000))
+    )
+    if TEST_NAMESPACE:
+        return f"{TEST_NAMESPACE}-{user_id}"
+    return user_id
+
 
 @write_io_info.logioinfo
 def resource_op(exec_info):
@@ -80,7 +108,7 @@ def create_users(no_of_users_to_create, user_names=None, cluster_name="ceph"):
     admin_ops = UserMgmt()
     all_users_details = []
     primary = utils.is_cluster_primary()
-    user_detail_file = os.path.join(lib_dir, "user_details.json")
+    user_detail_file = user_detail_fname()
     if primary:
         for i in range(no_of_users_to_create):
             if user_names:
@@ -92,10 +120,7 @@ def create_users(no_of_users_to_create, user_names=None, cluster_name="ceph"):
                 all_users_details.append(user_details)
             else:
                 user_details = admin_ops.create_admin_user(
-                    user_id=names.get_first_name().lower()
-                    + random.choice(string.ascii_lowercase)
-                    + "."
-                    + str(random.randint(1, 1000)),
+                    user_id=gen_user_id(),
                     displayname=names.get_full_name().lower(),
                     cluster_name=cluster_name,
                 )
@@ -137,14 +162,11 @@ def create_tenant_users(no_of_users_to_create, tenant_name, cluster_name="ceph")
     admin_ops = UserMgmt()
     all_users_details = []
     primary = utils.is_cluster_primary()
-    user_detail_file = os.path.join(lib_dir, "user_details.json")
+    user_detail_file = user_detail_fname()
     if primary:
         for i in range(no_of_users_to_create):
             user_details = admin_ops.create_tenant_user(
-                user_id=names.get_first_name().lower()
-                + random.choice(string.ascii_lowercase)
-                + "."
-                + str(random.randint(1, 1000)),
+                user_id=gen_user_id(),
                 displayname=names.get_full_name().lower(),
                 cluster_name=cluster_name,
                 tenant_name=tenant_name,
@@ -216,6 +238,17 @@ class Config(object):
         self.objects_size_range = self.doc["config"].get("objects_size_range")
         self.sharding_type = self.doc["config"].get("sharding_type")
         self.split_size = self.doc["config"].get("split_size", 5)
+        self.multipart_concurrency = self.doc["config"].get("multipart_concurrency", 4)
+        self.swift_manifest = self.doc["config"].get("swift_manifest", "slo")
+        # true, or the file of the on-disk cache of the file checksums
+        self.checksum_cache = self.doc["config"].get("checksum_cache", False)
+        if self.checksum_cache:
+            checksum.enable_disk_cache(
+                checksum.DISK_CACHE_FNAME
+                if self.checksum_cache is True
+                else self.checksum_cache
+            )
+        self.workload = self.doc["config"].get("workload", {})
         self.test_ops = self.doc["config"].get("test_ops", {})
         self.lifecycle_conf = self.doc["config"].get("lifecycle_conf")
         self.delete_marker_ops = self.doc["config"].get("delete_marker_ops")
@@ -1,10 +1,12 @@
+import json
 import logging
 import os
 import sys
+import tempfile
 from errno import ESTALE
 
 import v2.utils.utils as utils
-from v2.lib.exceptions import InvalidCephConfigOption
+from v2.lib.exceptions import InvalidCephConfigOption, TestExecError
 from v2.utils.utils import ConfigParse, FileOps
 
 log = logging.getLogger()
@@ -127,10 +129,198 @@ class CephConfigSet:
         if config_set is False:
             raise InvalidCephConfigOption("Invalid ceph config options")
 
+    def get_from_ceph_cli(self, options):
+        """
+        Returns the values of the options set for client.rgw, from a single
+        ceph config dump
+        """
+        out = utils.exec_shell_cmd("sudo ceph config dump --format json")
+        if out is False:
+            raise InvalidCephConfigOption("Unable to dump the ceph config")
+        current = {
+            x["name"]: x["value"]
+            for x in json.loads(out)
+            if x.get("section") == "client.rgw"
+        }
+        return {(section, option): current.get(option) for section, option in options}
+
+    def set_many_to_ceph_cli(self, changes):
+        """
+        Sets the options of client.rgw with a single ceph config assimilate-conf,
+        the options with a None value are removed
+
+        Parameters:
+            changes(dict): {option: value}
+        """
+        values = {
+            k: "true" if v is True else str(v)
+            for k, v in changes.items()
+            if v is not None
+        }
+        if values:
+            with tempfile.NamedTemporaryFile("w", suffix=".conf") as fp:
+                fp.write("[client.rgw]\n")
+                fp.writelines(f"{k} = {v}\n" for k, v in values.items())
+                fp.flush()
+                config_set = utils.exec_shell_cmd(
+                    f"sudo ceph config assimilate-conf -i {fp.name}"
+                )
+            if config_set is False:
+                raise InvalidCephConfigOption("Invalid ceph config options")
+        removed = [k for k, v in changes.items() if v is None]
+        if removed:
+            cmd = " && ".join(f"sudo ceph config rm client.rgw {k}" for k in removed)
+            if utils.exec_shell_cmd(cmd) is False:
+                raise InvalidCephConfigOption("Unable to remove ceph config options")
+
+
+class CephConfTransaction(object):
+    """
+    Config changes applied in one go, followed by a single rgw restart,
+    and restored on exit when used as a context manager.
+    The functions in this class are
+    1. set(): queue a change
+    2. commit(): apply the queued changes that differ from the current values
+    3. rollback(): restore the values changed by the commits
+    """
+
+    def __init__(self, ceph_conf, rgw_service=None, ssh_con=None, restore=True):
+        self.ceph_conf = ceph_conf
+        self.rgw_service = rgw_service
+        self.ssh_con = ssh_con
+        self.restore = restore
+        self.pending = {}
+        # values before the first change of each option
+        self.original = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.pending = {}
+        if self.restore:
+            self.rollback()
+        return False
+
+    def set(self, section, option, value=None):
+        """
+        Queues a change, applied on commit(), a None value removes the option
+        """
+        if value is not None:
+            value = "true" if value is True else str(value)
+        self.pending[(section, option)] = value
+
+    def _apply(self, changes, record=False):
+        current = self.ceph_conf.get_from_ceph_conf(list(changes), self.ssh_con)
+        diff = {k: v for k, v in changes.items() if current[k] != v}
+        skipped = sorted(option for _, option in set(changes) - set(diff))
+        if skipped:
+            log.info(f"config values already set: {skipped}")
+        if not diff:
+            return diff
+        if record:
+            # before setting, for a failed set or restart to be rolled back too
+            for key in diff:
+                self.original.setdefault(key, current[key])
+        self.ceph_conf.set_many_to_ceph_conf(diff, self.ssh_con)
+        if self.rgw_service is not None:
+            srv_restarted = self.rgw_service.restart(self.ssh_con, wait_ready=True)
+            if srv_restarted is False:
+                raise TestExecError("RGW service restart failed")
+            log.info("RGW service restarted")
+        return diff
+
+    def commit(self):
+        """
+        Applies the queued changes, skipping the ones already set, and restarts
+        rgw once if anything changed
+
+        Returns:
+            dict of the applied changes
+        """
+        changes, self.pending = self.pending, {}
+        if not changes:
+            return {}
+        return self._apply(changes, record=True)
+
+    def rollback(self):
+        """
+        Restores the values changed by the commits, options which were not set
+        are removed
+        """
+        original, self.original = self.original, {}
+        if original:
+            log.info(f"restoring config values: {original}")
+            self._apply(original)
+
 
 class CephConfOp(CephConfFileOP, CephConfigSet):
     def __init__(self, ssh_con=None) -> None:
         super().__init__(ssh_con)
+        self.ssh_con = ssh_con
+
+    def transaction(self, rgw_service=None, ssh_con=None, restore=True):
+        """
+        Returns a CephConfTransaction batching config changes, ex:
+
+            with ceph_conf.transaction(rgw_service) as txn:
+                txn.set("global", ConfigOpts.rgw_gc_obj_min_wait, "10")
+                txn.set("global", ConfigOpts.rgw_gc_processor_period, "10")
+                txn.commit()
+                # test with the changed config
+            # the original values are restored here
+
+        Parameters:
+            rgw_service(RGWService): restarted once after the changes, if any
+            ssh_con: ssh connection to the node with ceph.conf
+            restore(bool): restore the original values on exit
+        """
+        return CephConfTransaction(
+            self, rgw_service, ssh_con or self.ssh_con, restore=restore
+        )
+
+    def get_from_ceph_conf(self, options, ssh_con=None):
+        """
+        Returns the current values of the options, None for the ones not set
+
+        Parameters:
+            options(list): (section, option) pairs
+        """
+        _, version_name = utils.get_ceph_version()
+        if version_name in ["luminous", "nautilus"]:
+            # reload, ceph.conf may have changed since it was read
+            ConfigParse.__init__(self, self.ceph_conf_path, ssh_con)
+            return {
+                (section, option): self.cfg.get(section, option, fallback=None)
+                for section, option in options
+            }
+        return self.get_from_ceph_cli(options)
+
+    def set_many_to_ceph_conf(self, changes, ssh_con=None):
+        """
+        Sets the options in one go: a single ceph.conf write, or a single
+        ceph config assimilate-conf
+
+        Parameters:
+            changes(dict): {(section, option): value}, None value to remove the option
+        """
+        _, version_name = utils.get_ceph_version()
+        log.info(f"setting config values: {changes}")
+        if version_name in ["luminous", "nautilus"]:
+            ConfigParse.__init__(self, self.ceph_conf_path, ssh_con)
+            for (section, option), value in changes.items():
+                if value is None:
+                    self.cfg.remove_option(section, option)
+                    continue
+                if section != "DEFAULT" and not self.cfg.has_section(section):
+                    self.cfg.add_section(section)
+                self.cfg.set(section, option, str(value))
+            self.add_data(self.cfg, ssh_con)
+        else:
+            self.set_many_to_ceph_cli(
+                {option: value for (_, option), value in changes.items()}
+            )
+        utils.cluster_facts.invalidate(*utils.RGW_CONFIG_FACTS)
 
     def set_to_ceph_conf(self, section, option, value=None, ssh_con=None):
         version_id, version_name = utils.get_ceph_version()
@@ -148,3 +338,4 @@ class CephConfOp(CephConfFileOP, CephConfigSet):
             log.info(option)
             log.info(value)
             self.set_to_ceph_cli(option, value)
+        utils.cluster_facts.invalidate(*utils.RGW_CONFIG_FACTS)
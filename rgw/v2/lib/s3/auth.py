@@ -1,6 +1,8 @@
+import hashlib
 import os
 import socket
 import sys
+import threading
 
 import boto3
 
@@ -12,6 +14,140 @@ from botocore.client import Config
 
 log = logging.getLogger()
 
+# default http pool and retry policy of the pooled s3 connections
+MAX_POOL_CONNECTIONS = 50
+RETRIES = {"max_attempts": 5, "mode": "standard"}
+
+
+class ConnectionManager(object):
+    """
+    Caches rgw endpoints and boto3 s3 connections, so that users and workers
+    reuse sessions and their http connection pool instead of building new ones.
+    The functions in this class are
+    1. get_endpoint(): hostname and ip of rgw resolved once per host, and its port
+    2. get_resource(): s3 resource cached per (credentials, endpoint, signature_version, ssl)
+    3. get_client(): s3 client sharing the http pool of the cached resource
+    4. new_resource(): s3 resource on its own session, for a single thread
+    """
+
+    def __init__(
+        self,
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries=RETRIES,
+        tcp_keepalive=None,
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.retries = retries
+        self.tcp_keepalive = tcp_keepalive
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.resources = {}
+
+    def get_endpoint(self, ssh_con=None):
+        """
+        Returns (hostname, ip, port) of rgw, local or on the host of ssh_con
+        """
+        # hostname and ip cached per host, the port is read on every call as
+        # a frontend change moves it, get_radosgw_port_no() caches it until then
+        key = getattr(ssh_con, "host", None) if ssh_con is not None else None
+        with self.lock:
+            if key not in self.endpoints:
+                if ssh_con is not None:
+                    hostname = ssh_con.run("hostname")[1].strip()
+                else:
+                    hostname = socket.gethostname()
+                self.endpoints[key] = (hostname, socket.gethostbyname(hostname))
+            hostname, ip = self.endpoints[key]
+        return hostname, ip, utils.get_radosgw_port_no(ssh_con)
+
+    def botocore_config(self, signature_version=None, **overrides):
+        """
+        Returns the botocore Config with the pool and retry policy
+        """
+        kwargs = {
+            "signature_version": signature_version,
+            "max_pool_connections": overrides.get(
+                "max_pool_connections", self.max_pool_connections
+            ),
+            "retries": overrides.get("retries", self.retries),
+        }
+        tcp_keepalive = overrides.get("tcp_keepalive", self.tcp_keepalive)
+        if tcp_keepalive is not None:
+            kwargs["tcp_keepalive"] = tcp_keepalive
+        return Config(**kwargs)
+
+    def get_resource(
+        self,
+        access_key,
+        secret_key,
+        endpoint_url,
+        ssl=False,
+        signature_version=None,
+        session_token=None,
+        **overrides,
+    ):
+        """
+        Returns the s3 resource for the credentials and endpoint, creating it once
+        """
+        # a rotated secret key must not get the session of the old one, the
+        # key holds its digest rather than the secret
+        key = (
+            access_key,
+            hashlib.sha256(str(secret_key).encode()).hexdigest(),
+            session_token,
+            endpoint_url,
+            signature_version,
+            ssl,
+            tuple(sorted((k, str(v)) for k, v in overrides.items())),
+        )
+        with self.lock:
+            if key not in self.resources:
+                log.info(f"creating pooled s3 session for access_key: {access_key}")
+                self.resources[key] = self.new_resource(
+                    access_key,
+                    secret_key,
+                    endpoint_url,
+                    ssl,
+                    signature_version,
+                    session_token,
+                    **overrides,
+                )
+            return self.resources[key]
+
+    def new_resource(
+        self,
+        access_key,
+        secret_key,
+        endpoint_url,
+        ssl=False,
+        signature_version=None,
+        session_token=None,
+        **overrides,
+    ):
+        """
+        Returns a new s3 resource on its own session, not cached
+        """
+        session = boto3.session.Session()
+        return session.resource(
+            "s3",
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            endpoint_url=endpoint_url,
+            use_ssl=ssl,
+            verify=False,
+            config=self.botocore_config(signature_version, **overrides),
+            aws_session_token=session_token if session_token else None,
+        )
+
+    def get_client(self, *args, **kwargs):
+        """
+        Returns the s3 client of the cached resource, sharing its http pool
+        """
+        return self.get_resource(*args, **kwargs).meta.client
+
+
+connection_manager = ConnectionManager()
+
 
 class Auth(object):
     """
@@ -27,14 +163,7 @@ class Auth(object):
         """
         self.access_key = user_info["access_key"]
         self.secret_key = user_info["secret_key"]
-        if ssh_con is not None:
-            stdin, stdout, stderr = ssh_con.exec_command("hostname")
-            self.hostname = stdout.readline().strip()
-            self.port = utils.get_radosgw_port_no(ssh_con)
-        else:
-            self.hostname = socket.gethostname()
-            self.port = utils.get_radosgw_port_no()
-        self.ip = socket.gethostbyname(self.hostname)
+        self.hostname, self.ip, self.port = connection_manager.get_endpoint(ssh_con)
         self.ssl = extra_kwargs.get("ssl", False)
         self.endpoint_url = (
             "https://{}:{}".format(self.ip, self.port)
@@ -62,19 +191,13 @@ class Auth(object):
             rgw: Connection status
         """
         log.info("performing authentication")
-        additional_config = Config(
-            signature_version=config.get("signature_version", None)
-        )
-
-        rgw = boto3.resource(
-            "s3",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            endpoint_url=self.endpoint_url,
-            use_ssl=self.ssl,
-            verify=False,
-            config=additional_config,
-            aws_session_token=self.session_token if self.session_token else None,
+        rgw = connection_manager.get_resource(
+            self.access_key,
+            self.secret_key,
+            self.endpoint_url,
+            ssl=self.ssl,
+            session_token=self.session_token,
+            **config,
         )
 
         log.info("connected")
@@ -91,17 +214,13 @@ class Auth(object):
             rgw: Connection status
         """
         log.info("performing authentication using client module")
-        additional_config = Config(
-            signature_version=config.get("signature_version", None)
-        )
-        rgw = boto3.client(
-            "s3",
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            endpoint_url=self.endpoint_url,
-            config=additional_config,
-            verify=False,
-            aws_session_token=self.session_token if self.session_token else None,
+        rgw = connection_manager.get_client(
+            self.access_key,
+            self.secret_key,
+            self.endpoint_url,
+            ssl=self.ssl,
+            session_token=self.session_token,
+            **config,
         )
         return rgw
 
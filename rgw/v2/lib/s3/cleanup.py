@@ -0,0 +1,144 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from v2.lib.exceptions import TestExecError
+
+log = logging.getLogger()
+
+# max keys accepted by a single DeleteObjects request
+BATCH_SIZE = 1000
+DEFAULT_WORKERS = 8
+
+
+def gen_keys(client, bucket_name, prefix="", versions=False, key=None):
+    """
+    Yields pages of keys of the bucket, as accepted by DeleteObjects
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): name of the bucket
+        prefix(char): only keys with this prefix
+        versions(bool): list every version and delete marker instead of current keys
+        key(char): only this exact key, the prefix also matches longer keys
+
+    Returns:
+        generator of lists of {"Key": key} or {"Key": key, "VersionId": version_id}
+    """
+    if versions:
+        paginator = client.get_paginator("list_object_versions")
+    else:
+        paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=prefix, PaginationConfig={"PageSize": BATCH_SIZE}
+    ):
+        if versions:
+            keys = [
+                {"Key": v["Key"], "VersionId": v["VersionId"]}
+                for v in page.get("Versions", []) + page.get("DeleteMarkers", [])
+            ]
+        else:
+            keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+        if key is not None:
+            keys = [x for x in keys if x["Key"] == key]
+        for i in range(0, len(keys), BATCH_SIZE):
+            yield keys[i : i + BATCH_SIZE]
+
+
+def delete_batch(client, bucket_name, keys):
+    """
+    Deletes up to 1000 keys with a single DeleteObjects request
+
+    Returns:
+        (deleted keys, errors)
+    """
+    response = client.delete_objects(
+        Bucket=bucket_name, Delete={"Objects": keys, "Quiet": False}
+    )
+    return response.get("Deleted", []), response.get("Errors", [])
+
+
+def empty_bucket(
+    client, bucket_name, prefix="", versions=True, workers=DEFAULT_WORKERS, key=None
+):
+    """
+    Deletes all keys of the bucket in DeleteObjects batches across a pool of workers
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): name of the bucket
+        prefix(char): only keys with this prefix
+        versions(bool): delete every version and delete marker as well
+        workers(int): number of batches deleted in parallel
+        key(char): delete only this exact key
+
+    Returns:
+        list of deleted keys, {"Key": .., "VersionId": ..}
+    """
+    if key is not None:
+        prefix = key
+    log.info(f"deleting keys in bucket: {bucket_name}, prefix: '{prefix}'")
+    start = time.time()
+    deleted, errors = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(delete_batch, client, bucket_name, keys)
+            for keys in gen_keys(client, bucket_name, prefix, versions, key)
+            if keys
+        ]
+        for future in futures:
+            batch_deleted, batch_errors = future.result()
+            deleted.extend(batch_deleted)
+            errors.extend(batch_errors)
+    elapsed = time.time() - start
+    log.info(
+        f"deleted {len(deleted)} keys from {bucket_name} in {elapsed:.2f}s "
+        f"({len(deleted) / elapsed if elapsed else 0:.1f} keys/s)"
+    )
+    if errors:
+        for error in errors[:10]:
+            log.error(f"delete failed: {error}")
+        raise TestExecError(f"deletion failed for {len(errors)} keys in {bucket_name}")
+    return deleted
+
+
+def is_bucket_empty(client, bucket_name, versions=False):
+    """
+    Checks if the bucket has no keys (and no versions if versions is True)
+    """
+    if versions:
+        page = client.list_object_versions(Bucket=bucket_name, MaxKeys=1)
+        return not page.get("Versions") and not page.get("DeleteMarkers")
+    return not client.list_objects_v2(Bucket=bucket_name, MaxKeys=1).get("Contents")
+
+
+def wait_until_empty(
+    client, bucket_name, versions=False, timeout=30, delay=1, max_delay=8
+):
+    """
+    Polls with exponential backoff until the bucket is empty
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): name of the bucket
+        versions(bool): also wait for versions and delete markers to go
+        timeout(int): seconds to wait at most
+        delay(int): first interval, doubled after every poll up to max_delay
+
+    Returns:
+        True if the bucket got empty, else False
+    """
+    end_time = time.time() + timeout
+    while True:
+        if is_bucket_empty(client, bucket_name, versions):
+            log.info(f"bucket {bucket_name} is empty")
+            return True
+        if time.time() + delay > end_time:
+            return False
+        log.info(f"bucket {bucket_name} not empty yet, retrying in {delay}s")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
@@ -0,0 +1,165 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import collections
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import v2.utils.utils as utils
+from v2.lib import admin_stream
+from v2.lib.exceptions import TestExecError
+
+log = logging.getLogger()
+
+DEFAULT_WORKERS = 16
+DEFAULT_INTERVAL = 10
+DEFAULT_TIMEOUT = 3600
+
+
+def seed_bucket(
+    client, bucket_name, objects, versions=1, prefix="", size=1024, workers=None
+):
+    """
+    Uploads objects x versions small objects to the bucket, concurrently
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): name of the bucket
+        objects(int): number of keys
+        versions(int): versions written per key, for a versioned bucket
+        prefix(char): key prefix, ex: the prefix of the lc rule
+        size(int): object size in bytes
+
+    Returns:
+        number of objects written, versions included
+    """
+    body = b"l" * size
+
+    def put_versions(key):
+        for _ in range(versions):
+            client.put_object(Bucket=bucket_name, Key=key, Body=body)
+
+    keys = [f"{prefix}{i}" for i in range(objects)]
+    errors = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+        for key, future in [(key, pool.submit(put_versions, key)) for key in keys]:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append((key, e))
+    elapsed = time.perf_counter() - start
+    written = objects * versions
+    log.info(
+        f"seeded {written} objects in {bucket_name} in {elapsed:.2f} secs "
+        f"({written / elapsed if elapsed else 0:.1f} objects/sec)"
+    )
+    if errors:
+        raise TestExecError(
+            f"failed to seed {len(errors)} keys in {bucket_name}: {errors[:5]}"
+        )
+    return written
+
+
+def get_object_counts(bucket_names):
+    """
+    Returns num_objects of each bucket from 'radosgw-admin bucket stats'
+    """
+    cmds = [f"radosgw-admin bucket stats --bucket={name}" for name in bucket_names]
+    counts = {}
+    for name, out in zip(bucket_names, utils.exec_shell_cmds(cmds)):
+        if out is False:
+            raise TestExecError(f"bucket stats failed for {name}")
+        usage = json.loads(out)["usage"]
+        counts[name] = usage.get("rgw.main", {}).get("num_objects", 0)
+    return counts
+
+
+def get_lc_status(bucket_names):
+    """
+    Returns the 'radosgw-admin lc list' status of each bucket,
+    ex: {"bkt1": "PROCESSING"}
+    """
+    wanted = set(bucket_names)
+    statuses = {}
+    for entry in admin_stream.stream_json("radosgw-admin lc list"):
+        # newer releases list the bucket as ":<name>:<marker>"
+        name = entry["bucket"]
+        if name.startswith(":"):
+            name = name.split(":")[1]
+        if name in wanted:
+            statuses[name] = entry["status"]
+    return statuses
+
+
+def measure_expiration(
+    bucket_names,
+    initial,
+    target=0,
+    interval=DEFAULT_INTERVAL,
+    timeout=DEFAULT_TIMEOUT,
+):
+    """
+    Samples lc status and object counts of the buckets at a fixed interval
+    until the lc rules brought the object count down to target
+
+    Parameters:
+        bucket_names(list): buckets with an lc rule set
+        initial(int): objects in the buckets when the rule was set
+        target(int): objects left once lc is done, ex: the current versions
+            for a NoncurrentVersionExpiration rule
+        interval(int): seconds between samples
+        timeout(int): seconds to wait at most
+
+    Returns:
+        dict of expired objects, duration, expirations/sec and the samples
+    """
+    start = time.time()
+    samples = []
+
+    def check():
+        counts = get_object_counts(bucket_names)
+        statuses = get_lc_status(bucket_names)
+        remaining = sum(counts.values())
+        sample = {
+            "elapsed": round(time.time() - start, 3),
+            "remaining": remaining,
+            "status": dict(collections.Counter(statuses.values())),
+        }
+        if samples:
+            previous = samples[-1]
+            sample["rate"] = round(
+                (previous["remaining"] - remaining)
+                / (sample["elapsed"] - previous["elapsed"]),
+                2,
+            )
+        samples.append(sample)
+        log.info(f"lc progress: {sample}")
+        return remaining <= target
+
+    completed = utils.poll(check, timeout, delay=interval, max_delay=interval)
+    expired = initial - samples[-1]["remaining"]
+    duration = samples[-1]["elapsed"]
+    # throughput from the first expiration, lc threads only start on their schedule
+    first = next((s["elapsed"] for s in samples if s["remaining"] < initial), duration)
+    active = duration - first
+    result = {
+        "buckets": len(bucket_names),
+        "initial": initial,
+        "expired": expired,
+        "completed": completed,
+        "duration": duration,
+        "first_expiration": first,
+        "expirations_per_sec": round(expired / duration, 2) if duration else 0,
+        "active_expirations_per_sec": round(expired / active, 2) if active else 0,
+        "peak_expirations_per_sec": max(s.get("rate", 0) for s in samples),
+        "samples": samples,
+    }
+    log.info(
+        f"lc expired {expired} of {initial} objects in {duration} secs, "
+        f"{result['expirations_per_sec']} expirations/sec"
+    )
+    return result
@@ -6,6 +6,7 @@ import json
 import logging
 
 import v2.utils.utils as utils
+from v2.lib import admin_stream
 
 log = logging.getLogger()
 
@@ -20,21 +21,21 @@ def validate_prefix_rule(bucket, config):
     """
     log.info("verification starts")
     op = utils.exec_shell_cmd("radosgw-admin bucket stats --bucket=%s" % bucket.name)
-    op2 = utils.exec_shell_cmd("radosgw-admin bucket list --bucket=%s" % bucket.name)
     json_doc = json.loads(op)
-    json_doc2 = json.loads(op2)
     objects = json_doc["usage"]["rgw.main"]["num_objects"]
     objs_total = (config.test_ops["version_count"]) * (config.objects_count)
     objs_ncurr = (config.test_ops["version_count"]) * (config.objects_count) - (
         config.objects_count
     )
     objs_diff = objs_total - objs_ncurr
-    c1 = 0
     if objects == objs_total:
-        for i, entry in enumerate(json_doc2):
-            print(entry["tag"])
-            if entry["tag"] == "delete-marker":
-                c1 = c1 + 1
+        # bucket list is streamed, large buckets are counted in constant memory
+        c1 = sum(
+            1
+            for entry in admin_stream.bucket_list(bucket.name)
+            if entry["tag"] == "delete-marker"
+        )
+        log.info(f"delete markers in bucket: {c1}")
         if c1 != (config.objects_count):
             raise AssertionError(
                 "Lifecycle expiration of current object version for prefix filter failed"
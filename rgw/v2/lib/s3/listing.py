@@ -0,0 +1,137 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import logging
+import time
+
+from v2.lib import admin_stream
+from v2.utils.latency import summarize
+
+log = logging.getLogger()
+
+DEFAULT_MAX_KEYS = (1000,)
+DEFAULT_REPETITIONS = 3
+
+
+def list_via_boto(client, bucket_name, max_keys=1000, prefix="", delimiter=""):
+    """
+    Lists the whole bucket with the list_objects_v2 paginator
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): name of the bucket
+        max_keys(int): keys per page
+        prefix(char): list only keys with this prefix
+        delimiter(char): ex: / to list pseudo directories as common prefixes
+
+    Returns:
+        (number of keys and common prefixes listed, list of page latencies)
+    """
+    paginator = client.get_paginator("list_objects_v2")
+    pages = iter(
+        paginator.paginate(
+            Bucket=bucket_name,
+            Prefix=prefix,
+            Delimiter=delimiter,
+            PaginationConfig={"PageSize": max_keys},
+        )
+    )
+    objects, latencies = 0, []
+    while True:
+        start = time.perf_counter()
+        page = next(pages, None)
+        if page is None:
+            break
+        latencies.append(time.perf_counter() - start)
+        objects += len(page.get("Contents", [])) + len(page.get("CommonPrefixes", []))
+    return objects, latencies
+
+
+def list_via_radosgw(bucket_name, max_entries=1000, ordered=True):
+    """
+    Lists the whole bucket with 'radosgw-admin bucket list', following the marker
+
+    Parameters:
+        bucket_name(char): name of the bucket
+        max_entries(int): entries per command
+        ordered(bool): False to list with --allow-unordered
+
+    Returns:
+        (number of entries listed, list of page latencies)
+    """
+    cmd = f"radosgw-admin bucket list --bucket={bucket_name}"
+    if not ordered:
+        cmd += " --allow-unordered"
+    latencies = []
+    objects = sum(
+        1 for _ in admin_stream.paginate(cmd, max_entries, latencies=latencies)
+    )
+    return objects, latencies
+
+
+def benchmark(
+    bucket_name,
+    client=None,
+    method="boto",
+    ordered=True,
+    max_keys=DEFAULT_MAX_KEYS,
+    repetitions=DEFAULT_REPETITIONS,
+    prefix="",
+    delimiter="",
+):
+    """
+    Times full paginated listings of the bucket for every page size
+
+    Parameters:
+        bucket_name(char): name of the bucket
+        client: s3 client, needed for method boto
+        method(char): boto or radosgw-admin
+        ordered(bool): ordered or unordered listing, radosgw-admin only
+        max_keys(list): page sizes to sweep
+        repetitions(int): full listings per page size
+        prefix(char), delimiter(char): listing filters, boto only
+
+    Returns:
+        list with one result per page size, ex:
+        {"bucket": .., "method": "boto", "ordered": True, "max_keys": 1000,
+         "repetitions": 3, "objects": 100000,
+         "page_latency": {"count": .., "p50": .., "p95": .., "p99": .., ..},
+         "listing_time": {..}, "objects_per_sec": 12345.6}
+    """
+    results = []
+    for each_max_keys in max_keys:
+        page_latencies, listing_times, objects = [], [], 0
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            if method == "boto":
+                objects, latencies = list_via_boto(
+                    client, bucket_name, each_max_keys, prefix, delimiter
+                )
+            else:
+                objects, latencies = list_via_radosgw(
+                    bucket_name, each_max_keys, ordered
+                )
+            listing_times.append(time.perf_counter() - start)
+            page_latencies.extend(latencies)
+        total_time = sum(listing_times)
+        result = {
+            "bucket": bucket_name,
+            "method": method,
+            "ordered": ordered,
+            "max_keys": each_max_keys,
+            "repetitions": repetitions,
+            "objects": objects,
+            "page_latency": summarize(page_latencies),
+            "listing_time": summarize(listing_times),
+            "objects_per_sec": round(objects * repetitions / total_time, 2)
+            if total_time
+            else 0,
+        }
+        log.info(
+            f"{method} listing of {objects} objects in {bucket_name} with max_keys {each_max_keys}: "
+            f"p50 {result['page_latency']['p50']}s p95 {result['page_latency']['p95']}s "
+            f"p99 {result['page_latency']['p99']}s per page, {result['objects_per_sec']} objects/sec"
+        )
+        results.append(result)
+    return results
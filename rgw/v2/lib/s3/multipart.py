@@ -0,0 +1,191 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import io
+import logging
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from v2.lib.exceptions import TestExecError
+from v2.utils import checksum
+
+log = logging.getLogger()
+
+MB = 1024 * 1024
+DEFAULT_SPLIT_SIZE = 5
+DEFAULT_CONCURRENCY = 4
+
+
+def split_size_in_bytes(split_size):
+    """
+    Converts the configured split size to bytes
+
+    Parameters:
+        split_size(int or char): size in MB, ex: 5, or with unit, ex: 100M, 1G
+
+    Returns:
+        split size in bytes
+    """
+    units = {"K": 1024, "M": MB, "G": 1024 * MB}
+    if isinstance(split_size, str) and split_size[-1].upper() in units:
+        return int(split_size[:-1]) * units[split_size[-1].upper()]
+    return int(split_size) * MB
+
+
+class FileSlice(io.RawIOBase):
+    """
+    Read-only file like view over a byte range of a mmap.
+
+    Data is copied only as botocore reads it, so a part never has to be
+    written to disk or held in memory as a whole. seek/tell are supported so
+    that botocore can compute the length and rewind on retries.
+    """
+
+    def __init__(self, buf, offset, length):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+        self.pos = 0
+
+    def __len__(self):
+        return self.length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = self.length + offset
+        self.pos = max(0, min(self.pos, self.length))
+        return self.pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length - self.pos
+        size = min(size, self.length - self.pos)
+        start = self.offset + self.pos
+        self.pos += size
+        return self.buf[start : start + size]
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+def part_ranges(file_size, part_size):
+    """
+    Returns (part_number, offset, length) for every part of the file
+
+    Parameters:
+        file_size(int): size of the file in bytes
+        part_size(int): size of each part in bytes
+    """
+    if file_size == 0:
+        return [(1, 0, 0)]
+    return [
+        (part_number, offset, min(part_size, file_size - offset))
+        for part_number, offset in enumerate(range(0, file_size, part_size), 1)
+    ]
+
+
+def upload_parts(mpu, fname, split_size=DEFAULT_SPLIT_SIZE, concurrency=None):
+    """
+    Uploads the file as parts of an initiated multipart upload and completes it
+
+    Parts are read as byte ranges of a mmap of the file and uploaded
+    concurrently through a bounded thread pool using the (thread safe) client
+    of the multipart upload. The ETag of the completed object is verified.
+
+    Parameters:
+        mpu: s3.MultipartUpload returned by initiate_multipart_upload
+        fname(char): file to upload
+        split_size(int or char): part size in MB, ex: 5 or 100M
+        concurrency(int): number of parts uploaded in parallel
+
+    Returns:
+        list of parts, ordered by part number, as sent to complete
+    """
+    part_size = split_size_in_bytes(split_size)
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    client = mpu.meta.client
+    file_size = os.stat(fname).st_size
+    ranges = part_ranges(file_size, part_size)
+    log.info(
+        f"uploading {fname} in {len(ranges)} parts of {part_size} bytes, concurrency: {concurrency}"
+    )
+
+    def upload_part(buf, part_number, offset, length):
+        response = client.upload_part(
+            Bucket=mpu.bucket_name,
+            Key=mpu.object_key,
+            UploadId=mpu.id,
+            PartNumber=part_number,
+            Body=FileSlice(buf, offset, length),
+        )
+        status = response["ResponseMetadata"]["HTTPStatusCode"]
+        if status != 200:
+            raise TestExecError(f"part {part_number} uploading failed: {status}")
+        log.info(f"part uploaded: {part_number}")
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    with open(fname, "rb") as fp:
+        buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if file_size else b""
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(upload_part, buf, *each_range)
+                    for each_range in ranges
+                ]
+                parts = [future.result() for future in futures]
+        finally:
+            if file_size:
+                buf.close()
+    parts.sort(key=lambda part: part["PartNumber"])
+    log.info("all parts upload completed")
+    mpu.complete(MultipartUpload={"Parts": parts})
+    log.info(f"multipart upload complete for key: {mpu.object_key}")
+    verify_etag(client, mpu.bucket_name, mpu.object_key, fname, part_size)
+    return parts
+
+
+def verify_etag(client, bucket_name, key, fname, part_size):
+    """
+    Checks the ETag of the completed multipart object against the md5 of the
+    part md5s of the file
+
+    Parameters:
+        client: s3 client
+        bucket_name(char): bucket of the object
+        key(char): object name
+        fname(char): file uploaded
+        part_size(int): part size in bytes
+    """
+    try:
+        head = client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        # ex: a bucket policy allowing the upload but not reads
+        log.info(f"unable to head {bucket_name}/{key}, ETag not verified: {e}")
+        return
+    if head.get("ServerSideEncryption") or head.get("SSECustomerAlgorithm"):
+        log.info(f"{bucket_name}/{key} is encrypted, ETag not verified")
+        return
+    expected = checksum.multipart_etag(fname, part_size)
+    etag = head["ETag"].strip('"')
+    if etag != expected:
+        raise TestExecError(
+            f"ETag of {bucket_name}/{key}: {etag}, expected: {expected}"
+        )
+    log.info(f"multipart ETag matched: {etag}")
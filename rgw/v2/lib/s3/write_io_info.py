@@ -3,12 +3,10 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
-from v2.utils.utils import FileOps
+from v2.lib.io_ledger import IO_INFO_FNAME, get_ledger
 
 log = logging.getLogger()
 
-IO_INFO_FNAME = "io_info.yaml"
-
 EXEC_INFO_STRUCTURE = {
     "obj": None,
     "resource": None,
@@ -84,12 +82,12 @@ class TenantInfo(object):
 
 class AddIOInfo(object):
     """
-    This class creates yaml with fname provided
+    This class records IO information in the io ledger backing the yaml with fname provided
     """
 
     def __init__(self, yaml_fname=IO_INFO_FNAME):
         self.yaml_fname = yaml_fname
-        self.file_op = FileOps(self.yaml_fname, type="yaml")
+        self.ledger = get_ledger(self.yaml_fname)
 
 
 class IOInfoInitialize(AddIOInfo):
@@ -109,7 +107,7 @@ class IOInfoInitialize(AddIOInfo):
             data
         """
         log.info("initial_data: %s" % (data))
-        self.file_op.add_data(data)
+        self.ledger.record("initialize", data=data)
 
 
 class AddUserInfo(AddIOInfo):
@@ -129,11 +127,7 @@ class AddUserInfo(AddIOInfo):
             user:
         """
         log.info("got user info structure: %s" % user)
-        yaml_data = self.file_op.get_data()
-        log.info("got yaml data %s" % yaml_data)
-        yaml_data["users"].append(user)
-        log.info("data to add: %s" % yaml_data)
-        self.file_op.add_data(yaml_data)
+        self.ledger.record("add_user", user=user)
 
     def set_user_deleted(self, access_key):
         """
@@ -142,14 +136,7 @@ class AddUserInfo(AddIOInfo):
             access_key:
         """
         log.info("Setting user as deleted")
-        yaml_data = self.file_op.get_data()
-        indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                indx = i
-                break
-        yaml_data["users"][indx]["deleted"] = True
-        self.file_op.add_data(yaml_data)
+        self.ledger.record("set_user_deleted", access_key=access_key)
 
 
 class BucketIoInfo(AddIOInfo):
@@ -171,14 +158,7 @@ class BucketIoInfo(AddIOInfo):
             access_key:
             bucket_info:
         """
-        yaml_data = self.file_op.get_data()
-        indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                indx = i
-                break
-        yaml_data["users"][indx]["bucket"].append(bucket_info)
-        self.file_op.add_data(yaml_data)
+        self.ledger.record("add_bucket", access_key=access_key, bucket=bucket_info)
 
     def set_bucket_deleted(self, bucket_name):
         """
@@ -188,17 +168,7 @@ class BucketIoInfo(AddIOInfo):
             bucket_name:
         """
         log.info(f"marking bucket '{bucket_name}' as deleted")
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        for i, _ in enumerate(yaml_data["users"]):
-            for j, k in enumerate(yaml_data["users"][i]["bucket"]):
-                if k["name"] == bucket_name:
-                    bucket_indx = j
-                    access_key_indx = i
-                    break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["deleted"] = True
-        self.file_op.add_data(yaml_data)
+        self.ledger.record("set_bucket_deleted", bucket_name=bucket_name)
 
     def add_versioning_status(self, access_key, bucket_name, versioning_status):
         """
@@ -208,21 +178,12 @@ class BucketIoInfo(AddIOInfo):
             bucket_name:
             versioning_status:
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx][
-            "curr_versioning_status"
-        ] = versioning_status
-        self.file_op.add_data(yaml_data)
+        self.ledger.record(
+            "set_bucket_versioning",
+            access_key=access_key,
+            bucket_name=bucket_name,
+            versioning_status=versioning_status,
+        )
 
     def add_properties(self, access_key, bucket_name, properties):
         """
@@ -232,21 +193,12 @@ class BucketIoInfo(AddIOInfo):
             bucket_name:
             properties:
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["properties"].append(
-            properties
+        self.ledger.record(
+            "add_bucket_properties",
+            access_key=access_key,
+            bucket_name=bucket_name,
+            properties=properties,
         )
-        self.file_op.add_data(yaml_data)
 
 
 class KeyIoInfo(AddIOInfo):
@@ -266,21 +218,9 @@ class KeyIoInfo(AddIOInfo):
             bucket_name: Name of the bucket
             key_info: key information
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"].append(
-            key_info
+        self.ledger.record(
+            "add_key", access_key=access_key, bucket_name=bucket_name, key=key_info
         )
-        self.file_op.add_data(yaml_data)
 
     def set_key_deleted(self, bucket_name, key_name):
         """
@@ -291,26 +231,9 @@ class KeyIoInfo(AddIOInfo):
             key_name: name of the key
         """
         log.info(f"marking key '{key_name}' in bucket '{bucket_name}' as deleted")
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        key_indx = None
-        for i, _ in enumerate(yaml_data["users"]):
-            for j, k in enumerate(yaml_data["users"][i]["bucket"]):
-                if k["name"] == bucket_name:
-                    bucket_indx = j
-                    access_key_indx = i
-                    break
-        for i, k in enumerate(
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"]
-        ):
-            if k["name"] == key_name:
-                key_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"][key_indx][
-            "deleted"
-        ] = True
-        self.file_op.add_data(yaml_data)
+        self.ledger.record(
+            "set_key_deleted", bucket_name=bucket_name, key_name=key_name
+        )
 
     def add_properties(self, access_key, bucket_name, key_name, properties):
         """
@@ -322,28 +245,13 @@ class KeyIoInfo(AddIOInfo):
             key_name: name of the key
             properties: properties
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        key_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        for i, k in enumerate(
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"]
-        ):
-            if k["name"] == key_name:
-                key_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"][key_indx][
-            "properties"
-        ].append(properties)
-        self.file_op.add_data(yaml_data)
+        self.ledger.record(
+            "add_key_properties",
+            access_key=access_key,
+            bucket_name=bucket_name,
+            key_name=key_name,
+            properties=properties,
+        )
 
     def add_versioning_info(self, access_key, bucket_name, key_name, versioning_info):
         """
@@ -355,28 +263,13 @@ class KeyIoInfo(AddIOInfo):
             key_name: name of the key
             versioning_info: versioning information
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        key_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        for i, k in enumerate(
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"]
-        ):
-            if k["name"] == key_name:
-                key_indx = i
-                break
-        yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"][key_indx][
-            "versioning_info"
-        ].append(versioning_info)
-        self.file_op.add_data(yaml_data)
+        self.ledger.record(
+            "add_key_versioning_info",
+            access_key=access_key,
+            bucket_name=bucket_name,
+            key_name=key_name,
+            versioning_info=versioning_info,
+        )
 
     def delete_version_info(self, access_key, bucket_name, key_name, version_id):
         """
@@ -388,39 +281,13 @@ class KeyIoInfo(AddIOInfo):
             key_name: name of the key
             version_id: version id of the object
         """
-        yaml_data = self.file_op.get_data()
-        access_key_indx = None
-        bucket_indx = None
-        key_indx = None
-        version_info_indx = None
-        for i, k in enumerate(yaml_data["users"]):
-            if k["access_key"] == access_key:
-                access_key_indx = i
-                break
-        for i, k in enumerate(yaml_data["users"][access_key_indx]["bucket"]):
-            if k["name"] == bucket_name:
-                bucket_indx = i
-                break
-        for i, k in enumerate(
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"]
-        ):
-            if k["name"] == key_name:
-                key_indx = i
-                break
-        # print 'versioing info'
-        # print yaml_data['users'][access_key_indx]['bucket'][bucket_indx]['keys'][key_indx]['versioning_info']
-        for i, k in enumerate(
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"][
-                key_indx
-            ]["versioning_info"]
-        ):
-            if k["version_id"] == version_id:
-                version_info_indx = i
-                break
-            yaml_data["users"][access_key_indx]["bucket"][bucket_indx]["keys"][
-                key_indx
-            ]["versioning_info"].pop(version_info_indx)
-        self.file_op.add_data(yaml_data)
+        self.ledger.record(
+            "delete_key_version_info",
+            access_key=access_key,
+            bucket_name=bucket_name,
+            key_name=key_name,
+            version_id=version_id,
+        )
 
 
 def logioinfo(func):
@@ -25,8 +25,7 @@ class Auth(object):
         """
         self.secret_key = user_info["key"]
         if ssh_con is not None:
-            stdin, stdout, stderr = ssh_con.exec_command("hostname")
-            self.hostname = stdout.readline().strip()
+            self.hostname = ssh_con.run("hostname")[1].strip()
             self.port = utils.get_radosgw_port_no(ssh_con)
         else:
             self.hostname = socket.gethostname()
@@ -34,11 +33,13 @@ class Auth(object):
         self.is_secure = is_secure
         self.user_id = user_info["user_id"]
 
-    def do_auth(self):
+    def do_auth(self, **kwargs):
         """
         This function is to perform authentication using swift
 
         Parameters:
+            kwargs: extra arguments of swiftclient.Connection, ex: preauthurl
+                and preauthtoken to reuse the token of another connection
 
         Returns:
             rgw: returns the connection details
@@ -54,5 +55,6 @@ class Auth(object):
             key=self.secret_key,
             insecure=True,
             authurl=f"{proto}://{self.hostname}:{self.port}/auth",
+            **kwargs,
         )
         return rgw
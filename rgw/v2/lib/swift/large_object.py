@@ -0,0 +1,241 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from v2.lib.exceptions import TestExecError
+from v2.utils.latency import LatencyRecorder
+
+log = logging.getLogger()
+
+MANIFEST_TYPES = ("slo", "dlo")
+CHUNK_SIZE = 1024 * 1024
+
+
+class SegmentReader(object):
+    """
+    Binary file like view of size bytes of a file from offset, computing the
+    md5 of what is read, so a segment is streamed without a copy on disk
+    """
+
+    def __init__(self, fname, offset, size):
+        self.fp = open(fname, "rb")
+        self.offset = offset
+        self.size = size
+        self.seek(0)
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos):
+        # swiftclient seeks back to the start to retry an upload
+        if pos != 0:
+            raise ValueError("a segment can only be read again from its start")
+        self.fp.seek(self.offset)
+        self.pos = 0
+        self.md5 = hashlib.md5()
+
+    def read(self, size=-1):
+        remaining = self.size - self.pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self.fp.read(size)
+        self.md5.update(data)
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        self.fp.close()
+
+
+class LargeObjectUploader(object):
+    """
+    Uploads a file as a swift large object: the segments are streamed from
+    their offsets in the file and uploaded concurrently, then a static (slo)
+    or dynamic (dlo) manifest is written and its combined ETag verified.
+    The functions in this class are
+    1. upload(): upload the segments and the manifest of a file
+    2. summary(): latency and throughput of the segment and manifest uploads
+    """
+
+    def __init__(self, auth, workers=4):
+        """
+        Parameters:
+            auth(v2.lib.swift.auth.Auth): authentication of the swift user
+            workers(int): segments uploaded at a time
+        """
+        self.auth = auth
+        self.workers = workers
+        self.latency = LatencyRecorder()
+        self.local = threading.local()
+        self.preauth = None
+        self.lock = threading.Lock()
+        self.segment_bytes = 0
+        self.segment_time = 0
+
+    def connection(self):
+        """
+        Returns the swift connection of the calling thread, the workers reuse
+        the token of the first authentication
+        """
+        if getattr(self.local, "rgw", None) is None:
+            with self.lock:
+                if self.preauth is None:
+                    rgw = self.auth.do_auth()
+                    url, token = rgw.get_auth()
+                    self.preauth = dict(preauthurl=url, preauthtoken=token)
+            self.local.rgw = self.auth.do_auth(**self.preauth)
+        return self.local.rgw
+
+    def upload_segment(self, container, name, fname, offset, size, headers=None):
+        """
+        Uploads size bytes of fname from offset and checks the returned ETag
+
+        Returns:
+            dict with the path, etag and size_bytes of the segment
+        """
+        reader = SegmentReader(fname, offset, size)
+        start = time.perf_counter()
+        try:
+            etag = self.connection().put_object(
+                container,
+                name,
+                contents=reader,
+                content_length=size,
+                chunk_size=CHUNK_SIZE,
+                content_type="application/octet-stream",
+                headers=headers,
+            )
+        finally:
+            reader.close()
+        duration = time.perf_counter() - start
+        self.latency.record("segment", duration)
+        with self.lock:
+            self.segment_bytes += size
+        md5 = reader.md5.hexdigest()
+        if etag != md5:
+            raise TestExecError(f"ETag of segment {name}: {etag}, expected: {md5}")
+        return {"path": f"/{container}/{name}", "etag": md5, "size_bytes": size}
+
+    def upload(
+        self,
+        container,
+        obj_name,
+        fname,
+        segment_size,
+        manifest="slo",
+        segment_container=None,
+        headers=None,
+    ):
+        """
+        Uploads fname as a large object
+
+        Parameters:
+            container(char): container of the manifest
+            obj_name(char): name of the object
+            fname(char): file to upload
+            segment_size(int): size of the segments in bytes
+            manifest(char): slo or dlo
+            segment_container(char): container of the segments, defaults to
+                the container of the manifest, segments are named <obj_name>/<index>
+            headers(dict): headers of the manifest and the segments
+
+        Returns:
+            list of the segments, dicts with path, etag and size_bytes
+        """
+        if manifest not in MANIFEST_TYPES:
+            raise TestExecError(f"manifest should be one of {MANIFEST_TYPES}")
+        segment_container = segment_container or container
+        size = os.stat(fname).st_size
+        offsets = list(range(0, size, segment_size)) or [0]
+        log.info(
+            f"uploading {fname} of {size} bytes as {len(offsets)} segments of "
+            f"{segment_size} bytes with {self.workers} workers, {manifest} manifest"
+        )
+
+        def upload_at(index):
+            offset = offsets[index]
+            # zero padded, for the segments of a dlo to be listed in order
+            name = f"{obj_name}/{index:08d}"
+            return self.upload_segment(
+                segment_container,
+                name,
+                fname,
+                offset,
+                min(segment_size, size - offset),
+                headers,
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            segments = list(pool.map(upload_at, range(len(offsets))))
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.segment_time += elapsed
+        log.info(
+            f"{len(segments)} segments uploaded in {elapsed:.3f} secs, "
+            f"{size / elapsed / 1024 / 1024 if elapsed else 0:.2f} MB/sec"
+        )
+        self.put_manifest(container, obj_name, segments, manifest, headers)
+        self.verify_etag(container, obj_name, segments)
+        return segments
+
+    def put_manifest(self, container, obj_name, segments, manifest, headers=None):
+        rgw = self.connection()
+        headers = dict(headers or {})
+        start = time.perf_counter()
+        if manifest == "slo":
+            rgw.put_object(
+                container,
+                obj_name,
+                contents=json.dumps(segments),
+                query_string="multipart-manifest=put",
+                headers=headers,
+            )
+        else:
+            prefix = segments[0]["path"].lstrip("/").rsplit("/", 1)[0]
+            headers["X-Object-Manifest"] = f"{prefix}/"
+            rgw.put_object(container, obj_name, contents="", headers=headers)
+        self.latency.record("manifest", time.perf_counter() - start)
+        log.info(f"{manifest} manifest written: {container}/{obj_name}")
+
+    def verify_etag(self, container, obj_name, segments):
+        """
+        Checks the ETag of the large object, the md5 of the segment md5s
+        """
+        expected = hashlib.md5(
+            "".join(x["etag"] for x in segments).encode()
+        ).hexdigest()
+        start = time.perf_counter()
+        etag = self.connection().head_object(container, obj_name)["etag"].strip('"')
+        self.latency.record("head", time.perf_counter() - start)
+        if etag != expected:
+            raise TestExecError(
+                f"ETag of {container}/{obj_name}: {etag}, expected: {expected}"
+            )
+        log.info(f"ETag of {container}/{obj_name} matched: {etag}")
+
+    def summary(self):
+        """
+        Returns the latency of the segment, manifest and head requests and the
+        segment throughput
+        """
+        latencies = self.latency.summary()
+        segments = latencies.get("segment", {}).get("count", 0)
+        return {
+            "segments_per_sec": (
+                round(segments / self.segment_time, 2) if self.segment_time else 0
+            ),
+            "mb_per_sec": (
+                round(self.segment_bytes / self.segment_time / 1024 / 1024, 3)
+                if self.segment_time
+                else 0
+            ),
+            "latency": latencies,
+        }
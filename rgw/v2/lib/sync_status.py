@@ -2,61 +2,249 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import atexit
 import logging
+import re
 import time
 
 import v2.utils.utils as utils
 from v2.lib.exceptions import SyncFailedError
+from v2.utils.latency import LatencyRecorder
 
 log = logging.getLogger(__name__)
 
+SYNC_STATUS_CMD = "sudo radosgw-admin sync status"
+BUCKET_SYNC_STATUS_CMD = "radosgw-admin bucket sync status --bucket {}"
+
+# time taken by metadata/data and bucket sync to converge in this run
+metrics = LatencyRecorder()
+
+
+def log_metrics():
+    summary = metrics.summary()
+    if summary:
+        log.info(f"sync time to converge (seconds): {summary}")
+
+
+atexit.register(log_metrics)
+
+
+class SourceSyncStatus(object):
+    """
+    Sync state of one section of a sync status, ex: metadata sync, or data /
+    bucket sync from one source zone
+    """
+
+    def __init__(self, name, zone_id=None):
+        self.name = name
+        self.zone_id = zone_id
+        self.state = None
+        self.caught_up = False
+        self.behind = 0
+        self.behind_shards = []
+        self.recovering = 0
+        self.recovering_shards = []
+        self.is_master = False
+
+    @property
+    def lag(self):
+        """
+        Number of shards behind or recovering
+        """
+        return max(self.behind, len(self.behind_shards)) + max(
+            self.recovering, len(self.recovering_shards)
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "zone_id": self.zone_id,
+            "caught_up": self.caught_up,
+            "behind_shards": self.behind_shards,
+            "recovering_shards": self.recovering_shards,
+            "lag": self.lag,
+        }
+
+
+class SyncStatus(object):
+    """
+    Parsed output of 'radosgw-admin sync status' or 'radosgw-admin bucket sync status'
+    The functions in this class are
+    1. parse(): build from the text output
+    2. caught_up: metadata and every source are caught up
+    3. lag(): shards behind or recovering per section
+    """
+
+    SHARDS = re.compile(r"\[([0-9,\s]*)\]")
+    COUNT = re.compile(r"(\d+) shards")
+    # "<id> (<name>)" value of the realm, zonegroup and zone lines
+    ID_NAME = re.compile(r"^\S+ \(.*\)$")
+
+    def __init__(self):
+        self.realm = None
+        self.zonegroup = None
+        self.zone = None
+        self.metadata = None
+        self.sources = []
+        self.errors = []
+
+    @classmethod
+    def parse(cls, text):
+        status = cls()
+        section = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if "failed" in line or "ERROR" in line:
+                status.errors.append(line)
+            key, _, value = line.partition(" ")
+            value = value.strip()
+            # skips other lines starting with these words, ex:
+            # "zonegroup features enabled: resharding"
+            if key in ("realm", "zonegroup", "zone") and cls.ID_NAME.match(value):
+                setattr(status, key, value)
+            elif line.startswith("metadata sync"):
+                section = status.metadata = SourceSyncStatus("metadata")
+                section.state = line[len("metadata sync") :].strip()
+                section.is_master = "zone is master" in line
+                section.caught_up = section.is_master
+            elif line.startswith("data sync source:") or line.startswith("source zone"):
+                source = line.split(":", 1)[1] if ":" in line else line[11:]
+                zone_id, _, name = source.strip().partition("(")
+                zone_id = zone_id.strip()
+                section = SourceSyncStatus(name.rstrip(")") or zone_id, zone_id)
+                status.sources.append(section)
+            elif section is None:
+                continue
+            elif "is caught up with" in line:
+                section.caught_up = True
+            elif "is behind on" in line:
+                section.caught_up = False
+                section.behind = int(cls.COUNT.search(line).group(1))
+            elif line.startswith("behind shards:"):
+                section.behind_shards = cls.shard_ids(line)
+            elif "shards are recovering" in line:
+                section.recovering = int(cls.COUNT.search(line).group(1))
+            elif line.startswith("recovering shards:"):
+                section.recovering_shards = cls.shard_ids(line)
+            elif line in ("syncing", "preparing for full sync"):
+                section.state = line
+        return status
+
+    @classmethod
+    def shard_ids(cls, line):
+        match = cls.SHARDS.search(line)
+        if not match:
+            return []
+        return [int(s) for s in match.group(1).replace(",", " ").split()]
+
+    @property
+    def caught_up(self):
+        sections = self.sources + ([self.metadata] if self.metadata else [])
+        return bool(self.sources) and all(s.caught_up and s.lag == 0 for s in sections)
+
+    def lag(self):
+        """
+        Returns shards behind or recovering, per section, ex: {"metadata": 0, "primary": 3}
+        """
+        sections = ([self.metadata] if self.metadata else []) + self.sources
+        return {s.name: s.lag for s in sections}
+
+
+def get_sync_status():
+    """
+    Returns the parsed 'radosgw-admin sync status'
+    """
+    out = utils.exec_shell_cmd(SYNC_STATUS_CMD)
+    if out is False:
+        raise SyncFailedError("sync status command failed")
+    return SyncStatus.parse(out)
+
+
+def wait_till_synced(timeout=600, delay=5, max_delay=60):
+    """
+    Waits for metadata and data sync from all sources to catch up
+
+    Parameters:
+        timeout(int): seconds to wait at most
+        delay(int): first polling interval, doubled up to max_delay
+
+    Returns:
+        the last SyncStatus
+    """
+    start = time.time()
+    state = {}
+
+    def check():
+        status = state["status"] = get_sync_status()
+        if status.errors:
+            log.info("checking for any sync error")
+            utils.exec_shell_cmd("sudo radosgw-admin sync error list")
+            raise SyncFailedError("sync status is in failed or errored state!")
+        log.info(f"sync lag in shards: {status.lag()}")
+        # nothing to wait for without a data sync source
+        return status.caught_up or not status.sources
+
+    if utils.poll(check, timeout, delay, max_delay):
+        elapsed = time.time() - start
+        metrics.record("sync status", elapsed)
+        log.info(f"sync caught up in {elapsed:.1f} secs")
+    return state["status"]
+
 
 def sync_status(retry=10, delay=60):
     """
-    verify multisite sync status
+    verify multisite sync status, waiting up to retry * delay secs for sync
+    to catch up
     """
     log.info("check sync status")
-    cmd = "sudo radosgw-admin sync status"
-    check_sync_status = utils.exec_shell_cmd(cmd)
-
-    # check for 'failed' or 'ERROR' in sync status.
-    if "failed" in check_sync_status or "ERROR" in check_sync_status:
-        log.info("checking for any sync error")
-        cmd = "sudo radosgw-admin sync error list"
-        sync_error_list = utils.exec_shell_cmd(cmd)
-        raise SyncFailedError("sync status is in failed or errored state!")
-    else:
-        log.info("No errors or failures in sync status")
-
-    log.info(
-        f"check if sync is in progress, if sync is in progress retry {retry} times with {delay}secs of sleep between each retry"
-    )
-    if "behind" in check_sync_status or "recovering" in check_sync_status:
-        log.info("sync is in progress")
-        log.info(f"sleep of {delay} secs for sync to complete")
-        for retry_count in range(retry):
-            time.sleep(delay)
-            cmd = "sudo radosgw-admin sync status"
-            check_sync_status = utils.exec_shell_cmd(cmd)
-            if "behind" in check_sync_status or "recovering" in check_sync_status:
-                log.info(f"sync is still in progress. sleep for {delay}secs and retry")
-            else:
-                log.info("sync completed")
-                break
-
-        if (retry_count > retry) and (
-            "behind" in check_sync_status or "recovering" in check_sync_status
-        ):
-            raise SyncFailedError(
-                f"sync looks slow or stuck. with {retry} retries and sleep of {delay}secs between each retry"
-            )
-
-    # check metadata sync status
-    if "metadata is behind" in check_sync_status:
-        raise Exception("metadata sync looks slow or stuck.")
-
-    # check status for complete sync
-    if "data is caught up with source" in check_sync_status:
+    status = wait_till_synced(timeout=retry * delay, max_delay=delay)
+    if status.metadata and not status.metadata.caught_up:
+        raise SyncFailedError("metadata sync looks slow or stuck.")
+    if status.caught_up:
         log.info("sync status complete")
     else:
-        raise SyncFailedError("sync is either slow or stuck")
+        raise SyncFailedError(
+            f"sync looks slow or stuck after {retry * delay} secs, lag in shards: {status.lag()}"
+        )
+
+
+def wait_till_buckets_synced(bucket_names, timeout=120, delay=5, max_delay=30):
+    """
+    Waits for the sync of many buckets in one polling loop. The pending
+    buckets are polled concurrently and dropped once caught up.
+
+    Parameters:
+        bucket_names(list): buckets to wait for
+        timeout(int): seconds to wait at most
+        delay(int): first polling interval, doubled up to max_delay
+
+    Returns:
+        dict of bucket name and True if its sync caught up in time
+    """
+    start = time.time()
+    pending = list(dict.fromkeys(bucket_names))
+    synced = {name: False for name in pending}
+
+    def check():
+        cmds = [BUCKET_SYNC_STATUS_CMD.format(name) for name in pending]
+        for name, out in zip(list(pending), utils.exec_shell_cmds(cmds)):
+            if out is False:
+                continue
+            status = SyncStatus.parse(out)
+            # a bucket without shards behind is synced, as for a single source
+            if not any(s.behind or s.behind_shards for s in status.sources):
+                elapsed = time.time() - start
+                metrics.record("bucket sync", elapsed)
+                log.info(f"bucket {name} synced in {elapsed:.1f} secs")
+                synced[name] = True
+                pending.remove(name)
+            else:
+                log.info(f"bucket {name} sync lag in shards: {status.lag()}")
+        return not pending
+
+    utils.poll(check, timeout, delay, max_delay)
+    if pending:
+        log.info(f"buckets not synced in {timeout} secs: {pending}")
+    return synced
@@ -0,0 +1,272 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
+import collections
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+import v2.lib.s3.auth as auth
+from v2.lib import io_ledger
+from v2.lib.exceptions import TestExecError
+from v2.utils.latency import LatencyRecorder
+
+log = logging.getLogger()
+
+MODES = ("thread", "process")
+
+
+def connection_args(rgw_auth, **config):
+    """
+    Returns the picklable arguments to rebuild the s3 connection of an Auth
+    object in a worker, ex: connection_args(auth, signature_version="s3v4")
+    """
+    return dict(
+        access_key=rgw_auth.access_key,
+        secret_key=rgw_auth.secret_key,
+        endpoint_url=rgw_auth.endpoint_url,
+        ssl=rgw_auth.ssl,
+        session_token=rgw_auth.session_token,
+        **config,
+    )
+
+
+# s3 resources of the calling thread, boto3 resources are not thread safe
+_local = threading.local()
+
+
+def connect(conn_args):
+    """
+    Returns the s3 resource of the calling thread for connection_args(),
+    created on first use and reused by the next tasks of the thread
+    """
+    resources = _local.__dict__.setdefault("resources", {})
+    key = tuple(sorted((k, str(v)) for k, v in conn_args.items()))
+    if key not in resources:
+        resources[key] = auth.connection_manager.new_resource(**conn_args)
+    return resources[key]
+
+
+def _init_process():
+    # http pools inherited through fork must not be shared with the parent
+    global _local
+    auth.connection_manager = auth.ConnectionManager()
+    _local = threading.local()
+
+
+class Task(object):
+    """
+    One step of a workload, func must be a module level function in process mode
+    """
+
+    def __init__(self, index, func, args, kwargs, user=None, group=None, name=None):
+        self.index = index
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.user = user
+        self.group = group
+        self.name = name or func.__name__
+
+
+def run_chain(tasks):
+    """
+    Runs the tasks one after the other, stopping at the first failure
+
+    Returns:
+        list of (index, name, duration, result, error) for the tasks executed
+    """
+    outcomes = []
+    for task in tasks:
+        start = time.perf_counter()
+        try:
+            result = task.func(*task.args, **task.kwargs)
+            error = None
+        except Exception as e:
+            log.error(f"{task.name} failed: {e}")
+            log.error(traceback.format_exc())
+            result, error = None, f"{type(e).__name__}: {e}"
+        outcomes.append(
+            (task.index, task.name, time.perf_counter() - start, result, error)
+        )
+        if error:
+            break
+    return outcomes
+
+
+class WorkloadResult(object):
+    """
+    Results of a workload run
+    The functions in this class are
+    1. summary(): ops, failures, elapsed time, ops/sec and latency per task name
+    2. raise_on_failure(): raise TestExecError listing the failed tasks
+    """
+
+    def __init__(self, count):
+        self.results = [None] * count
+        self.failures = []
+        self.skipped = 0
+        self.latency = LatencyRecorder()
+        self.elapsed = 0
+
+    def add(self, outcomes):
+        for index, name, duration, result, error in outcomes:
+            self.latency.record(name, duration)
+            self.results[index] = result
+            if error:
+                self.failures.append((name, error))
+
+    def summary(self):
+        ops = sum(s["count"] for s in self.latency.summary().values())
+        return {
+            "ops": ops,
+            "failures": len(self.failures),
+            "skipped": self.skipped,
+            "elapsed": round(self.elapsed, 3),
+            "ops_per_sec": round(ops / self.elapsed, 2) if self.elapsed else 0,
+            "latency": self.latency.summary(),
+        }
+
+    def raise_on_failure(self):
+        if self.failures:
+            for name, error in self.failures[:10]:
+                log.error(f"{name}: {error}")
+            raise TestExecError(
+                f"{len(self.failures)} workload tasks failed, {self.skipped} skipped"
+            )
+
+
+class WorkloadExecutor(object):
+    """
+    Runs the steps of a test, ex: create_bucket and upload_object, on a pool
+    of threads or processes.
+
+    Tasks submitted with the same group run in submission order, ex: the
+    uploads to a versioned bucket, other tasks run in any order. At most
+    per_user_concurrency tasks (or groups) of a user run at a time.
+    The functions in this class are
+    1. from_config(): executor for the workload section of the test yaml
+    2. submit(): queue a task
+    3. run(): run the queued tasks and return a WorkloadResult
+    """
+
+    def __init__(self, workers=1, per_user_concurrency=None, mode="thread"):
+        if mode not in MODES:
+            raise TestExecError(f"workload mode must be one of {MODES}, got {mode}")
+        self.workers = workers
+        self.per_user_concurrency = per_user_concurrency or workers
+        self.mode = mode
+        self.tasks = []
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Executor for the yaml section, defaults to one worker which keeps the
+        sequential behaviour:
+            workload:
+                workers: 16
+                per_user_concurrency: 8
+                mode: thread
+        """
+        workload = getattr(config, "workload", None) or {}
+        return cls(
+            workers=workload.get("workers", 1),
+            per_user_concurrency=workload.get("per_user_concurrency"),
+            mode=workload.get("mode", "thread"),
+        )
+
+    def submit(self, func, *args, user=None, group=None, name=None, **kwargs):
+        """
+        Queues func(*args, **kwargs)
+
+        Parameters:
+            user(char): user the task runs as, for per_user_concurrency
+            group(char): tasks of the same group run in order, ex: a bucket name
+            name(char): name to report latency and failures under
+
+        Returns:
+            index of the task's result in WorkloadResult.results
+        """
+        task = Task(len(self.tasks), func, args, kwargs, user, group, name)
+        self.tasks.append(task)
+        return task.index
+
+    def _chains(self):
+        chains, groups = [], {}
+        for task in self.tasks:
+            if task.group is None:
+                chains.append([task])
+            elif task.group in groups:
+                groups[task.group].append(task)
+            else:
+                groups[task.group] = [task]
+                chains.append(groups[task.group])
+        return chains
+
+    def run(self):
+        """
+        Runs the queued tasks and clears the queue
+
+        Returns:
+            WorkloadResult
+        """
+        tasks, chains = self.tasks, self._chains()
+        self.tasks = []
+        result = WorkloadResult(len(tasks))
+        pending = collections.OrderedDict()
+        for chain in chains:
+            pending.setdefault(chain[0].user, collections.deque()).append(chain)
+        log.info(
+            f"running {len(tasks)} tasks in {len(chains)} chains with {self.workers} "
+            f"{self.mode} workers, per user concurrency: {self.per_user_concurrency}"
+        )
+        if self.mode == "process":
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_process
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.workers)
+        start = time.perf_counter()
+        running, running_per_user = {}, collections.Counter()
+        with pool:
+            while pending or running:
+                # round robin over users so that one user does not starve the others
+                for user in list(pending):
+                    if len(running) >= self.workers:
+                        break
+                    if running_per_user[user] >= self.per_user_concurrency:
+                        continue
+                    chain = pending[user].popleft()
+                    if not pending[user]:
+                        del pending[user]
+                    running[pool.submit(run_chain, chain)] = (user, chain)
+                    running_per_user[user] += 1
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    user, chain = running.pop(future)
+                    running_per_user[user] -= 1
+                    try:
+                        outcomes = future.result()
+                    except Exception as e:
+                        # the chain could not run or return, ex: not picklable
+                        outcomes = [(chain[0].index, chain[0].name, 0, None, str(e))]
+                    result.add(outcomes)
+                    result.skipped += len(chain) - len(outcomes)
+        result.elapsed = time.perf_counter() - start
+        if self.mode == "process":
+            # io info recorded by the workers is only in the journal
+            io_ledger.reload_ledgers()
+        summary = result.summary()
+        log.info(
+            f"workload completed: {summary['ops']} ops in {summary['elapsed']}s, "
+            f"{summary['ops_per_sec']} ops/sec, {summary['failures']} failures"
+        )
+        return result
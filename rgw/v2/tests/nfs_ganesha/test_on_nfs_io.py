@@ -23,7 +23,8 @@ import traceback
 import v2.utils.utils as utils
 import yaml
 from v2.lib.exceptions import NFSGaneshaMountError, TestExecError
-from v2.lib.nfs_ganesha.nfslib import DoIO
+from v2.lib.nfs_ganesha import nfs_workload
+from v2.lib.nfs_ganesha.nfs_workload import NFSWorkload
 from v2.lib.nfs_ganesha.write_io_info import BasicIOInfoStructure, IOInfoInitialize
 
 # from initialize import PrepNFSGanesha
@@ -65,40 +66,20 @@ def test_exec(rgw_user_info_file, config):
         log.info("writable mount point with Pseudo: %s" % mount_point)
 
     if io_op_config.get("create", None):
-        do_io = DoIO(nfs_ganesha.rgw_user_info, mount_point)
-        # base dir creation
-        for bc in range(io_config["basedir_count"]):
-            basedir_name_to_create = utils.gen_bucket_name_from_userid(
-                nfs_ganesha.rgw_user_info["user_id"], rand_no=bc
+        # base dirs, with their subdirs and files, created concurrently
+        workload = NFSWorkload(
+            nfs_ganesha.rgw_user_info,
+            mount_point,
+            workers=io_config.get("workers", nfs_workload.DEFAULT_WORKERS),
+        )
+        workload.run(
+            workload.plan(
+                io_config["basedir_count"],
+                io_config["subdir_count"],
+                io_config["file_count"],
+                io_config["objects_size_range"],
             )
-            log.info("creating basedir with name: %s" % basedir_name_to_create)
-            do_io.write("basedir", basedir_name_to_create)
-            if io_config["subdir_count"] != 0:
-                for sd in range(io_config["subdir_count"]):
-                    subdir_name_to_create = utils.gen_bucket_name_from_userid(
-                        basedir_name_to_create + ".subdir", rand_no=sd
-                    )
-                    log.info("creating subdir with name: %s" % subdir_name_to_create)
-                    do_io.write(
-                        "subdir",
-                        os.path.join(basedir_name_to_create, subdir_name_to_create),
-                    )
-
-            if io_config["file_count"] != 0:
-                for fc in range(io_config["file_count"]):
-                    file_name_to_create = utils.gen_bucket_name_from_userid(
-                        basedir_name_to_create + ".file", rand_no=fc
-                    )
-                    log.info("creating file with name: %s" % file_name_to_create)
-                    file_size = utils.get_file_size(
-                        io_config["objects_size_range"]["min"],
-                        io_config["objects_size_range"]["max"],
-                    )
-                    do_io.write(
-                        "file",
-                        os.path.join(basedir_name_to_create, file_name_to_create),
-                        file_size,
-                    )
+        )
 
         log.info("verification of IO will start after %s seconds" % SLEEP_TIME)
         time.sleep(SLEEP_TIME)
@@ -162,7 +143,7 @@ def test_exec(rgw_user_info_file, config):
 
     # cleanup and unmount tasks for both nfs v3 and v4
     if nfs_ganesha.rgw_user_info["cleanup"]:
-        utils.exec_shell_cmd("sudo rm -rf %s%s" % (mount_point, "/*"))
+        utils.remove_path(os.path.join(mount_point, "*"))
     # Todo: There's a need to change the behaviour of exec_shell_cmd() function which returns
     # an empty string as an output on the successful execution of a command.
     if nfs_ganesha.rgw_user_info["do_unmount"]:
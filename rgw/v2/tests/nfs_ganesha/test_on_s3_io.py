@@ -207,7 +207,7 @@ def test_exec(rgw_user_info_file, config):
 
     # cleanup and unmount tasks for both nfs v3 and v4
     if nfs_ganesha.rgw_user_info["cleanup"]:
-        utils.exec_shell_cmd("sudo rm -rf %s%s" % (mount_point, "/*"))
+        utils.remove_path(os.path.join(mount_point, "*"))
     # Todo: There's a need to change the behaviour of exec_shell_cmd() function which returns
     # an empty string as an output on the successful execution of a command.
     if nfs_ganesha.rgw_user_info["do_unmount"]:
@@ -5,11 +5,10 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
 
 
-import v2.utils.utils as utils
 from v2.lib.exceptions import TestExecError
-from v2.utils.utils import FileOps
+from v2.lib.io_ledger import IO_INFO_FNAME, IOInfoReader
+from v2.lib.nfs_ganesha.nfs_workload import DEFAULT_WORKERS, verify_files
 
-IO_INFO_FNAME = "io_info.yaml"
 log = logging.getLogger()
 
 
@@ -20,7 +19,7 @@ class ReadIOInfoOnNFS(object):
         yaml_fname=IO_INFO_FNAME,
     ):
         self.yaml_fname = yaml_fname
-        self.file_op = FileOps(self.yaml_fname, type="yaml")
+        self.file_op = IOInfoReader(self.yaml_fname)
         self.mount_point = mount_point
         self.base_dirs = []
         self.files = []
@@ -64,21 +63,12 @@ class ReadIOInfoOnNFS(object):
             log.info("basedir created")
         log.info("basedir verification complete, basedirs exists")
 
-    def verify_if_files_created(self):
+    def verify_if_files_created(self, workers=DEFAULT_WORKERS):
         if not self.files:
             log.info("no files are created")
         else:
             log.info("verifying files")
-            for each_file in self.files:
-                log.info("verifying existence for: %s" % each_file["file"])
-                created = os.path.exists(each_file["file"])
-                if not created:
-                    raise TestExecError("files not created")
-                log.info("file created")
-                md5 = utils.get_md5(each_file["file"])
-                log.info("md5 on nfs mount point: %s" % md5)
-                log.info("md5 on rgw_client: %s" % each_file["md5"])
-                if md5 != each_file["md5"]:
-                    raise TestExecError("md5 not matched")
-                log.info("md5 matched")
+            failed = verify_files(self.files, workers)
+            if failed:
+                raise TestExecError("files not created or md5 not matched: %s" % failed)
             log.info("verification of files complete, files exists and data intact")
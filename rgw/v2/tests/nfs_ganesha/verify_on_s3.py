@@ -4,19 +4,18 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../")))
 import logging
 
-import v2.utils.utils as utils
 from v2.lib.exceptions import TestExecError
+from v2.lib.io_ledger import IO_INFO_FNAME, IOInfoReader
+from v2.lib.nfs_ganesha.nfs_workload import DEFAULT_WORKERS, verify_objects
 from v2.lib.s3.auth import Auth
-from v2.utils.utils import FileOps
 
-IO_INFO_FNAME = "io_info.yaml"
 log = logging.getLogger()
 
 
 class ReadIOInfoOnS3(object):
     def __init__(self, yaml_fname=IO_INFO_FNAME):
         self.yaml_fname = yaml_fname
-        self.file_op = FileOps(self.yaml_fname, type="yaml")
+        self.file_op = IOInfoReader(self.yaml_fname)
         self.rgw_conn = None
         self.rgw_conn2 = None
         self.buckets = []
@@ -61,25 +60,16 @@ class ReadIOInfoOnS3(object):
         comp_val = set(self.buckets) == set(bucket_names_from_s3)
         return comp_val
 
-    def verify_if_objects_created(self):
+    def verify_if_objects_created(self, workers=DEFAULT_WORKERS):
         log.info("verification of s3 objects")
-        for each_key in self.objects:
-            log.info("verifying data for key: %s" % os.path.basename(each_key["name"]))
-            log.info("bucket: %s" % each_key["bucket"])
-            key_from_s3 = self.rgw_conn.Object(
-                each_key["bucket"], os.path.basename(each_key["name"])
-            )
-            log.info("got key name from s3: %s" % key_from_s3.key)
-
-            if each_key["type"] == "file":
-                log.info("verifying md5")
-                log.info("md5_local: %s" % each_key["md5"])
-                key_from_s3.download_file("download.temp")
-                downloaded_md5 = utils.get_md5("download.temp")
-                log.info("md5_from_s3: %s" % downloaded_md5)
-                if each_key["md5"] != downloaded_md5:
-                    raise TestExecError("md5 not matched")
-                utils.exec_shell_cmd("sudo rm -rf download.temp")
+        files = [
+            dict(x, name=os.path.basename(x["name"]))
+            for x in self.objects
+            if x["type"] == "file"
+        ]
+        failed = verify_objects(self.rgw_conn2, files, workers)
+        if failed:
+            raise TestExecError("objects missing or md5 not matched: %s" % failed)
 
 
 if __name__ == "__main__":
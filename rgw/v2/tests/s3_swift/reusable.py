@@ -1,4 +1,4 @@
-import glob
+import copy
 import json
 import os
 import subprocess
@@ -7,11 +7,15 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(__file__, "../../../..")))
 import logging
 import time
-import timeit
 
 import v2.lib.manage_data as manage_data
 import v2.lib.resource_op as s3lib
+import v2.lib.s3.cleanup as cleanup
+import v2.lib.s3.listing as bucket_listing
+import v2.lib.s3.multipart as multipart
+import v2.lib.workload as workload
 import v2.utils.utils as utils
+from v2.lib import admin_stream
 from v2.lib.exceptions import DefaultDatalogBackingError, MFAVersionError, TestExecError
 from v2.lib.rgw_config_opts import ConfigOpts
 from v2.lib.s3.write_io_info import (
@@ -107,6 +111,52 @@ def upload_object(
         log.info("object uploaded")
 
 
+def upload_object_stream(s3_object_name, bucket, config, user_info):
+    """
+    Uploads an object of config.obj_size bytes of generated data streamed
+    from memory with put_object, no local file is written
+    :param s3_object_name: s3 object name
+    :param bucket: S3Bucket object
+    :param user_info: user info dict containing access_key, secret_key and user_id
+    """
+    log.info("s3 object name: %s" % s3_object_name)
+    stream = manage_data.DataStream(int(config.obj_size))
+    log.info(f"streaming s3 object of {len(stream)} bytes, seed: {stream.seed}")
+    response = s3lib.resource_op(
+        {
+            "obj": bucket.meta.client,
+            "resource": "put_object",
+            "kwargs": dict(
+                Bucket=bucket.name,
+                Key=s3_object_name,
+                Body=stream,
+                ContentLength=len(stream),
+            ),
+        }
+    )
+    if response is False:
+        raise TestExecError("Resource execution failed: object upload failed")
+    # the checksums of the last full read, the one sent
+    md5 = stream.checksums()["md5"]
+    encrypted = response.get("ServerSideEncryption") or response.get(
+        "SSECustomerAlgorithm"
+    )
+    if not encrypted and response["ETag"].strip('"') != md5:
+        raise TestExecError(
+            f"ETag of {s3_object_name}: {response['ETag']}, expected: {md5}"
+        )
+    key_info = basic_io_structure.key(
+        **{
+            "name": s3_object_name,
+            "size": len(stream),
+            "md5_local": md5,
+            "upload_type": "normal",
+        }
+    )
+    write_key_io_info.add_keys_info(user_info["access_key"], bucket.name, key_info)
+    log.info("object uploaded")
+
+
 def failed_upload_object(
     s3_object_name,
     bucket,
@@ -260,7 +310,7 @@ def upload_version_object(
         log.info("downloaded_md5: %s" % s3_object_downloaded_md5)
         log.info("uploaded_md5: %s" % modified_data_info["md5"])
         log.info("deleting downloaded version file")
-        utils.exec_shell_cmd("sudo rm -rf %s" % s3_object_download_path)
+        utils.remove_path(s3_object_download_path)
     log.info("all versions for the object: %s\n" % s3_object_name)
 
 
@@ -286,12 +336,12 @@ def download_object(s3_object_name, bucket, TEST_DATA_PATH, s3_object_path, conf
     log.info("s3_object_uploaded_md5: %s" % s3_object_uploaded_md5)
     if str(s3_object_uploaded_md5) == str(s3_object_downloaded_md5):
         log.info("md5 match")
-        utils.exec_shell_cmd("rm -rf %s" % s3_object_download_path)
+        utils.remove_path(s3_object_download_path)
     else:
         raise TestExecError("md5 mismatch")
     if config.local_file_delete is True:
         log.info("deleting local file created after the upload")
-        utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
+        utils.remove_path(s3_object_path)
 
 
 def upload_object_with_tagging(
@@ -349,15 +399,6 @@ def upload_mutipart_object(
         data_info = manage_data.io_generator(s3_object_path, s3_object_size)
     if data_info is False:
         TestExecError("data creation failed")
-    mp_dir = os.path.join(TEST_DATA_PATH, s3_object_name + ".mp.parts")
-    log.info("mp part dir: %s" % mp_dir)
-    log.info("making multipart object part dir")
-    mkdir = utils.exec_shell_cmd("sudo mkdir %s" % mp_dir)
-    if mkdir is False:
-        raise TestExecError("mkdir failed creating mp_dir_name")
-    utils.split_file(s3_object_path, split_size, mp_dir + "/")
-    parts_list = sorted(glob.glob(mp_dir + "/" + "*"))
-    log.info("parts_list: %s" % parts_list)
     log.info("uploading s3 object: %s" % s3_object_path)
     upload_info = dict(
         {"access_key": user_info["access_key"], "upload_type": "multipart"}, **data_info
@@ -378,40 +419,59 @@ def upload_mutipart_object(
             "extra_info": upload_info,
         }
     )
-    part_number = 1
-    parts_info = {"Parts": []}
-    log.info("no of parts: %s" % len(parts_list))
-    for each_part in parts_list:
-        log.info("trying to upload part: %s" % each_part)
-        part = mpu.Part(part_number)
-        # part_upload_response = part.upload(Body=open(each_part))
-        part_upload_response = s3lib.resource_op(
-            {
-                "obj": part,
-                "resource": "upload",
-                "kwargs": dict(Body=open(each_part, mode="rb")),
-            }
+    if mpu is False:
+        raise TestExecError("Resource execution failed: initiate multipart failed")
+    multipart.upload_parts(
+        mpu,
+        s3_object_path,
+        split_size=split_size,
+        concurrency=getattr(config, "multipart_concurrency", None),
+    )
+
+
+def create_bucket_task(bucket_name, conn_args, user_info, versioning=False):
+    """
+    Workload task creating a bucket and optionally enabling versioning on it
+    :param bucket_name: name of the bucket to create
+    :param conn_args: s3 connection, from workload.connection_args()
+    :param user_info: user info dict containing access_key, secret_key and user_id
+    :param versioning: enable versioning after creation
+    """
+    rgw_conn = workload.connect(conn_args)
+    bucket = create_bucket(bucket_name, rgw_conn, user_info)
+    if versioning:
+        enable_versioning(bucket, rgw_conn, user_info, write_bucket_io_info)
+    return bucket_name
+
+
+def upload_object_task(
+    s3_object_name, bucket_name, TEST_DATA_PATH, config, user_info, conn_args, size
+):
+    """
+    Workload task uploading an object of the given size, normal or multipart as
+    per config.test_ops upload_type, normal ones are streamed from memory if
+    config.test_ops stream_upload is true
+    :param conn_args: s3 connection, from workload.connection_args()
+    :param size: object size, instead of the shared config.obj_size
+    """
+    rgw_conn = workload.connect(conn_args)
+    bucket = s3lib.resource_op(
+        {"obj": rgw_conn, "resource": "Bucket", "args": [bucket_name]}
+    )
+    config = copy.copy(config)
+    config.obj_size = size
+    if config.test_ops.get("upload_type") == "multipart":
+        log.info("upload type: multipart")
+        upload_mutipart_object(
+            s3_object_name, bucket, TEST_DATA_PATH, config, user_info
         )
-        if part_upload_response is not False:
-            response = HttpResponseParser(part_upload_response)
-            if response.status_code == 200:
-                log.info("part uploaded")
-                if config.local_file_delete is True:
-                    log.info("deleting local file part")
-                    utils.exec_shell_cmd("sudo rm -rf %s" % each_part)
-            else:
-                raise TestExecError("part uploading failed")
-        part_info = {"PartNumber": part_number, "ETag": part_upload_response["ETag"]}
-        parts_info["Parts"].append(part_info)
-        if each_part != parts_list[-1]:
-            # increase the part number only if the current part is not the last part
-            part_number += 1
-        log.info("curr part_number: %s" % part_number)
-    # log.info('parts_info so far: %s'% parts_info)
-    if len(parts_list) == part_number:
-        log.info("all parts upload completed")
-        mpu.complete(MultipartUpload=parts_info)
-        log.info("multipart upload complete for key: %s" % s3_object_name)
+    elif config.test_ops.get("stream_upload"):
+        log.info("upload type: normal, streamed")
+        upload_object_stream(s3_object_name, bucket, config, user_info)
+    else:
+        log.info("upload type: normal")
+        upload_object(s3_object_name, bucket, TEST_DATA_PATH, config, user_info)
+    return s3_object_name
 
 
 def enable_versioning(bucket, rgw_conn, user_info, write_bucket_io_info):
@@ -551,11 +611,8 @@ def put_get_bucket_lifecycle_test(bucket, rgw_conn, rgw_conn2, life_cycle_rule,
             time.sleep(60)
 
     log.info("testing if lc is applied via the radosgw-admin cli")
-    op = utils.exec_shell_cmd("radosgw-admin lc list")
-    json_doc = json.loads(op)
-    for i, entry in enumerate(json_doc):
-        print(i)
-        print(entry["status"])
+    for i, entry in enumerate(admin_stream.stream_json("radosgw-admin lc list")):
+        log.info(f"lc entry {i}: {entry}")
         if entry["status"] == "COMPLETE" or entry["status"] == "PROCESSING":
             log.info("LC is applied on the bucket")
         else:
@@ -683,31 +740,12 @@ def link_chown_to_nontenanted(new_uid, bucket, tenant):
 
 def delete_objects(bucket):
     """
-    deletes the objects in a given bucket
+    deletes the objects in a given bucket, in DeleteObjects batches of 1000 keys
     :param bucket: S3Bucket object
     """
-    log.info("listing all objects in bucket: %s" % bucket.name)
-    objects = s3lib.resource_op({"obj": bucket, "resource": "objects", "args": None})
-    log.info("objects :%s" % objects)
-    all_objects = s3lib.resource_op({"obj": objects, "resource": "all", "args": None})
-    log.info("all objects: %s" % all_objects)
-    for obj in all_objects:
-        log.info("object_name: %s" % obj.key)
-    log.info("deleting all objects in bucket")
-    objects_deleted = s3lib.resource_op(
-        {"obj": objects, "resource": "delete", "args": None}
-    )
-    log.info("objects_deleted: %s" % objects_deleted)
-    if objects_deleted is False:
-        raise TestExecError("Resource execution failed: Object deletion failed")
-    if objects_deleted is not None:
-        response = HttpResponseParser(objects_deleted[0])
-        if response.status_code == 200:
-            log.info("objects deleted ")
-        else:
-            raise TestExecError("objects deletion failed")
-    else:
-        raise TestExecError("objects deletion failed")
+    log.info("deleting all objects in bucket: %s" % bucket.name)
+    deleted = cleanup.empty_bucket(bucket.meta.client, bucket.name, versions=False)
+    log.info("objects deleted: %s" % len(deleted))
 
 
 def list_objects(bucket):
@@ -750,36 +788,21 @@ def delete_version_object(
     :param rgw_conn: rgw connection
     :param user_info: user info dict containing access_key, secret_key and user_id
     """
-    versions = bucket.object_versions.filter(Prefix=s3_object_name)
-    log.info("deleting s3_obj keys and its versions")
-    s3_obj = s3lib.resource_op(
-        {"obj": rgw_conn, "resource": "Object", "args": [bucket.name, s3_object_name]}
-    )
     log.info("deleting versions for s3 obj: %s" % s3_object_name)
-    for version in versions:
-        log.info("trying to delete obj version: %s" % version.version_id)
-        del_obj_version = s3lib.resource_op(
-            {
-                "obj": s3_obj,
-                "resource": "delete",
-                "kwargs": dict(VersionId=version.version_id),
-            }
+    # a prefix of key_1 would also match key_10 .. key_19
+    deleted = cleanup.empty_bucket(
+        bucket.meta.client, bucket.name, versions=True, key=s3_object_name
+    )
+    for each_version in deleted:
+        if each_version.get("Key") != s3_object_name:
+            continue
+        log.info("version deleted: %s" % each_version.get("VersionId"))
+        write_key_io_info.delete_version_info(
+            user_info["access_key"],
+            bucket.name,
+            s3_object_path,
+            each_version.get("VersionId"),
         )
-        log.info("response:\n%s" % del_obj_version)
-        if del_obj_version is not None:
-            response = HttpResponseParser(del_obj_version)
-            if response.status_code == 204:
-                log.info("version deleted ")
-                write_key_io_info.delete_version_info(
-                    user_info["access_key"],
-                    bucket.name,
-                    s3_object_path,
-                    version.version_id,
-                )
-            else:
-                raise TestExecError("version  deletion failed")
-        else:
-            raise TestExecError("version deletion failed")
     log.info("available versions for the object")
     versions = bucket.object_versions.filter(Prefix=s3_object_name)
     for version in versions:
@@ -793,18 +816,10 @@ def delete_bucket(bucket):
     deletes a given bucket
     :param bucket: s3Bucket object
     """
-    for retry_count in range(3):
-        time.sleep(10)
-        log.info("listing objects if any")
-        objs = bucket.objects.all()
-        count = sum(1 for _ in bucket.objects.all())
-        if count > 0:
-            log.info(f"objects not deleted, count is:{count}")
-            for ob in objs:
-                log.info(f"object: {ob.key}")
-        else:
-            log.info("No objects in bucket")
-            break
+    if not cleanup.wait_until_empty(bucket.meta.client, bucket.name):
+        log.info("objects not deleted in bucket: %s" % bucket.name)
+        for ob in bucket.objects.all():
+            log.info(f"object: {ob.key}")
     log.info("deleting bucket: %s" % bucket.name)
     bucket_deleted_response = s3lib.resource_op(
         {"obj": bucket, "resource": "delete", "args": None}
@@ -822,60 +837,43 @@ def delete_bucket(bucket):
         raise TestExecError("bucket deletion failed")
 
 
-def set_gc_conf(ceph_conf, conf):
+# gc options set by set_gc_conf and their defaults
+GC_CONF_DEFAULTS = {
+    ConfigOpts.bluestore_block_size: 1549267441664,
+    ConfigOpts.rgw_gc_max_queue_size: 367788,
+    ConfigOpts.rgw_gc_processor_max_time: 3600,
+    ConfigOpts.rgw_gc_max_concurrent_io: 10,
+    ConfigOpts.rgw_objexp_gc_interval: 10,
+    ConfigOpts.rgw_gc_max_trim_chunk: 32,
+    ConfigOpts.rgw_gc_obj_min_wait: 10,
+    ConfigOpts.rgw_gc_processor_period: 10,
+}
+
+
+def set_gc_conf(ceph_conf, conf, txn=None):
+    """
+    Sets the gc options in one go, rgw is restarted only if a value changed
+
+    Parameters:
+        ceph_conf: CephConfOp
+        conf(dict): gc options of the test config
+        txn: CephConfTransaction to set the options in, a new one if None
+
+    Returns:
+        the config transaction, rollback() restores the original values
+    """
     log.info("making changes to ceph.conf")
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.bluestore_block_size,
-        str(conf.get("bluestore_block_size", 1549267441664)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_max_queue_size,
-        str(conf.get("rgw_gc_max_queue_size", 367788)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_processor_max_time,
-        str(conf.get("rgw_gc_processor_max_time", 3600)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_max_concurrent_io,
-        str(conf.get("rgw_gc_max_concurrent_io", 10)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_objexp_gc_interval,
-        str(conf.get("rgw_objexp_gc_interval", 10)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_max_trim_chunk,
-        str(conf.get("rgw_gc_max_trim_chunk", 32)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_obj_min_wait,
-        str(conf.get("rgw_gc_obj_min_wait", 10)),
-    )
-    ceph_conf.set_to_ceph_conf(
-        "global",
-        ConfigOpts.rgw_gc_processor_period,
-        str(conf.get("rgw_gc_processor_period", 10)),
-    )
-    log.info("trying to restart services")
-    srv_restarted = rgw_service.restart()
-    time.sleep(30)
-    if srv_restarted is False:
-        raise TestExecError("RGW service restart failed")
-    else:
-        log.info("RGW service restarted")
+    if txn is None:
+        txn = ceph_conf.transaction(rgw_service, restore=False)
+    for option, default in GC_CONF_DEFAULTS.items():
+        txn.set("global", option, str(conf.get(option, default)))
+    txn.commit()
     # Delete gc queue
     pool_name = utils.exec_shell_cmd("ceph df |awk '{ print $1 }'| grep rgw.log")
     pool_name = pool_name.replace("\n", "")
     for i in range(0, 32):
         utils.exec_shell_cmd("rados rm gc.%d -p %s -N gc" % (i, pool_name))
+    return txn
 
 
 def verify_gc():
@@ -915,44 +913,35 @@ def check_for_crash():
         return ceph_crash
 
 
-def time_to_list_via_radosgw(bucket_name, listing):
+def time_to_list_via_radosgw(bucket_name, listing, max_entries=100000):
     """
-    Time taken to list via radosgw-admin command.
-    :param bucket: s3Bucket object
+    Time taken to list the whole bucket via radosgw-admin command.
+    :param bucket_name: name of the bucket
     :param listing: ordered or unordered listing
+    :param max_entries: entries listed per command, the marker is followed till the end
     """
-    if listing == "ordered":
-        log.info("listing via radosgw-admin bucket list --max-entries=.. --bucket <>")
-        cmd = "radosgw-admin bucket list --max-entries=100000 --bucket=%s " % (
-            bucket_name
-        )
-        time_taken = timeit.timeit(utils.exec_shell_cmd(cmd), globals=globals())
-        return time_taken
-
-    if listing == "unordered":
-        log.info(
-            "listing via radosgw-admin bucket list --max-entries=.. --bucket <> --allow-unordered"
-        )
-        cmd = (
-            "radosgw-admin bucket list --max-entries=100000 --bucket=%s --allow-unordered"
-            % (bucket_name)
-        )
-        time_taken = timeit.timeit(utils.exec_shell_cmd(cmd), globals=globals())
-        return time_taken
+    log.info(f"{listing} listing via radosgw-admin bucket list --bucket {bucket_name}")
+    start = time.perf_counter()
+    objects, _ = bucket_listing.list_via_radosgw(
+        bucket_name, max_entries, ordered=listing == "ordered"
+    )
+    time_taken = time.perf_counter() - start
+    log.info(f"listed {objects} entries in {time_taken:.4f} secs")
+    return time_taken
 
 
-def time_to_list_via_boto(bucket_name, rgw):
+def time_to_list_via_boto(bucket_name, rgw, max_keys=1000):
     """
-    Time taken to list via boto
-    :param bucket: s3Bucket object
+    Time taken to list the whole bucket via boto
+    :param bucket_name: name of the bucket
+    :param rgw: s3 resource
+    :param max_keys: keys listed per request
     """
-    bucket = s3lib.resource_op(
-        {"obj": rgw, "resource": "Bucket", "args": [bucket_name]}
-    )
-
-    log.info("listing all objects in bucket: %s" % bucket)
-    objects = s3lib.resource_op({"obj": bucket, "resource": "objects", "args": None})
-    time_taken = timeit.timeit(lambda: bucket.objects.all(), globals=globals())
+    log.info("listing all objects in bucket: %s" % bucket_name)
+    start = time.perf_counter()
+    objects, _ = bucket_listing.list_via_boto(rgw.meta.client, bucket_name, max_keys)
+    time_taken = time.perf_counter() - start
+    log.info(f"listed {objects} objects in {time_taken:.4f} secs")
     return time_taken
 
 
@@ -1078,8 +1067,8 @@ def put_bucket_lifecycle(bucket, rgw_conn, rgw_conn2, life_cycle_rule):
             raise TestExecError("bucket lifecycle config retrieval failed")
     else:
         raise TestExecError("bucket life cycle retrieved")
-    lc_data = json.loads(utils.exec_shell_cmd("radosgw-admin lc list"))
-    log.info(f"lc data is {lc_data}")
+    for lc_entry in admin_stream.stream_json("radosgw-admin lc list"):
+        log.info(f"lc entry: {lc_entry}")
 
 
 def get_radoslist():
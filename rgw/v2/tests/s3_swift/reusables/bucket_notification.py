@@ -1,3 +1,4 @@
+import datetime
 import json
 import logging
 import os
@@ -7,7 +8,8 @@ import timeit
 from urllib import parse as urlparse
 
 import v2.utils.utils as utils
-from v2.lib.exceptions import EventRecordDataError
+from v2.lib.exceptions import EventRecordDataError, TestExecError
+from v2.utils.latency import LatencyRecorder
 
 log = logging.getLogger()
 
@@ -34,17 +36,28 @@ def start_kafka_broker_consumer(topic_name, event_record_path):
     start_consumer_kafka = utils.exec_shell_cmd(cmd)
 
 
-def create_topic(sns_client, endpoint, ack_type, topic_name, persistent_flag=False):
+def create_topic(
+    sns_client,
+    endpoint,
+    ack_type,
+    topic_name,
+    persistent_flag=False,
+    push_endpoint=None,
+):
     """
     to create topic with specified endpoint , ack_level
+    push_endpoint: url to push to instead of the local kafka broker, ex: http://localhost:8080
     return: topic ARN
     """
-    endpoint_args = (
-        "push-endpoint="
-        + endpoint
-        + "://localhost&verify-ssl=False&kafka-ack-level="
-        + ack_type
-    )
+    if push_endpoint:
+        endpoint_args = "push-endpoint=" + push_endpoint
+    else:
+        endpoint_args = (
+            "push-endpoint="
+            + endpoint
+            + "://localhost&verify-ssl=False&kafka-ack-level="
+            + ack_type
+        )
     if persistent_flag:
         endpoint_args = endpoint_args + "&persistent=true"
     attributes = {
@@ -137,6 +150,147 @@ def get_bucket_notification(rgw_s3_client, bucketname, empty=False):
     )
 
 
+def parse_event_time(event_time):
+    """
+    Returns the epoch time of an eventTime, ex: 2023-03-06T09:36:22.413006Z,
+    None if it can not be parsed
+    """
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            parsed = datetime.datetime.strptime(event_time, fmt)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+    return None
+
+
+class EventRecordValidator(object):
+    """
+    Verifies the event records of a bucket, the bucket stats are fetched once
+    The functions in this class are
+    1. validate(): verify the attributes of one record of an event record
+    """
+
+    def __init__(self, event_type, bucket, ceph_version):
+        self.bucket = bucket
+        self.ceph_version = ceph_version
+        self.events = []
+        if "Delete" in event_type:
+            self.events = ["Put", "Delete"]
+        if "Copy" in event_type:
+            self.events = ["Put", "Copy"]
+        if "Multipart" in event_type:
+            self.events = ["Post", "Put", "CompleteMultipartUpload"]
+        bucket_stats = utils.exec_shell_cmd(
+            "radosgw-admin bucket stats --bucket  %s" % bucket
+        )
+        if bucket_stats is False:
+            raise EventRecordDataError(f"bucket stats failed for {bucket}")
+        bucket_stats_json = json.loads(bucket_stats)
+        self.bucket_id = bucket_stats_json["id"]
+        self.bucket_owner = bucket_stats_json["owner"]
+
+    def validate(self, record):
+        """
+        Parameters:
+            record(dict): entry of the "Records" of an event record
+        """
+        log.debug(f" event record \n {record}")
+        # verify "eventTime" attribute
+        eventTime = record["eventTime"]
+
+        # verify eventTime reflects correct timestamp. BZ:https://bugzilla.redhat.com/show_bug.cgi?id=1959254
+        if "0.000000" in eventTime:
+            raise EventRecordDataError("eventTime 0.000000 in event record")
+        if "T" not in eventTime:
+            raise EventRecordDataError("eventTime: Incorrect timestamp format")
+
+        # verify "eventName" attribute
+        eventName = record["eventName"]
+        # s3Prefix removed with BZ: https://bugzilla.redhat.com/show_bug.cgi?id=1966676
+        if "s3:" in eventName and "nautilus" not in self.ceph_version:
+            raise EventRecordDataError("eventName: s3 prefix present in eventName")
+        if not any(event in eventName for event in self.events):
+            log.info(f"eventName: {eventName} not expected for {self.events}")
+
+        # verify bucket attributes in event record
+        if self.bucket not in record["s3"]["bucket"]["name"]:
+            raise EventRecordDataError("BucketName not in event record")
+        if self.bucket_id not in record["s3"]["bucket"]["id"]:
+            raise EventRecordDataError("BucketID not in event record")
+        bkt_owner_evnt = record["s3"]["bucket"]["ownerIdentity"]["principalId"]
+        if self.bucket_owner != bkt_owner_evnt:
+            raise EventRecordDataError("BucketOwner not in event record")
+
+        # verify object size is not 0, for the object. BZ:https://bugzilla.redhat.com/show_bug.cgi?id=1960648
+        size = record["s3"]["object"]["size"]
+        if size == 0:
+            if "Post" in eventName:
+                log.debug("Expected behavior")
+            elif "nautilus" not in self.ceph_version:
+                raise EventRecordDataError("size: Object size is 0")
+
+
+def verify_events(consumer, validators, put_times=None, persistent=False):
+    """
+    Streams the event records of a consumer through the validator of their
+    bucket and measures the notification latency and events/sec
+
+    Parameters:
+        consumer: notification_consumer.EventConsumer
+        validators(dict): bucket name and its EventRecordValidator
+        put_times(dict): object name and the epoch time its PUT completed
+        persistent(bool): topic is persistent, to tell the results apart
+
+    Returns:
+        dict of events, events/sec and latency summaries in secs for
+        "put to event" (PUT completed to eventTime), "delivery" (eventTime
+        to receipt) and "end to end" (PUT completed to receipt), the receipt
+        based ones only for the records the consumer has a receipt time for
+    """
+    put_times = put_times or {}
+    latency = LatencyRecorder()
+    count = other_buckets = 0
+    receipts = []
+    for received, event_record_json in consumer.records():
+        for record in event_record_json["Records"]:
+            validator = validators.get(record["s3"]["bucket"]["name"])
+            if validator is None:
+                other_buckets += 1
+                continue
+            validator.validate(record)
+            count += 1
+            event_time = parse_event_time(record["eventTime"])
+            if received is not None:
+                receipts.append(received)
+                if event_time:
+                    latency.record("delivery", received - event_time)
+            put_time = put_times.get(record["s3"]["object"]["key"])
+            if put_time and "Delete" not in record["eventName"]:
+                if event_time:
+                    latency.record("put to event", event_time - put_time)
+                if received is not None:
+                    latency.record("end to end", received - put_time)
+    if count == 0:
+        raise EventRecordDataError("event record not generated!")
+    if len(receipts) < count:
+        log.info(
+            f"{count - len(receipts)} event records without receipt time, "
+            "events/sec is not computed"
+        )
+    # records of several partitions are not in receipt order
+    elapsed = max(receipts) - min(receipts) if len(receipts) == count else 0
+    summary = {
+        "events": count,
+        "other_buckets_events": other_buckets,
+        "persistent": persistent,
+        "events_per_sec": round(count / elapsed, 2) if elapsed else None,
+        "latency": latency.summary(),
+    }
+    log.info(f"event records verified: {summary}")
+    return summary
+
+
 def verify_event_record(event_type, bucket, event_record_path, ceph_version):
     """
     verify event records
@@ -144,84 +298,12 @@ def verify_event_record(event_type, bucket, event_record_path, ceph_version):
     if os.path.getsize(event_record_path) == 0:
         raise EventRecordDataError("event record not generated! File is empty")
 
+    validator = EventRecordValidator(event_type, bucket, ceph_version)
     # read the file event_record
     with open(event_record_path, "r") as records:
         for record in records:
-            event_record = record.strip()
-            log.info(f" event record \n {record}")
-            event_record_json = json.loads(event_record)
-
-            # verify "eventTime" attribute
-            eventTime = event_record_json["Records"][0]["eventTime"]
-
-            # verify eventTime reflects correct timestamp. BZ:https://bugzilla.redhat.com/show_bug.cgi?id=1959254
-            if "0.000000" in eventTime:
-                raise EventRecordDataError("eventTime 0.000000 in event record")
-            if "T" in eventTime:
-                log.info(f"eventTime: {eventTime},Timestamp format validated")
-            else:
-                raise EventRecordDataError("eventTime: Incorrect timestamp format")
-
-            # verify "eventName" attribute
-            eventName = event_record_json["Records"][0]["eventName"]
-            # s3Prefix removed with BZ: https://bugzilla.redhat.com/show_bug.cgi?id=1966676
-            if "s3:" in eventName and "nautilus" not in ceph_version:
-                raise EventRecordDataError("eventName: s3 prefix present in eventName")
-
-            # verify event record for a particular event type
-            if "Delete" in event_type:
-                events = ["Put", "Delete"]
-            if "Copy" in event_type:
-                events = ["Put", "Copy"]
-            if "Multipart" in event_type:
-                events = ["Post", "Put", "CompleteMultipartUpload"]
-            for event in events:
-                if event in eventName:
-                    log.info(f"eventName: {eventName} in event record")
-
-            # fetch bucket details and verify bucket attributes in event record
-            bucket_stats = utils.exec_shell_cmd(
-                "radosgw-admin bucket stats --bucket  %s" % bucket
-            )
-            bucket_stats_json = json.loads(bucket_stats)
-            log.info("verify bucket attributes in event record")
-            # verify bucket name in event record
-            bucket_name = event_record_json["Records"][0]["s3"]["bucket"]["name"]
-            if bucket in bucket_name:
-                log.info(f"Bucket-name: {bucket_name}")
-            else:
-                raise EventRecordDataError("BucketName not in event record")
-
-            # verify bucket id in event record
-            bucket_id = bucket_stats_json["id"]
-            bucket_id_evnt = event_record_json["Records"][0]["s3"]["bucket"]["id"]
-            if bucket_id in bucket_id_evnt:
-                log.info(f"Bucket-id: {bucket_id}")
-            else:
-                raise EventRecordDataError("BucketID not in event record")
-
-            # verify bucket owner in event record
-            bucket_owner = bucket_stats_json["owner"]
-            bkt_owner_evnt = event_record_json["Records"][0]["s3"]["bucket"][
-                "ownerIdentity"
-            ]["principalId"]
-            if bucket_owner == bkt_owner_evnt:
-                log.info(f"Bucket-owner: {bucket_owner}")
-            else:
-                raise EventRecordDataError("BucketOwner not in event record")
-
-            log.info("verify object attributes")
-            # verify object size attribute
-            size = event_record_json["Records"][0]["s3"]["object"]["size"]
-            # verify object size is not 0, for the object. BZ:https://bugzilla.redhat.com/show_bug.cgi?id=1960648
-            if size == 0:
-                if "Post" in eventName:
-                    log.info("Expected behavior")
-                elif "nautilus" not in ceph_version:
-                    raise EventRecordDataError("size: Object size is 0")
-            else:
-                log.info(f"size: {size}")
+            validator.validate(json.loads(record)["Records"][0])
 
     # delete event record
     log.info("deleting local file to verify event record")
-    utils.exec_shell_cmd("rm -rf %s" % event_record_path)
+    utils.remove_path(event_record_path)
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import v2.utils.utils as utils
+from v2.lib.exceptions import TestExecError
+
+log = logging.getLogger()
+
+KAFKA_HOME = "/usr/local/kafka"
+KAFKA_BOOTSTRAP_SERVER = "localhost:9092"
+DEFAULT_IDLE_TIMEOUT = 30
+
+
+class EventConsumer(object):
+    """
+    Source of the event records pushed by rgw for a topic, each record is
+    returned with the time it was received, None if the consumer cannot tell.
+    The functions in this class are
+    1. start(): start consuming, before the objects are written
+    2. records(): yield (receipt time, event record) until no record came
+       in for idle_timeout secs
+    3. stop(): release the consumer
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.received = queue.Queue()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        pass
+
+    def records(self):
+        while True:
+            try:
+                yield self.received.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                return
+
+    def stop(self):
+        pass
+
+
+class KafkaConsoleConsumer(EventConsumer):
+    """
+    Consumes the topic with kafka-console-consumer.sh into a file, the receipt
+    time of a record is its broker timestamp, None if it has none
+    """
+
+    def __init__(
+        self,
+        topic_name,
+        event_record_path="/tmp/event_record",
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+    ):
+        super(KafkaConsoleConsumer, self).__init__(idle_timeout)
+        self.topic_name = topic_name
+        self.event_record_path = event_record_path
+
+    def records(self):
+        if os.path.isfile(self.event_record_path):
+            log.info("stale event record file exists, deleting it")
+            utils.remove_path(self.event_record_path)
+        cmd = (
+            f"sudo {KAFKA_HOME}/bin/kafka-console-consumer.sh --bootstrap-server "
+            f"kafka://{KAFKA_BOOTSTRAP_SERVER} --from-beginning --topic {self.topic_name} "
+            f"--timeout-ms {self.idle_timeout * 1000} "
+            f"--property print.timestamp=true >> {self.event_record_path}"
+        )
+        utils.exec_shell_cmd(cmd)
+        if not os.path.isfile(self.event_record_path):
+            return
+        with open(self.event_record_path, "r") as records:
+            for record in records:
+                if record.strip():
+                    yield self.parse_record(record)
+
+    @staticmethod
+    def parse_record(line):
+        """
+        Returns (broker timestamp in secs or None, event record) of a line
+        printed with print.timestamp, ex: CreateTime:1697534400123<tab>{...}
+        """
+        prefix, sep, record = line.partition("\t")
+        if not sep or prefix.lstrip().startswith("{"):
+            return None, json.loads(line)
+        # NO_TIMESTAMP, or CreateTime:-1, for messages without timestamp
+        if not prefix.startswith(("CreateTime:", "LogAppendTime:")):
+            return None, json.loads(record)
+        millis = int(prefix.split(":", 1)[1])
+        return (millis / 1000 if millis >= 0 else None), json.loads(record)
+
+    def stop(self):
+        if os.path.isfile(self.event_record_path):
+            utils.remove_path(self.event_record_path)
+
+
+class KafkaConsumer(EventConsumer):
+    """
+    Consumes the topic in process, needs the optional kafka-python package
+    """
+
+    def __init__(
+        self,
+        topic_name=None,
+        pattern=None,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVER,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+    ):
+        super(KafkaConsumer, self).__init__(idle_timeout)
+        try:
+            import kafka
+        except ImportError:
+            raise TestExecError("kafka consumer needs the kafka-python package")
+        self.consumer = kafka.KafkaConsumer(
+            bootstrap_servers=bootstrap_servers,
+            auto_offset_reset="earliest",
+            # topics matching the pattern are created while consuming
+            metadata_max_age_ms=5000,
+        )
+        if pattern:
+            self.consumer.subscribe(pattern=pattern)
+        else:
+            self.consumer.subscribe([topic_name])
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.poll, daemon=True)
+
+    def poll(self):
+        while not self.stopped.is_set():
+            for messages in self.consumer.poll(timeout_ms=1000).values():
+                received = time.time()
+                for message in messages:
+                    self.received.put((received, json.loads(message.value)))
+
+    def start(self):
+        log.info(f"starting kafka consumer for topics: {self.consumer.subscription()}")
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.consumer.close()
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        received = time.time()
+        self.send_response(200)
+        self.end_headers()
+        try:
+            self.server.received.put((received, json.loads(body)))
+        except ValueError:
+            log.error(f"invalid event record pushed: {body[:200]}")
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+class HttpEndpoint(EventConsumer):
+    """
+    Local http endpoint rgw pushes the event records to, a stand in for a
+    kafka broker. Use push_endpoint as the push-endpoint of the topic.
+    """
+
+    def __init__(self, host="localhost", port=0, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        super(HttpEndpoint, self).__init__(idle_timeout)
+        self.server = ThreadingHTTPServer((host, port), _PushHandler)
+        self.server.daemon_threads = True
+        # the handler queues the records received by the endpoint
+        self.server.received = self.received
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def push_endpoint(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        log.info(f"starting http endpoint for event records at {self.push_endpoint}")
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def get_consumer(config, topic_name=None, pattern=None):
+    """
+    Returns the consumer for test_ops.consumer: console (default), kafka or http
+    """
+    kind = config.test_ops.get("consumer", "console")
+    idle_timeout = config.test_ops.get("consumer_timeout", DEFAULT_IDLE_TIMEOUT)
+    if kind == "console":
+        return KafkaConsoleConsumer(topic_name, idle_timeout=idle_timeout)
+    if kind == "kafka":
+        return KafkaConsumer(topic_name, pattern, idle_timeout=idle_timeout)
+    if kind == "http":
+        return HttpEndpoint(
+            port=config.test_ops.get("http_endpoint_port", 0),
+            idle_timeout=idle_timeout,
+        )
+    raise TestExecError(f"unknown event consumer: {kind}")
@@ -0,0 +1,317 @@
+"""
+run_suite - Runs a suite of s3_swift tests, the independent ones concurrently
+
+Usage: run_suite.py -m <manifest-yaml> [-j <workers>]
+
+Operation:
+    Read the suite manifest: the test scripts and their yaml configs
+    Find the cluster state each test mutates, from the manifest or the script:
+        ceph_conf, rgw_restart and zone_placement are exclusive, such tests run alone
+        other resources, ex: lc or gc processing, are held by one test at a time
+    Run the exclusive tests first, then the others concurrently, longest first as
+    per the durations of the previous runs
+    Each test runs in its own work directory, for its io_info, with its own
+    namespace for the users and buckets it creates
+    Write a JUnit xml and a json summary
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../..")))
+import argparse
+import json
+import logging
+import subprocess
+import time
+import traceback
+from xml.etree import ElementTree
+
+import yaml
+from v2.utils.log import LOG_DIR, configure_logging
+
+log = logging.getLogger()
+
+TESTS_DIR = os.path.abspath(os.path.dirname(__file__))
+CONFIGS_DIR = os.path.join(TESTS_DIR, "configs")
+DURATIONS_FNAME = os.path.join(LOG_DIR, "suite_durations.json")
+DEFAULT_TIMEOUT = 3600
+
+# mutations of the cluster every other test would see
+EXCLUSIVE = {"ceph_conf", "rgw_restart", "zone_placement"}
+# marker in the test script and the resource it mutates
+MUTATION_MARKERS = {
+    "set_to_ceph_conf": "ceph_conf",
+    "ceph config set": "ceph_conf",
+    ".restart(": "rgw_restart",
+    "zone placement": "zone_placement",
+    "zonegroup placement": "zone_placement",
+    "lc process": "lc",
+    "gc process": "gc",
+}
+# keys of the test config which reconfigure and restart the rgw daemons
+CONFIG_MUTATION_KEYS = {
+    "frontend": "rgw_restart",
+    "ssl": "rgw_restart",
+}
+
+
+def detect_mutations(script_path, config_path=None):
+    """
+    Returns the resources a test script mutates, found from its source and
+    the keys of its config
+    """
+    with open(script_path, "r") as fp:
+        source = fp.read()
+    mutates = {res for marker, res in MUTATION_MARKERS.items() if marker in source}
+    if config_path and os.path.exists(config_path):
+        with open(config_path, "r") as fp:
+            config = (yaml.safe_load(fp) or {}).get("config") or {}
+        mutates.update(
+            res for key, res in CONFIG_MUTATION_KEYS.items() if key in config
+        )
+    return sorted(mutates)
+
+
+class SuiteTest(object):
+    """
+    A test script and its config, from the suite manifest
+    """
+
+    def __init__(self, index, entry, durations):
+        self.index = index
+        self.script = entry["script"]
+        self.config = entry["config"]
+        self.id = f"{self.script}::{self.config}"
+        self.script_path = os.path.join(TESTS_DIR, self.script)
+        self.config_path = os.path.join(CONFIGS_DIR, self.config)
+        self.timeout = entry.get("timeout", DEFAULT_TIMEOUT)
+        if "mutates" in entry:
+            self.mutates = set(entry["mutates"] or [])
+        else:
+            self.mutates = set(detect_mutations(self.script_path, self.config_path))
+        self.exclusive = bool(self.mutates & EXCLUSIVE)
+        # unknown tests are scheduled as if long, to start early
+        self.expected = durations.get(self.id, max(durations.values(), default=0))
+        self.proc = None
+        self.started = None
+        self.duration = None
+        self.status = "pending"
+
+    def start(self, work_dir, extra_args):
+        self.work_dir = os.path.join(work_dir, f"{self.index:03d}")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.output = os.path.join(self.work_dir, "output.log")
+        env = dict(os.environ, RGW_TEST_NAMESPACE=f"t{self.index}")
+        cmd = [sys.executable, self.script_path, "-c", self.config_path] + extra_args
+        log.info(f"starting {self.id}, mutates: {sorted(self.mutates)}")
+        with open(self.output, "w") as out:
+            self.proc = subprocess.Popen(
+                cmd, cwd=self.work_dir, env=env, stdout=out, stderr=subprocess.STDOUT
+            )
+        self.started = time.time()
+        self.status = "running"
+
+    def poll(self):
+        """
+        Returns True once the test completed or was killed on timeout
+        """
+        self.duration = time.time() - self.started
+        if self.proc.poll() is None:
+            if self.duration < self.timeout:
+                return False
+            log.error(f"{self.id} timed out after {self.timeout} secs")
+            self.proc.kill()
+            self.proc.wait()
+            self.status = "timeout"
+        else:
+            self.status = "passed" if self.proc.returncode == 0 else "failed"
+        log.info(f"{self.id} {self.status} in {self.duration:.1f} secs")
+        return True
+
+    def tail(self, lines=50):
+        with open(self.output, "r", errors="replace") as fp:
+            return "".join(fp.readlines()[-lines:])
+
+
+class Scheduler(object):
+    """
+    Runs the suite tests on a number of slots
+    The functions in this class are
+    1. run(): run the tests until all completed, or the first failure with fail_fast
+    2. can_start(): check if a test conflicts with the running ones
+    """
+
+    def __init__(self, tests, workers, work_dir, extra_args, fail_fast=False):
+        # exclusive tests first while nothing runs, then the longest first
+        self.pending = sorted(tests, key=lambda t: (not t.exclusive, -t.expected))
+        self.workers = workers
+        self.work_dir = work_dir
+        self.extra_args = extra_args
+        self.fail_fast = fail_fast
+        self.running = []
+        self.completed = []
+
+    def can_start(self, test):
+        if len(self.running) >= self.workers:
+            return False
+        if test.exclusive:
+            return not self.running
+        for other in self.running:
+            if other.exclusive or test.mutates & other.mutates:
+                return False
+        return True
+
+    def run(self):
+        start = time.time()
+        failed = False
+        while self.pending or self.running:
+            for test in list(self.running):
+                if test.poll():
+                    self.running.remove(test)
+                    self.completed.append(test)
+                    failed = failed or test.status != "passed"
+            if failed and self.fail_fast:
+                for test in self.pending:
+                    test.status = "skipped"
+                self.completed.extend(self.pending)
+                self.pending = []
+                if not self.running:
+                    break
+            for test in list(self.pending):
+                if self.can_start(test):
+                    self.pending.remove(test)
+                    test.start(self.work_dir, self.extra_args)
+                    self.running.append(test)
+                elif test.exclusive:
+                    # let the running tests drain, not to starve an exclusive test
+                    break
+            time.sleep(1)
+        return time.time() - start
+
+
+def write_junit(tests, elapsed, fname):
+    suite = ElementTree.Element(
+        "testsuite",
+        name="rgw_s3_swift",
+        tests=str(len(tests)),
+        failures=str(sum(t.status in ("failed", "timeout") for t in tests)),
+        skipped=str(sum(t.status == "skipped" for t in tests)),
+        time=f"{elapsed:.1f}",
+    )
+    for test in sorted(tests, key=lambda t: t.index):
+        case = ElementTree.SubElement(
+            suite,
+            "testcase",
+            classname=os.path.splitext(test.script)[0],
+            name=test.config,
+            time=f"{test.duration or 0:.1f}",
+        )
+        if test.status == "skipped":
+            ElementTree.SubElement(case, "skipped")
+        elif test.status != "passed":
+            failure = ElementTree.SubElement(case, "failure", message=test.status)
+            failure.text = test.tail()
+    ElementTree.ElementTree(suite).write(fname, encoding="utf-8", xml_declaration=True)
+
+
+def write_summary(tests, elapsed, fname):
+    summary = {
+        "elapsed": round(elapsed, 1),
+        "serial_time": round(sum(t.duration or 0 for t in tests), 1),
+        "tests": [
+            {
+                "id": t.id,
+                "status": t.status,
+                "duration": round(t.duration or 0, 1),
+                "mutates": sorted(t.mutates),
+                "output": getattr(t, "output", None),
+            }
+            for t in sorted(tests, key=lambda t: t.index)
+        ],
+    }
+    with open(fname, "w") as fp:
+        json.dump(summary, fp, indent=2)
+
+
+def update_durations(tests, fname):
+    durations = load_durations(fname)
+    for test in tests:
+        if test.status == "passed":
+            durations[test.id] = round(test.duration, 1)
+    with open(fname, "w") as fp:
+        json.dump(durations, fp, indent=2, sort_keys=True)
+
+
+def load_durations(fname):
+    if not os.path.exists(fname):
+        return {}
+    with open(fname, "r") as fp:
+        return json.load(fp)
+
+
+def run_suite(args, extra_args):
+    with open(args.manifest, "r") as fp:
+        manifest = yaml.safe_load(fp)
+    durations = load_durations(args.durations)
+    tests = [
+        SuiteTest(i, entry, durations) for i, entry in enumerate(manifest["tests"])
+    ]
+    work_dir = os.path.join(args.work_dir, time.strftime("suite-%Y%m%d-%H%M%S"))
+    os.makedirs(work_dir)
+    log.info(f"running {len(tests)} tests with {args.workers} workers in {work_dir}")
+
+    scheduler = Scheduler(tests, args.workers, work_dir, extra_args, args.fail_fast)
+    elapsed = scheduler.run()
+
+    write_junit(tests, elapsed, os.path.join(work_dir, "junit.xml"))
+    write_summary(tests, elapsed, os.path.join(work_dir, "summary.json"))
+    update_durations(tests, args.durations)
+    serial_time = sum(t.duration or 0 for t in tests)
+    not_passed = [t for t in tests if t.status != "passed"]
+    log.info(
+        f"suite completed in {elapsed:.1f} secs, {serial_time:.1f} secs of tests, "
+        f"{len(tests) - len(not_passed)}/{len(tests)} passed, results in {work_dir}"
+    )
+    for test in not_passed:
+        log.error(f"{test.id}: {test.status}")
+    return not not_passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RGW S3 suite runner")
+    parser.add_argument("-m", dest="manifest", help="suite manifest yaml")
+    parser.add_argument(
+        "-j", dest="workers", type=int, default=4, help="tests run concurrently"
+    )
+    parser.add_argument(
+        "--work-dir", dest="work_dir", default=LOG_DIR, help="dir of the test outputs"
+    )
+    parser.add_argument(
+        "--durations",
+        dest="durations",
+        default=DURATIONS_FNAME,
+        help="durations of the previous runs, to start the longest tests first",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        dest="fail_fast",
+        action="store_true",
+        help="do not start any test after a failure",
+    )
+    parser.add_argument(
+        "-log_level",
+        dest="log_level",
+        help="Set Log Level [DEBUG, INFO, WARNING, ERROR, CRITICAL]",
+        default="info",
+    )
+    # other arguments are passed to every test, ex: --rgw-node
+    args, extra_args = parser.parse_known_args()
+    configure_logging(f_name="run_suite", set_level=args.log_level.upper())
+    try:
+        passed = run_suite(args, extra_args)
+        sys.exit(0 if passed else 1)
+    except Exception as e:
+        log.error(e)
+        log.error(traceback.format_exc())
+        sys.exit(1)
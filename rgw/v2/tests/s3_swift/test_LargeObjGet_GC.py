@@ -81,8 +81,7 @@ def test_exec(config, ssh_con):
                             ssh_con,
                         )
                         log.info("trying to restart services")
-                        srv_restarted = rgw_service.restart(ssh_con)
-                        time.sleep(30)
+                        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
                         if srv_restarted is False:
                             raise TestExecError("RGW service restart failed")
                         else:
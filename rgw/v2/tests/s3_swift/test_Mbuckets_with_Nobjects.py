@@ -17,6 +17,7 @@ Usage: test_Mbuckets_with_Nobjects.py -c <input_yaml>
         test_multisite_dynamic_resharding_greenfield.yaml
 	test_gc_list_multipart.yaml
         test_Mbuckets_with_Nobjects_etag.yaml
+        test_Mbuckets_with_Nobjects_parallel.yaml
 
 Operation:
 	Creates M bucket and N objects
@@ -29,6 +30,7 @@ Operation:
 	Creates M bucket and N objects. With sharding set to max_shards as specified in the config
 	Verify gc command
         Verify eTag
+        Creates M bucket and N objects with a pool of workers, as per the workload section
 """
 # test basic creation of buckets with objects
 import os
@@ -44,6 +46,7 @@ import time
 import traceback
 
 import v2.lib.resource_op as s3lib
+import v2.lib.workload as workload
 import v2.utils.utils as utils
 from v2.lib.exceptions import RGWBaseException, TestExecError
 from v2.lib.resource_op import Config
@@ -61,6 +64,108 @@ password = "32characterslongpassphraseneeded".encode("utf-8")
 encryption_key = hashlib.md5(password).hexdigest()
 
 
+def upload_and_verify_object(
+    config, each_user, conn_args, bucket_name_to_create, oc, size
+):
+    """
+    Workload task uploading one object, then downloading it and verifying the
+    md5 and etag as per the config
+    """
+    rgw_conn = workload.connect(conn_args)
+    bucket = s3lib.resource_op(
+        {"obj": rgw_conn, "resource": "Bucket", "args": [bucket_name_to_create]}
+    )
+    s3_object_name = utils.gen_s3_object_name(bucket_name_to_create, oc)
+    log.info("s3 object name: %s" % s3_object_name)
+    s3_object_path = os.path.join(TEST_DATA_PATH, s3_object_name)
+    log.info("s3 object path: %s" % s3_object_path)
+    reusable.upload_object_task(
+        s3_object_name,
+        bucket_name_to_create,
+        TEST_DATA_PATH,
+        config,
+        each_user,
+        conn_args,
+        size,
+    )
+    if config.test_ops["download_object"] is True:
+        log.info("trying to download object: %s" % s3_object_name)
+        s3_object_download_name = s3_object_name + "." + "download"
+        s3_object_download_path = os.path.join(TEST_DATA_PATH, s3_object_download_name)
+        log.info("s3_object_download_path: %s" % s3_object_download_path)
+        log.info("downloading to filename: %s" % s3_object_download_name)
+        if config.test_ops.get("encryption_algorithm", None) is not None:
+            log.info("encryption download")
+            log.info(
+                "encryption algorithm: %s" % config.test_ops["encryption_algorithm"]
+            )
+            object_downloaded_status = bucket.download_file(
+                s3_object_name,
+                s3_object_download_path,
+                ExtraArgs={
+                    "SSECustomerKey": encryption_key,
+                    "SSECustomerAlgorithm": config.test_ops["encryption_algorithm"],
+                },
+            )
+        else:
+            object_downloaded_status = s3lib.resource_op(
+                {
+                    "obj": bucket,
+                    "resource": "download_file",
+                    "args": [
+                        s3_object_name,
+                        s3_object_download_path,
+                    ],
+                }
+            )
+        if object_downloaded_status is False:
+            raise TestExecError("Resource execution failed: object download failed")
+        if object_downloaded_status is None:
+            log.info("object downloaded")
+        s3_object_downloaded_md5 = utils.get_md5(s3_object_download_path)
+        s3_object_uploaded_md5 = utils.get_md5(s3_object_path)
+        log.info("s3_object_downloaded_md5: %s" % s3_object_downloaded_md5)
+        log.info("s3_object_uploaded_md5: %s" % s3_object_uploaded_md5)
+        if str(s3_object_uploaded_md5) == str(s3_object_downloaded_md5):
+            log.info("md5 match")
+            utils.remove_path(s3_object_download_path)
+        else:
+            raise TestExecError("md5 mismatch")
+    if config.local_file_delete is True:
+        log.info("deleting local file created after the upload")
+        utils.remove_path(s3_object_path)
+
+    if config.etag_verification is True:
+        log.info(f"Verification of eTag is started!!! ")
+        object_ptr = s3lib.resource_op(
+            {
+                "obj": bucket,
+                "resource": "Object",
+                "args": [s3_object_name],
+            }
+        )
+        object_info = object_ptr.get()
+        log.info(f"object info is {object_info}")
+        if object_info["ResponseMetadata"]["HTTPStatusCode"] != 200:
+            raise AssertionError(f"failed to get response of objects")
+        eTag_aws = object_info["ETag"].split('"')[1]
+        log.info(f"etag from aws is :{eTag_aws}")
+        cmd = f"radosgw-admin bucket list --bucket {bucket.name}"
+        out = utils.exec_shell_cmd(cmd)
+        data = json.loads(out)
+        for object in data:
+            if str(s3_object_name) == str(object["name"]):
+                eTag_radosgw = object["meta"]["etag"]
+                log.info(f"etag from radosgw is :{eTag_radosgw}")
+                if str(eTag_aws) == str(eTag_radosgw):
+                    log.info(f"eTag matched!!")
+                else:
+                    raise AssertionError(
+                        f"mismatch found in the eTAG from aws and radosgw"
+                    )
+    return s3_object_name
+
+
 def test_exec(config, ssh_con):
 
     io_info_initialize = IOInfoInitialize()
@@ -81,561 +186,469 @@ def test_exec(config, ssh_con):
         ceph_conf.set_to_ceph_conf(
             "global", ConfigOpts.rgw_crypt_require_ssl, "false", ssh_con
         )
-        srv_restarted = rgw_service.restart(ssh_con)
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
             log.info("RGW service restarted")
-    for each_user in all_users_info:
-        # authenticate
-        auth = Auth(each_user, ssh_con, ssl=config.ssl)
-        if config.use_aws4 is True:
-            rgw_conn = auth.do_auth(**{"signature_version": "s3v4"})
-        else:
-            rgw_conn = auth.do_auth()
-        # enabling sharding
-        if config.test_ops["sharding"]["enable"] is True:
-            log.info("enabling sharding on buckets")
-            max_shards = config.test_ops["sharding"]["max_shards"]
-            log.info("making changes to ceph.conf")
-            ceph_conf.set_to_ceph_conf(
-                "global",
-                ConfigOpts.rgw_override_bucket_index_max_shards,
-                str(max_shards),
-                ssh_con,
-            )
-            log.info("trying to restart services ")
-            srv_restarted = rgw_service.restart(ssh_con)
-            time.sleep(10)
-            if srv_restarted is False:
-                raise TestExecError("RGW service restart failed")
-            else:
-                log.info("RGW service restarted")
-        if config.test_ops["compression"]["enable"] is True:
-            compression_type = config.test_ops["compression"]["type"]
-            log.info("enabling compression")
-            cmd = "radosgw-admin zone get"
-            out = utils.exec_shell_cmd(cmd)
-            zone = json.loads(out)
-            zone = zone.get("name")
-            cmd = (
-                "radosgw-admin zone placement modify --rgw-zone=%s "
-                "--placement-id=default-placement --compression=%s"
-                % (zone, compression_type)
+    executor = workload.WorkloadExecutor.from_config(config)
+    # gc config changed by the users, restored on exit even if the test fails
+    with ceph_conf.transaction(rgw_service) as gc_conf_txn:
+        for each_user in all_users_info:
+            # authenticate
+            auth = Auth(each_user, ssh_con, ssl=config.ssl)
+            auth_config = (
+                {"signature_version": "s3v4"} if config.use_aws4 is True else {}
             )
-            out = utils.exec_shell_cmd(cmd)
-            ceph_version = utils.exec_shell_cmd("ceph version").split()[4]
-            try:
-                data = json.loads(out)
-                if ceph_version == "luminous":
-                    if (
-                        data["placement_pools"][0]["val"]["compression"]
-                        == compression_type
-                    ):
-                        log.info("Compression enabled successfully")
-                    else:
-                        log.error("Compression is not enabled on cluster")
-                        raise TestExecError("Compression is not enabled on cluster")
-
-                else:
-                    if (
-                        data["placement_pools"][0]["val"]["storage_classes"][
-                            "STANDARD"
-                        ]["compression_type"]
-                        == compression_type
-                    ):
-                        log.info("Compression enabled successfully")
-                    else:
-                        log.error("Compression is not enabled on cluster")
-                        raise TestExecError("Compression is not enabled on cluster")
-
-            except ValueError as e:
-                log.error(e)
-                exit(str(e))
-            log.info("trying to restart rgw services ")
-            srv_restarted = rgw_service.restart(ssh_con)
-            time.sleep(10)
-            if srv_restarted is False:
-                raise TestExecError("RGW service restart failed")
-            else:
-                log.info("RGW service restarted")
-        if config.gc_verification is True:
-            conf = config.ceph_conf
-            reusable.set_gc_conf(ceph_conf, conf)
-        if config.dynamic_resharding is True:
-            if utils.check_dbr_support():
+            rgw_conn = auth.do_auth(**auth_config)
+            conn_args = workload.connection_args(auth, **auth_config)
+            # enabling sharding
+            if config.test_ops["sharding"]["enable"] is True:
+                log.info("enabling sharding on buckets")
+                max_shards = config.test_ops["sharding"]["max_shards"]
                 log.info("making changes to ceph.conf")
                 ceph_conf.set_to_ceph_conf(
                     "global",
-                    ConfigOpts.rgw_max_objs_per_shard,
-                    str(config.max_objects_per_shard),
+                    ConfigOpts.rgw_override_bucket_index_max_shards,
+                    str(max_shards),
                     ssh_con,
                 )
-                srv_restarted = rgw_service.restart(ssh_con)
-        if config.bucket_sync_run_with_disable_sync_thread:
-            log.info("making changes to ceph.conf")
-            ceph_conf.set_to_ceph_conf(
-                "global", ConfigOpts.rgw_run_sync_thread, "false", ssh_con
-            )
-            srv_restarted = rgw_service.restart(ssh_con)
-
-        if config.test_aync_data_notifications:
-            log.info("Testing asyc data notifications")
-            ceph_version_id, _ = utils.get_ceph_version()
-            if float(ceph_version_id[1]) >= 6 and float(ceph_version_id[5]) >= 8:
-                set_log = "ceph config set global log_to_file true"
-                out = utils.exec_shell_cmd(set_log)
-                cmd = " ceph orch ps | grep rgw"
+                log.info("trying to restart services ")
+                srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
+                if srv_restarted is False:
+                    raise TestExecError("RGW service restart failed")
+                else:
+                    log.info("RGW service restarted")
+            if config.test_ops["compression"]["enable"] is True:
+                compression_type = config.test_ops["compression"]["type"]
+                log.info("enabling compression")
+                cmd = "radosgw-admin zone get"
                 out = utils.exec_shell_cmd(cmd)
-                rgw_process_name = out.split()[0]
-                utils.exec_shell_cmd(
-                    f"ceph config set client.{rgw_process_name} rgw_data_notify_interval_msec 0"
+                zone = json.loads(out)
+                zone = zone.get("name")
+                cmd = (
+                    "radosgw-admin zone placement modify --rgw-zone=%s "
+                    "--placement-id=default-placement --compression=%s"
+                    % (zone, compression_type)
                 )
-            ceph_conf.set_to_ceph_conf(
-                "global",
-                ConfigOpts.log_to_file,
-                "true",
-            )
-            ceph_conf.set_to_ceph_conf(
-                "global", ConfigOpts.debug_rgw, str(config.debug_rgw), ssh_con
-            )
+                out = utils.exec_shell_cmd(cmd)
+                ceph_version = utils.exec_shell_cmd("ceph version").split()[4]
+                try:
+                    data = json.loads(out)
+                    if ceph_version == "luminous":
+                        if (
+                            data["placement_pools"][0]["val"]["compression"]
+                            == compression_type
+                        ):
+                            log.info("Compression enabled successfully")
+                        else:
+                            log.error("Compression is not enabled on cluster")
+                            raise TestExecError("Compression is not enabled on cluster")
 
-        # create buckets
-        if config.test_ops["create_bucket"] is True:
-            log.info("no of buckets to create: %s" % config.bucket_count)
-            for bc in range(config.bucket_count):
-                bucket_name_to_create = utils.gen_bucket_name_from_userid(
-                    each_user["user_id"], rand_no=bc
-                )
-                if config.bucket_sync_crash is True:
-                    is_primary = utils.is_cluster_primary()
-                    if is_primary:
-                        bucket_name_to_create = "bkt-crash-check"
-                if config.dbr_scenario == "brownfield":
-                    bucket_name_to_create = (
-                        "brownfield-dynamic-bkt"
-                        if config.dynamic_resharding
-                        else "brownfield-manual-bkt"
+                    else:
+                        if (
+                            data["placement_pools"][0]["val"]["storage_classes"][
+                                "STANDARD"
+                            ]["compression_type"]
+                            == compression_type
+                        ):
+                            log.info("Compression enabled successfully")
+                        else:
+                            log.error("Compression is not enabled on cluster")
+                            raise TestExecError("Compression is not enabled on cluster")
+
+                except ValueError as e:
+                    log.error(e)
+                    exit(str(e))
+                log.info("trying to restart rgw services ")
+                srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
+                if srv_restarted is False:
+                    raise TestExecError("RGW service restart failed")
+                else:
+                    log.info("RGW service restarted")
+            if config.gc_verification is True:
+                conf = config.ceph_conf
+                # only the first call changes the config, the next ones are no-ops
+                reusable.set_gc_conf(ceph_conf, conf, gc_conf_txn)
+            if config.dynamic_resharding is True:
+                if utils.check_dbr_support():
+                    log.info("making changes to ceph.conf")
+                    ceph_conf.set_to_ceph_conf(
+                        "global",
+                        ConfigOpts.rgw_max_objs_per_shard,
+                        str(config.max_objects_per_shard),
+                        ssh_con,
                     )
+                    srv_restarted = rgw_service.restart(ssh_con)
+            if config.bucket_sync_run_with_disable_sync_thread:
+                log.info("making changes to ceph.conf")
+                ceph_conf.set_to_ceph_conf(
+                    "global", ConfigOpts.rgw_run_sync_thread, "false", ssh_con
+                )
+                srv_restarted = rgw_service.restart(ssh_con)
 
-                log.info("creating bucket with name: %s" % bucket_name_to_create)
-                bucket = reusable.create_bucket(
-                    bucket_name_to_create, rgw_conn, each_user
+            if config.test_aync_data_notifications:
+                log.info("Testing asyc data notifications")
+                ceph_version_id, _ = utils.get_ceph_version()
+                if float(ceph_version_id[1]) >= 6 and float(ceph_version_id[5]) >= 8:
+                    set_log = "ceph config set global log_to_file true"
+                    out = utils.exec_shell_cmd(set_log)
+                    cmd = " ceph orch ps | grep rgw"
+                    out = utils.exec_shell_cmd(cmd)
+                    rgw_process_name = out.split()[0]
+                    utils.exec_shell_cmd(
+                        f"ceph config set client.{rgw_process_name} rgw_data_notify_interval_msec 0"
+                    )
+                ceph_conf.set_to_ceph_conf(
+                    "global",
+                    ConfigOpts.log_to_file,
+                    "true",
+                )
+                ceph_conf.set_to_ceph_conf(
+                    "global", ConfigOpts.debug_rgw, str(config.debug_rgw), ssh_con
                 )
-                if config.dynamic_resharding is True:
-                    reusable.check_sync_status()
-                    op = utils.exec_shell_cmd(
-                        f"radosgw-admin bucket stats --bucket {bucket.name}"
+
+            # create buckets
+            if config.test_ops["create_bucket"] is True:
+                log.info("no of buckets to create: %s" % config.bucket_count)
+                bucket_names = []
+                for bc in range(config.bucket_count):
+                    bucket_name_to_create = utils.gen_bucket_name_from_userid(
+                        each_user["user_id"], rand_no=bc
                     )
-                    json_doc = json.loads(op)
-                    old_num_shards = json_doc["num_shards"]
-                    log.info(f"no_of_shards_created: {old_num_shards}")
-                if config.test_ops["create_object"] is True:
-                    # uploading data
-                    log.info("s3 objects to create: %s" % config.objects_count)
-                    if utils.check_dbr_support():
-                        if bucket_name_to_create in [
-                            "brownfield-dynamic-bkt",
-                            "brownfield-manual-bkt",
-                        ]:
-                            op = utils.exec_shell_cmd(
-                                f"radosgw-admin bucket stats --bucket {bucket.name}"
-                            )
-                            json_doc = json.loads(op)
-                            if bool(json_doc["usage"]):
-                                num_object = json_doc["usage"]["rgw.main"][
-                                    "num_objects"
-                                ]
-                                config.objects_count = (
-                                    num_object * 2 + config.objects_count
+                    if config.bucket_sync_crash is True:
+                        is_primary = utils.is_cluster_primary()
+                        if is_primary:
+                            bucket_name_to_create = "bkt-crash-check"
+                    if config.dbr_scenario == "brownfield":
+                        bucket_name_to_create = (
+                            "brownfield-dynamic-bkt"
+                            if config.dynamic_resharding
+                            else "brownfield-manual-bkt"
+                        )
+                    bucket_names.append(bucket_name_to_create)
+                    executor.submit(
+                        reusable.create_bucket_task,
+                        bucket_name_to_create,
+                        conn_args,
+                        each_user,
+                        user=each_user["user_id"],
+                        group=bucket_name_to_create,
+                    )
+                executor.run().raise_on_failure()
+                for bucket_name_to_create in bucket_names:
+                    bucket = s3lib.resource_op(
+                        {
+                            "obj": rgw_conn,
+                            "resource": "Bucket",
+                            "args": [bucket_name_to_create],
+                        }
+                    )
+                    if config.dynamic_resharding is True:
+                        reusable.check_sync_status()
+                        op = utils.exec_shell_cmd(
+                            f"radosgw-admin bucket stats --bucket {bucket.name}"
+                        )
+                        json_doc = json.loads(op)
+                        old_num_shards = json_doc["num_shards"]
+                        log.info(f"no_of_shards_created: {old_num_shards}")
+                    if config.test_ops["create_object"] is True:
+                        # uploading data
+                        log.info("s3 objects to create: %s" % config.objects_count)
+                        if utils.check_dbr_support():
+                            if bucket_name_to_create in [
+                                "brownfield-dynamic-bkt",
+                                "brownfield-manual-bkt",
+                            ]:
+                                op = utils.exec_shell_cmd(
+                                    f"radosgw-admin bucket stats --bucket {bucket.name}"
                                 )
-                                config.mapped_sizes = utils.make_mapped_sizes(config)
+                                json_doc = json.loads(op)
+                                if bool(json_doc["usage"]):
+                                    num_object = json_doc["usage"]["rgw.main"][
+                                        "num_objects"
+                                    ]
+                                    config.objects_count = (
+                                        num_object * 2 + config.objects_count
+                                    )
+                                    config.mapped_sizes = utils.make_mapped_sizes(
+                                        config
+                                    )
 
-                    for oc, size in list(config.mapped_sizes.items()):
-                        config.obj_size = size
-                        s3_object_name = utils.gen_s3_object_name(
-                            bucket_name_to_create, oc
-                        )
-                        log.info("s3 object name: %s" % s3_object_name)
-                        s3_object_path = os.path.join(TEST_DATA_PATH, s3_object_name)
-                        log.info("s3 object path: %s" % s3_object_path)
-                        if config.test_ops.get("upload_type") == "multipart":
-                            log.info("upload type: multipart")
-                            reusable.upload_mutipart_object(
-                                s3_object_name,
-                                bucket,
-                                TEST_DATA_PATH,
+                        for oc, size in list(config.mapped_sizes.items()):
+                            executor.submit(
+                                upload_and_verify_object,
                                 config,
                                 each_user,
+                                conn_args,
+                                bucket_name_to_create,
+                                oc,
+                                size,
+                                user=each_user["user_id"],
                             )
-                        else:
-                            log.info("upload type: normal")
-                            reusable.upload_object(
-                                s3_object_name,
-                                bucket,
-                                TEST_DATA_PATH,
-                                config,
-                                each_user,
-                            )
-                        if config.test_ops["download_object"] is True:
-                            log.info("trying to download object: %s" % s3_object_name)
-                            s3_object_download_name = s3_object_name + "." + "download"
-                            s3_object_download_path = os.path.join(
-                                TEST_DATA_PATH, s3_object_download_name
-                            )
-                            log.info(
-                                "s3_object_download_path: %s" % s3_object_download_path
-                            )
-                            log.info(
-                                "downloading to filename: %s" % s3_object_download_name
-                            )
-                            if (
-                                config.test_ops.get("encryption_algorithm", None)
-                                is not None
-                            ):
-                                log.info("encryption download")
-                                log.info(
-                                    "encryption algorithm: %s"
-                                    % config.test_ops["encryption_algorithm"]
-                                )
-                                object_downloaded_status = bucket.download_file(
-                                    s3_object_name,
-                                    s3_object_download_path,
-                                    ExtraArgs={
-                                        "SSECustomerKey": encryption_key,
-                                        "SSECustomerAlgorithm": config.test_ops[
-                                            "encryption_algorithm"
-                                        ],
-                                    },
-                                )
-                            else:
-                                object_downloaded_status = s3lib.resource_op(
-                                    {
-                                        "obj": bucket,
-                                        "resource": "download_file",
-                                        "args": [
-                                            s3_object_name,
-                                            s3_object_download_path,
-                                        ],
-                                    }
-                                )
-                            if object_downloaded_status is False:
-                                raise TestExecError(
-                                    "Resource execution failed: object download failed"
-                                )
-                            if object_downloaded_status is None:
-                                log.info("object downloaded")
-                            s3_object_downloaded_md5 = utils.get_md5(
-                                s3_object_download_path
-                            )
-                            s3_object_uploaded_md5 = utils.get_md5(s3_object_path)
-                            log.info(
-                                "s3_object_downloaded_md5: %s"
-                                % s3_object_downloaded_md5
-                            )
-                            log.info(
-                                "s3_object_uploaded_md5: %s" % s3_object_uploaded_md5
-                            )
-                            if str(s3_object_uploaded_md5) == str(
-                                s3_object_downloaded_md5
-                            ):
-                                log.info("md5 match")
-                                utils.exec_shell_cmd(
-                                    "rm -rf %s" % s3_object_download_path
-                                )
-                            else:
-                                raise TestExecError("md5 mismatch")
-                        if config.local_file_delete is True:
-                            log.info("deleting local file created after the upload")
-                            utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
-
-                        if config.etag_verification is True:
-                            log.info(f"Verification of eTag is started!!! ")
-                            object_ptr = s3lib.resource_op(
-                                {
-                                    "obj": bucket,
-                                    "resource": "Object",
-                                    "args": [s3_object_name],
-                                }
-                            )
-                            object_info = object_ptr.get()
-                            log.info(f"object info is {object_info}")
-                            if object_info["ResponseMetadata"]["HTTPStatusCode"] != 200:
-                                raise AssertionError(
-                                    f"failed to get response of objects"
-                                )
-                            eTag_aws = object_info["ETag"].split('"')[1]
-                            log.info(f"etag from aws is :{eTag_aws}")
-                            cmd = f"radosgw-admin bucket list --bucket {bucket.name}"
-                            out = utils.exec_shell_cmd(cmd)
-                            data = json.loads(out)
-                            for object in data:
-                                if str(s3_object_name) == str(object["name"]):
-                                    eTag_radosgw = object["meta"]["etag"]
-                                    log.info(f"etag from radosgw is :{eTag_radosgw}")
-                                    if str(eTag_aws) == str(eTag_radosgw):
-                                        log.info(f"eTag matched!!")
-                                    else:
-                                        raise AssertionError(
-                                            f"mismatch found in the eTAG from aws and radosgw"
-                                        )
-
-                    if config.reshard_cancel_cmd:
-                        if utils.check_dbr_support():
-                            op = utils.exec_shell_cmd(
-                                f"radosgw-admin reshard add --bucket {bucket.name} --num-shards 29"
-                            )
-                            op = utils.exec_shell_cmd(f"radosgw-admin reshard list")
-                            if bucket.name in op:
+                        executor.run().raise_on_failure()
+                        if config.reshard_cancel_cmd:
+                            if utils.check_dbr_support():
                                 op = utils.exec_shell_cmd(
-                                    f"radosgw-admin reshard cancel --bucket {bucket.name}"
+                                    f"radosgw-admin reshard add --bucket {bucket.name} --num-shards 29"
                                 )
-                                cancel_op = utils.exec_shell_cmd(
-                                    f"radosgw-admin reshard list"
-                                )
-                                if bucket.name in cancel_op:
+                                op = utils.exec_shell_cmd(f"radosgw-admin reshard list")
+                                if bucket.name in op:
+                                    op = utils.exec_shell_cmd(
+                                        f"radosgw-admin reshard cancel --bucket {bucket.name}"
+                                    )
+                                    cancel_op = utils.exec_shell_cmd(
+                                        f"radosgw-admin reshard list"
+                                    )
+                                    if bucket.name in cancel_op:
+                                        raise TestExecError(
+                                            "bucket is still in reshard queue"
+                                        )
+                                else:
                                     raise TestExecError(
-                                        "bucket is still in reshard queue"
+                                        "Command failed....Bucket is not added into reshard queue"
                                     )
-                            else:
+                        if config.bucket_sync_run:
+                            out = utils.check_bucket_sync(bucket.name)
+                            if out is False:
                                 raise TestExecError(
-                                    "Command failed....Bucket is not added into reshard queue"
+                                    "Command is throwing error while running bucket sync run"
                                 )
-                    if config.bucket_sync_run:
-                        out = utils.check_bucket_sync(bucket.name)
-                        if out is False:
-                            raise TestExecError(
-                                "Command is throwing error while running bucket sync run"
-                            )
 
-                    if config.bucket_sync_status:
-                        out = utils.wait_till_bucket_synced(bucket.name)
-                        if not out:
-                            log.info("Bucket sync is not caught up with source.")
+                        if config.bucket_sync_status:
+                            out = utils.wait_till_bucket_synced(bucket.name)
+                            if not out:
+                                log.info("Bucket sync is not caught up with source.")
 
-                    if config.bucket_sync_crash:
-                        is_primary = utils.is_cluster_primary()
-                        if is_primary is False:
-                            crash_info = reusable.check_for_crash()
-                            if crash_info:
-                                raise TestExecError("ceph daemon crash found!")
-                            realm, source_zone = utils.get_realm_source_zone_info()
-                            log.info(f"Realm name: {realm}")
-                            log.info(f"Source zone name: {source_zone}")
-                            for i in range(600):  # Running sync command for 600 times
-                                op = utils.exec_shell_cmd(
-                                    f"radosgw-admin bucket sync run --bucket bkt-crash-check --rgw-curl-low-speed-time=0 --source-zone {source_zone} --rgw-realm {realm}"
-                                )
+                        if config.bucket_sync_crash:
+                            is_primary = utils.is_cluster_primary()
+                            if is_primary is False:
                                 crash_info = reusable.check_for_crash()
                                 if crash_info:
                                     raise TestExecError("ceph daemon crash found!")
-                                time.sleep(1)
-                    if config.dynamic_resharding is True:
-                        if utils.check_dbr_support():
-                            reusable.check_sync_status()
-                            for i in range(10):
-                                time.sleep(
-                                    60
-                                )  # Adding delay for processing reshard list
+                                realm, source_zone = utils.get_realm_source_zone_info()
+                                log.info(f"Realm name: {realm}")
+                                log.info(f"Source zone name: {source_zone}")
+                                for i in range(
+                                    600
+                                ):  # Running sync command for 600 times
+                                    op = utils.exec_shell_cmd(
+                                        f"radosgw-admin bucket sync run --bucket bkt-crash-check --rgw-curl-low-speed-time=0 --source-zone {source_zone} --rgw-realm {realm}"
+                                    )
+                                    crash_info = reusable.check_for_crash()
+                                    if crash_info:
+                                        raise TestExecError("ceph daemon crash found!")
+                                    time.sleep(1)
+                        if config.dynamic_resharding is True:
+                            if utils.check_dbr_support():
+                                reusable.check_sync_status()
+                                for i in range(10):
+                                    time.sleep(
+                                        60
+                                    )  # Adding delay for processing reshard list
+                                    op = utils.exec_shell_cmd(
+                                        f"radosgw-admin bucket stats --bucket {bucket.name}"
+                                    )
+                                    json_doc = json.loads(op)
+                                    new_num_shards = json_doc["num_shards"]
+                                    log.info(f"no_of_shards_created: {new_num_shards}")
+                                    if new_num_shards > old_num_shards:
+                                        break
+                                else:
+                                    raise TestExecError(
+                                        "num shards are same after processing resharding"
+                                    )
+                        if config.manual_resharding is True:
+                            if utils.check_dbr_support():
+                                op = utils.exec_shell_cmd(
+                                    f"radosgw-admin bucket stats --bucket {bucket.name}"
+                                )
+                                json_doc = json.loads(op)
+                                old_num_shards = json_doc["num_shards"]
+                                log.info(f"no_of_shards_created: {old_num_shards}")
+                                op = utils.exec_shell_cmd(
+                                    f"radosgw-admin reshard add --bucket {bucket.name} --num-shards {config.shards}"
+                                )
+                                op = utils.exec_shell_cmd(
+                                    "radosgw-admin reshard process"
+                                )
+                                time.sleep(60)
                                 op = utils.exec_shell_cmd(
                                     f"radosgw-admin bucket stats --bucket {bucket.name}"
                                 )
                                 json_doc = json.loads(op)
                                 new_num_shards = json_doc["num_shards"]
                                 log.info(f"no_of_shards_created: {new_num_shards}")
-                                if new_num_shards > old_num_shards:
-                                    break
-                            else:
-                                raise TestExecError(
-                                    "num shards are same after processing resharding"
+                                if new_num_shards <= old_num_shards:
+                                    raise TestExecError(
+                                        "num shards are same after processing resharding"
+                                    )
+                        # verification of shards after upload
+                        if config.test_datalog_trim_command is True:
+                            shard_id, end_marker = reusable.get_datalog_marker()
+                            cmd = f"sudo radosgw-admin datalog trim --shard-id {shard_id} --end-marker {end_marker} --debug_ms=1 --debug_rgw=20"
+                            out, err = utils.exec_shell_cmd(cmd, debug_info=True)
+                            if "Segmentation fault" in err:
+                                raise TestExecError("Segmentation fault occured")
+
+                        if config.test_ops["sharding"]["enable"] is True:
+                            cmd = (
+                                "radosgw-admin metadata get bucket:%s | grep bucket_id"
+                                % bucket.name
+                            )
+                            out = utils.exec_shell_cmd(cmd)
+                            b_id = (
+                                out.replace('"', "")
+                                .strip()
+                                .split(":")[1]
+                                .strip()
+                                .replace(",", "")
+                            )
+                            cmd2 = (
+                                "rados -p default.rgw.buckets.index ls | grep %s" % b_id
+                            )
+                            out = utils.exec_shell_cmd(cmd2)
+                            log.info("got output from sharing verification.--------")
+                        # print out bucket stats and verify in logs for compressed data by
+                        # comparing size_kb_utilized and size_kb_actual
+                        if config.test_ops["compression"]["enable"] is True:
+                            cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
+                            out = utils.exec_shell_cmd(cmd)
+                        # print out bucket stats and verify in logs for compressed data by
+                        # comparing size_kb_utilized and size_kb_actual
+                        if config.test_ops["compression"]["enable"] is True:
+                            cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
+                            out = utils.exec_shell_cmd(cmd)
+                        if config.test_ops["delete_bucket_object"] is True:
+                            reusable.delete_objects(bucket)
+                            if config.bucket_sync_run_with_disable_sync_thread is False:
+                                time.sleep(10)
+                                reusable.check_sync_status()
+                                reusable.delete_bucket(bucket)
+                                ceph_version_id, _ = utils.get_ceph_version()
+                                cmd = (
+                                    f"radosgw-admin bucket stats --bucket={bucket.name}"
                                 )
-                    if config.manual_resharding is True:
-                        if utils.check_dbr_support():
-                            op = utils.exec_shell_cmd(
-                                f"radosgw-admin bucket stats --bucket {bucket.name}"
+                                ec, _ = sp.getstatusoutput(cmd)
+                                log.info(f"Bucket stats for non-existent is {ec}")
+                                if (
+                                    float(ceph_version_id[0]) >= 16
+                                    and float(ceph_version_id[1]) >= 2.8
+                                ):
+                                    if ec != 2:
+                                        raise TestExecError(
+                                            "Bucket stats for non-existent bucket should return failure (2) or ENOENT."
+                                        )
+                        if config.test_bi_purge:
+                            cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
+                            out = utils.exec_shell_cmd(cmd)
+                            json_doc = json.loads(out)
+                            bucket_id = json_doc["id"]
+                            log.info(
+                                "Remove the bucket via bucket rm and --bypass-gc option"
+                            )
+                            utils.exec_shell_cmd(
+                                f"radosgw-admin bucket rm --bucket={bucket.name} --bypass-gc --purge-objects"
                             )
-                            json_doc = json.loads(op)
-                            old_num_shards = json_doc["num_shards"]
-                            log.info(f"no_of_shards_created: {old_num_shards}")
-                            op = utils.exec_shell_cmd(
-                                f"radosgw-admin reshard add --bucket {bucket.name} --num-shards {config.shards}"
+                            log.info(f"Do bi list for bucket {bucket.name}")
+                            utils.exec_shell_cmd(
+                                f"radosgw-admin bi list --bucket={bucket.name} --bucket-id={bucket_id}"
                             )
-                            op = utils.exec_shell_cmd("radosgw-admin reshard process")
-                            time.sleep(60)
-                            op = utils.exec_shell_cmd(
-                                f"radosgw-admin bucket stats --bucket {bucket.name}"
+                            log.info(f"Do bi purge for bucket {bucket.name}")
+                            utils.exec_shell_cmd(
+                                f"radosgw-admin bi purge --bucket={bucket.name} --bucket-id={bucket_id}"
                             )
-                            json_doc = json.loads(op)
-                            new_num_shards = json_doc["num_shards"]
-                            log.info(f"no_of_shards_created: {new_num_shards}")
-                            if new_num_shards <= old_num_shards:
+                            log.info(
+                                f"Do bi list for bucket {bucket.name} again, it should be empty and return 2"
+                            )
+                            cmd = f"radosgw-admin bi list --bucket={bucket.name} --bucket-id={bucket_id}"
+                            ec, _ = sp.getstatusoutput(cmd)
+                            if ec != 2:
                                 raise TestExecError(
-                                    "num shards are same after processing resharding"
+                                    "bi list after bi purge is not empty, it's a test failure."
                                 )
-                    # verification of shards after upload
-                    if config.test_datalog_trim_command is True:
-                        shard_id, end_marker = reusable.get_datalog_marker()
-                        cmd = f"sudo radosgw-admin datalog trim --shard-id {shard_id} --end-marker {end_marker} --debug_ms=1 --debug_rgw=20"
-                        out, err = utils.exec_shell_cmd(cmd, debug_info=True)
-                        if "Segmentation fault" in err:
-                            raise TestExecError("Segmentation fault occured")
-
-                    if config.test_ops["sharding"]["enable"] is True:
-                        cmd = (
-                            "radosgw-admin metadata get bucket:%s | grep bucket_id"
-                            % bucket.name
-                        )
-                        out = utils.exec_shell_cmd(cmd)
-                        b_id = (
-                            out.replace('"', "")
-                            .strip()
-                            .split(":")[1]
-                            .strip()
-                            .replace(",", "")
-                        )
-                        cmd2 = "rados -p default.rgw.buckets.index ls | grep %s" % b_id
-                        out = utils.exec_shell_cmd(cmd2)
-                        log.info("got output from sharing verification.--------")
-                    # print out bucket stats and verify in logs for compressed data by
-                    # comparing size_kb_utilized and size_kb_actual
-                    if config.test_ops["compression"]["enable"] is True:
-                        cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
-                        out = utils.exec_shell_cmd(cmd)
-                    # print out bucket stats and verify in logs for compressed data by
-                    # comparing size_kb_utilized and size_kb_actual
-                    if config.test_ops["compression"]["enable"] is True:
-                        cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
-                        out = utils.exec_shell_cmd(cmd)
-                    if config.test_ops["delete_bucket_object"] is True:
-                        reusable.delete_objects(bucket)
-                        if config.bucket_sync_run_with_disable_sync_thread is False:
-                            time.sleep(10)
-                            reusable.check_sync_status()
-                            reusable.delete_bucket(bucket)
-                            ceph_version_id, _ = utils.get_ceph_version()
-                            cmd = f"radosgw-admin bucket stats --bucket={bucket.name}"
-                            ec, _ = sp.getstatusoutput(cmd)
-                            log.info(f"Bucket stats for non-existent is {ec}")
-                            if (
-                                float(ceph_version_id[0]) >= 16
-                                and float(ceph_version_id[1]) >= 2.8
-                            ):
-                                if ec != 2:
-                                    raise TestExecError(
-                                        "Bucket stats for non-existent bucket should return failure (2) or ENOENT."
-                                    )
-                    if config.test_bi_purge:
-                        cmd = "radosgw-admin bucket stats --bucket=%s" % bucket.name
-                        out = utils.exec_shell_cmd(cmd)
-                        json_doc = json.loads(out)
-                        bucket_id = json_doc["id"]
-                        log.info(
-                            "Remove the bucket via bucket rm and --bypass-gc option"
-                        )
-                        utils.exec_shell_cmd(
-                            f"radosgw-admin bucket rm --bucket={bucket.name} --bypass-gc --purge-objects"
-                        )
-                        log.info(f"Do bi list for bucket {bucket.name}")
-                        utils.exec_shell_cmd(
-                            f"radosgw-admin bi list --bucket={bucket.name} --bucket-id={bucket_id}"
-                        )
-                        log.info(f"Do bi purge for bucket {bucket.name}")
-                        utils.exec_shell_cmd(
-                            f"radosgw-admin bi purge --bucket={bucket.name} --bucket-id={bucket_id}"
-                        )
-                        log.info(
-                            f"Do bi list for bucket {bucket.name} again, it should be empty and return 2"
-                        )
-                        cmd = f"radosgw-admin bi list --bucket={bucket.name} --bucket-id={bucket_id}"
-                        ec, _ = sp.getstatusoutput(cmd)
-                        if ec != 2:
-                            raise TestExecError(
-                                "bi list after bi purge is not empty, it's a test failure."
-                            )
 
-                    if config.bucket_sync_run_with_disable_sync_thread:
-                        out = utils.check_bucket_sync(bucket.name)
-                        if out is False:
-                            raise TestExecError(
-                                "Command is throwing error while running bucket sync run"
-                            )
-        if config.bucket_sync_run_with_disable_sync_thread:
-            log.info("making changes to ceph.conf")
-            ceph_conf.set_to_ceph_conf(
-                "global", ConfigOpts.rgw_run_sync_thread, "True", ssh_con
-            )
-            srv_restarted = rgw_service.restart(ssh_con)
-        if config.modify_user:
-            user_id = each_user["user_id"]
-            new_display_name = each_user["user_id"] + each_user["user_id"]
-            cmd = f"radosgw-admin user modify --uid='{user_id}' --display-name='{new_display_name}'"
-            out = utils.exec_shell_cmd(cmd)
-            out = json.loads(out)
-            if new_display_name == out["display_name"]:
-                log.info("User modified successfully")
-            else:
-                raise TestExecError("Failed to modify user")
-        if config.suspend_user:
-            user_id = each_user["user_id"]
-            cmd = f"radosgw-admin user suspend --uid='{user_id}'"
-            out = utils.exec_shell_cmd(cmd)
-            out = json.loads(out)
-            if out["suspended"] == 1:
-                log.info("User got suspended")
-            else:
-                raise TestExecError("Failed to suspend user")
-        if config.enable_user:
-            user_id = each_user["user_id"]
-            cmd = f"radosgw-admin user enable --uid='{user_id}'"
-            out = utils.exec_shell_cmd(cmd)
-            out = json.loads(out)
-            if out["suspended"] == 0:
-                log.info("User enabled successfully")
-            else:
-                raise TestExecError("Failed to enable user")
-        if config.delete_user:
-            user_id = each_user["user_id"]
-            out = reusable.remove_user(each_user)
-            cmd = f"radosgw-admin user list"
-            out = utils.exec_shell_cmd(cmd)
-            if user_id not in out:
-                log.info("User removed successfully")
-            else:
-                raise TestExecError("Failed to remove user")
-        # disable compression after test
-        if config.test_ops["compression"]["enable"] is True:
-            log.info("disable compression")
-            cmd = "radosgw-admin zone get"
-            out = utils.exec_shell_cmd(cmd)
-            zone = json.loads(out)
-            zone = zone.get("name")
-            cmd = (
-                "radosgw-admin zone placement modify --rgw-zone=%s "
-                "--placement-id=default-placement --compression=none" % zone
-            )
-            out = utils.exec_shell_cmd(cmd)
-            srv_restarted = rgw_service.restart(ssh_con)
-            time.sleep(10)
-            if srv_restarted is False:
-                raise TestExecError("RGW service restart failed")
-            else:
-                log.info("RGW service restarted")
-        if config.gc_verification is True:
-            final_op = reusable.verify_gc()
-            if final_op != -1:
-                test_info.failed_status("test failed")
-                sys.exit(1)
-
-    # test async rgw_data_notify_interval_msec=0 does not disable async data notifications
-    if config.test_aync_data_notifications:
-        log.info("Testing async data notifications")
-        out = utils.disable_async_data_notifications()
-        if not out:
-            raise TestExecError(
-                "No 'notifying datalog change' entries should be seen in rgw logs when rgw_data_notify_interval_msec=0 "
-            )
-        ceph_conf.set_to_ceph_conf("global", ConfigOpts.debug_rgw, "0", ssh_con)
+                        if config.bucket_sync_run_with_disable_sync_thread:
+                            out = utils.check_bucket_sync(bucket.name)
+                            if out is False:
+                                raise TestExecError(
+                                    "Command is throwing error while running bucket sync run"
+                                )
+            if config.bucket_sync_run_with_disable_sync_thread:
+                log.info("making changes to ceph.conf")
+                ceph_conf.set_to_ceph_conf(
+                    "global", ConfigOpts.rgw_run_sync_thread, "True", ssh_con
+                )
+                srv_restarted = rgw_service.restart(ssh_con)
+            if config.modify_user:
+                user_id = each_user["user_id"]
+                new_display_name = each_user["user_id"] + each_user["user_id"]
+                cmd = f"radosgw-admin user modify --uid='{user_id}' --display-name='{new_display_name}'"
+                out = utils.exec_shell_cmd(cmd)
+                out = json.loads(out)
+                if new_display_name == out["display_name"]:
+                    log.info("User modified successfully")
+                else:
+                    raise TestExecError("Failed to modify user")
+            if config.suspend_user:
+                user_id = each_user["user_id"]
+                cmd = f"radosgw-admin user suspend --uid='{user_id}'"
+                out = utils.exec_shell_cmd(cmd)
+                out = json.loads(out)
+                if out["suspended"] == 1:
+                    log.info("User got suspended")
+                else:
+                    raise TestExecError("Failed to suspend user")
+            if config.enable_user:
+                user_id = each_user["user_id"]
+                cmd = f"radosgw-admin user enable --uid='{user_id}'"
+                out = utils.exec_shell_cmd(cmd)
+                out = json.loads(out)
+                if out["suspended"] == 0:
+                    log.info("User enabled successfully")
+                else:
+                    raise TestExecError("Failed to enable user")
+            if config.delete_user:
+                user_id = each_user["user_id"]
+                out = reusable.remove_user(each_user)
+                cmd = f"radosgw-admin user list"
+                out = utils.exec_shell_cmd(cmd)
+                if user_id not in out:
+                    log.info("User removed successfully")
+                else:
+                    raise TestExecError("Failed to remove user")
+            # disable compression after test
+            if config.test_ops["compression"]["enable"] is True:
+                log.info("disable compression")
+                cmd = "radosgw-admin zone get"
+                out = utils.exec_shell_cmd(cmd)
+                zone = json.loads(out)
+                zone = zone.get("name")
+                cmd = (
+                    "radosgw-admin zone placement modify --rgw-zone=%s "
+                    "--placement-id=default-placement --compression=none" % zone
+                )
+                out = utils.exec_shell_cmd(cmd)
+                srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
+                if srv_restarted is False:
+                    raise TestExecError("RGW service restart failed")
+                else:
+                    log.info("RGW service restarted")
+            if config.gc_verification is True:
+                final_op = reusable.verify_gc()
+                if final_op != -1:
+                    test_info.failed_status("test failed")
+                    sys.exit(1)
+
+        # test async rgw_data_notify_interval_msec=0 does not disable async data notifications
+        if config.test_aync_data_notifications:
+            log.info("Testing async data notifications")
+            out = utils.disable_async_data_notifications()
+            if not out:
+                raise TestExecError(
+                    "No 'notifying datalog change' entries should be seen in rgw logs when rgw_data_notify_interval_msec=0 "
+                )
+            ceph_conf.set_to_ceph_conf("global", ConfigOpts.debug_rgw, "0", ssh_con)
 
     # check sync status if a multisite cluster
     reusable.check_sync_status()
@@ -149,7 +149,7 @@ def test_exec(config, ssh_con):
 
                 if config.local_file_delete:
                     log.info("deleting local file created after the upload")
-                    utils.exec_shell_cmd(f"rm -rf {TEST_DATA_PATH}")
+                    utils.remove_path(TEST_DATA_PATH)
 
                 reusable.delete_bucket(bucket)
         reusable.remove_user(each_user)
@@ -70,8 +70,7 @@ def test_exec(config, ssh_con):
             str(config.rgw_lc_debug_interval),
         )
         log.info("trying to restart services")
-        srv_restarted = rgw_service.restart()
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
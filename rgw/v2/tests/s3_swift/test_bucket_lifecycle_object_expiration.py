@@ -5,7 +5,7 @@ a) Prefix filters
 b) ANDing of Prefix and TAG filters
 
 Usage: test_bucket_lifecycle_object_expiration.py -c configs/<input-yaml>
-where : <input-yaml> are test_lc_date.yaml, test_rgw_enable_lc_threads.yaml, test_lc_multiple_rule_prefix_current_days.yaml, test_lc_rule_delete_marker.yaml, test_lc_rule_prefix_and_tag.yaml and test_lc_rule_prefix_non_current_days.yaml
+where : <input-yaml> are test_lc_date.yaml, test_lc_throughput_benchmark.yaml, test_rgw_enable_lc_threads.yaml, test_lc_multiple_rule_prefix_current_days.yaml, test_lc_rule_delete_marker.yaml, test_lc_rule_prefix_and_tag.yaml and test_lc_rule_prefix_non_current_days.yaml
 
 Operation:
 
@@ -34,10 +34,12 @@ import v2.utils.utils as utils
 from v2.lib.exceptions import RGWBaseException, TestExecError
 from v2.lib.resource_op import Config
 from v2.lib.rgw_config_opts import CephConfOp, ConfigOpts
+from v2.lib.s3 import lc_benchmark
 from v2.lib.s3 import lifecycle_validation as lc_ops
 from v2.lib.s3.auth import Auth
 from v2.lib.s3.write_io_info import BasicIOInfoStructure, BucketIoInfo, IOInfoInitialize
 from v2.tests.s3_swift import reusable
+from v2.utils import latency
 from v2.utils.log import configure_logging
 from v2.utils.test_desc import AddTestInfo
 from v2.utils.utils import RGWService
@@ -48,6 +50,112 @@ log = logging.getLogger()
 TEST_DATA_PATH = None
 
 
+def set_lc_max_worker(ceph_conf, value, ssh_con):
+    _, version_name = utils.get_ceph_version()
+    if "nautilus" in version_name:
+        ceph_conf.set_to_ceph_conf(
+            "global",
+            ConfigOpts.rgw_lc_max_worker,
+            str(value),
+            ssh_con,
+        )
+    else:
+        ceph_conf.set_to_ceph_conf(
+            section=None,
+            option=ConfigOpts.rgw_lc_max_worker,
+            value=str(value),
+            ssh_con=ssh_con,
+        )
+
+
+def restart_rgw(rgw_service, ssh_con):
+    log.info("trying to restart services")
+    srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
+    if srv_restarted is False:
+        raise TestExecError("RGW service restart failed")
+    else:
+        log.info("RGW service restarted")
+
+
+def lc_throughput_benchmark(config, ssh_con, ceph_conf, rgw_service, each_user):
+    """
+    Measures lc expirations/sec for each rgw_lc_max_worker in
+    test_ops.lc_benchmark.worker_counts: seeds bucket_count buckets with
+    objects_count objects (version_count versions each on versioned buckets),
+    sets the lc rules and samples lc list and bucket stats until lc is done
+    """
+    benchmark = config.test_ops["lc_benchmark"]
+    versioned = config.test_ops.get("enable_versioning", False)
+    versions = config.test_ops.get("version_count", 1) if versioned else 1
+    rule_filter = config.lifecycle_conf[0].get("Filter", {})
+    prefix = rule_filter.get("Prefix") or rule_filter.get("And", {}).get("Prefix", "")
+    life_cycle_rule = {"Rules": config.lifecycle_conf}
+    write_bucket_io_info = BucketIoInfo()
+    auth = Auth(each_user, ssh_con, ssl=config.ssl)
+    rgw_conn = auth.do_auth()
+    rgw_conn2 = auth.do_auth_using_client()
+    results = []
+    for workers in benchmark.get("worker_counts", [config.rgw_lc_max_worker]):
+        log.info(f"lc benchmark with rgw_lc_max_worker: {workers}")
+        set_lc_max_worker(ceph_conf, workers, ssh_con)
+        restart_rgw(rgw_service, ssh_con)
+        buckets = []
+        for bc in range(config.bucket_count):
+            bucket_name = utils.gen_bucket_name_from_userid(
+                each_user["user_id"], rand_no=f"lc{workers}-{bc}"
+            )
+            bucket = reusable.create_bucket(bucket_name, rgw_conn, each_user)
+            if versioned:
+                reusable.enable_versioning(
+                    bucket, rgw_conn, each_user, write_bucket_io_info
+                )
+            buckets.append(bucket)
+        start = time.perf_counter()
+        initial = sum(
+            lc_benchmark.seed_bucket(
+                rgw_conn2,
+                bucket.name,
+                config.objects_count,
+                versions=versions,
+                prefix=prefix,
+                workers=benchmark.get("seed_workers"),
+            )
+            for bucket in buckets
+        )
+        seed_time = time.perf_counter() - start
+        for bucket in buckets:
+            reusable.put_bucket_lifecycle(bucket, rgw_conn, rgw_conn2, life_cycle_rule)
+        # a noncurrent expiration rule leaves the current versions
+        target = len(buckets) * config.objects_count if versions > 1 else 0
+        result = lc_benchmark.measure_expiration(
+            [bucket.name for bucket in buckets],
+            initial,
+            target=target,
+            interval=benchmark.get("interval", lc_benchmark.DEFAULT_INTERVAL),
+            timeout=benchmark.get("timeout", lc_benchmark.DEFAULT_TIMEOUT),
+        )
+        result.update(
+            rgw_lc_max_worker=workers,
+            seed_objects_per_sec=round(initial / seed_time, 2),
+        )
+        results.append(result)
+    for result in results:
+        log.info(
+            f"rgw_lc_max_worker: {result['rgw_lc_max_worker']}, "
+            f"expired: {result['expired']}/{result['initial']}, "
+            f"expirations/sec: {result['expirations_per_sec']}, "
+            f"peak: {result['peak_expirations_per_sec']}"
+        )
+    if benchmark.get("result_file"):
+        latency.write_results(results, benchmark["result_file"])
+    incomplete = [r["rgw_lc_max_worker"] for r in results if not r["completed"]]
+    if incomplete:
+        raise TestExecError(
+            f"lc did not complete in time with rgw_lc_max_worker: {incomplete}"
+        )
+    return results
+
+
 def test_exec(config, ssh_con):
     io_info_initialize = IOInfoInitialize()
     basic_io_structure = BasicIOInfoStructure()
@@ -76,28 +184,8 @@ def test_exec(config, ssh_con):
             str(config.rgw_lifecycle_work_time),
             ssh_con,
         )
-    _, version_name = utils.get_ceph_version()
-    if "nautilus" in version_name:
-        ceph_conf.set_to_ceph_conf(
-            "global",
-            ConfigOpts.rgw_lc_max_worker,
-            str(config.rgw_lc_max_worker),
-            ssh_con,
-        )
-    else:
-        ceph_conf.set_to_ceph_conf(
-            section=None,
-            option=ConfigOpts.rgw_lc_max_worker,
-            value=str(config.rgw_lc_max_worker),
-            ssh_con=ssh_con,
-        )
-    log.info("trying to restart services")
-    srv_restarted = rgw_service.restart(ssh_con)
-    time.sleep(30)
-    if srv_restarted is False:
-        raise TestExecError("RGW service restart failed")
-    else:
-        log.info("RGW service restarted")
+    set_lc_max_worker(ceph_conf, config.rgw_lc_max_worker, ssh_con)
+    restart_rgw(rgw_service, ssh_con)
 
     config.user_count = config.user_count if config.user_count else 1
     config.bucket_count = config.bucket_count if config.bucket_count else 1
@@ -106,6 +194,11 @@ def test_exec(config, ssh_con):
     log.info(f"bucket count is {config.bucket_count}")
     # create user
     user_info = s3lib.create_users(config.user_count)
+    if config.test_ops.get("lc_benchmark"):
+        lc_throughput_benchmark(config, ssh_con, ceph_conf, rgw_service, user_info[0])
+        for each_user in user_info:
+            reusable.remove_user(each_user)
+        return
     for each_user in user_info:
         auth = Auth(each_user, ssh_con, ssl=config.ssl)
         rgw_conn = auth.do_auth()
@@ -307,8 +400,7 @@ def test_exec(config, ssh_con):
             ceph_conf.set_to_ceph_conf(
                 "global", ConfigOpts.rgw_enable_lc_threads, "true", ssh_con
             )
-            rgw_service.restart()
-            time.sleep(30)
+            rgw_service.restart(wait_ready=True)
         reusable.remove_user(each_user)
         # check for any crashes during the execution
         crash_info = reusable.check_for_crash()
@@ -29,13 +29,17 @@ import traceback
 
 import v2.lib.manage_data as manage_data
 import v2.lib.resource_op as s3lib
+import v2.lib.s3.listing as bucket_listing
+import v2.lib.workload as workload
 import v2.utils.utils as utils
+from v2.lib import admin_stream
 from v2.lib.exceptions import RGWBaseException, TestExecError
 from v2.lib.resource_op import Config
 from v2.lib.rgw_config_opts import CephConfOp, ConfigOpts
 from v2.lib.s3.auth import Auth
 from v2.lib.s3.write_io_info import BasicIOInfoStructure, BucketIoInfo, IOInfoInitialize
 from v2.tests.s3_swift import reusable
+from v2.utils import latency
 from v2.utils.log import configure_logging
 from v2.utils.test_desc import AddTestInfo
 from v2.utils.utils import RGWService
@@ -62,36 +66,49 @@ def test_exec(config, ssh_con):
         ceph_conf.set_to_ceph_conf(
             "global", ConfigOpts.rgw_crypt_require_ssl, "false", ssh_con
         )
-        srv_restarted = rgw_service.restart(ssh_con)
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
             log.info("RGW service restarted")
 
+    executor = workload.WorkloadExecutor.from_config(config)
     for each_user in all_users_info:
         # authenticate
         auth = Auth(each_user, ssh_con, ssl=config.ssl)
-        if config.use_aws4 is True:
-            rgw_conn = auth.do_auth(**{"signature_version": "s3v4"})
-        else:
-            rgw_conn = auth.do_auth()
+        auth_config = {"signature_version": "s3v4"} if config.use_aws4 is True else {}
+        rgw_conn = auth.do_auth(**auth_config)
+        conn_args = workload.connection_args(auth, **auth_config)
+        versioning = config.test_ops.get("enable_version", False)
         objects_created_list = []
         if config.test_ops["create_bucket"] is True:
             log.info("no of buckets to create: %s" % config.bucket_count)
-            for bc in range(config.bucket_count):
-                bucket_name_to_create = utils.gen_bucket_name_from_userid(
-                    each_user["user_id"], rand_no=bc
+            bucket_names = [
+                utils.gen_bucket_name_from_userid(each_user["user_id"], rand_no=bc)
+                for bc in range(config.bucket_count)
+            ]
+            for bucket_name_to_create in bucket_names:
+                executor.submit(
+                    reusable.create_bucket_task,
+                    bucket_name_to_create,
+                    conn_args,
+                    each_user,
+                    versioning=versioning,
+                    user=each_user["user_id"],
+                    group=bucket_name_to_create,
                 )
-                log.info("creating bucket with name: %s" % bucket_name_to_create)
-                bucket = reusable.create_bucket(
-                    bucket_name_to_create, rgw_conn, each_user
+            executor.run().raise_on_failure()
+            for bucket_name_to_create in bucket_names:
+                bucket = s3lib.resource_op(
+                    {
+                        "obj": rgw_conn,
+                        "resource": "Bucket",
+                        "args": [bucket_name_to_create],
+                    }
                 )
-                if config.test_ops.get("enable_version", False):
-                    log.info("enable bucket version")
-                    reusable.enable_versioning(
-                        bucket, rgw_conn, each_user, write_bucket_io_info
-                    )
+                # uploads to a versioned bucket keep their order
+                group = bucket_name_to_create if versioning else None
+                uploaded_paths = []
                 if config.test_ops["create_object"] is True:
                     if config.test_ops["object_structure"] == "flat":
                         # uploading data
@@ -99,7 +116,6 @@ def test_exec(config, ssh_con):
                             "top level s3 objects to create: %s" % config.objects_count
                         )
                         for oc, size in list(config.mapped_sizes.items()):
-                            config.obj_size = size
                             s3_object_name = utils.gen_s3_object_name(
                                 bucket_name_to_create, oc
                             )
@@ -108,31 +124,22 @@ def test_exec(config, ssh_con):
                                 TEST_DATA_PATH, s3_object_name
                             )
                             log.info("s3 object path: %s" % s3_object_path)
-                            if config.test_ops.get("upload_type") == "multipart":
-                                log.info("upload type: multipart")
-                                reusable.upload_mutipart_object(
-                                    s3_object_name,
-                                    bucket,
-                                    TEST_DATA_PATH,
-                                    config,
-                                    each_user,
-                                )
-                            else:
-                                log.info("upload type: normal")
-                                reusable.upload_object(
-                                    s3_object_name,
-                                    bucket,
-                                    TEST_DATA_PATH,
-                                    config,
-                                    each_user,
-                                )
+                            executor.submit(
+                                reusable.upload_object_task,
+                                s3_object_name,
+                                bucket_name_to_create,
+                                TEST_DATA_PATH,
+                                config,
+                                each_user,
+                                conn_args,
+                                size,
+                                user=each_user["user_id"],
+                                group=group,
+                            )
                             objects_created_list.append(
                                 (s3_object_name, s3_object_path)
                             )
-                            # deleting the local file created after upload
-                            if config.local_file_delete is True:
-                                log.info("deleting local file created after the upload")
-                                utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
+                            uploaded_paths.append(s3_object_path)
 
                     # this covers listing of a bucket with pseudo directories and objects in it ; Unable to list contents of large buckets https://bugzilla.redhat.com/show_bug.cgi?id=1874645#c72
                     if config.test_ops["object_structure"] == "pseudo":
@@ -148,7 +155,6 @@ def test_exec(config, ssh_con):
                             )
                             manage_data.pseudo_dir_generator(s3_object_path)
                             for oc, size in list(config.mapped_sizes.items()):
-                                config.obj_size = size
                                 s3_object_name = utils.gen_s3_pseudo_object_name(
                                     s3_pseudo_dir_name, oc
                                 )
@@ -157,30 +163,26 @@ def test_exec(config, ssh_con):
                                     TEST_DATA_PATH, s3_object_name
                                 )
                                 log.info("s3 object path: %s" % s3_object_path)
-                                if config.test_ops.get("upload_type") == "multipart":
-                                    log.info("upload type: multipart")
-                                    reusable.upload_mutipart_object(
-                                        s3_object_name,
-                                        bucket,
-                                        TEST_DATA_PATH,
-                                        config,
-                                        each_user,
-                                    )
-                                else:
-                                    log.info("upload type: normal")
-                                    reusable.upload_object(
-                                        s3_object_name,
-                                        bucket,
-                                        TEST_DATA_PATH,
-                                        config,
-                                        each_user,
-                                    )
-                                # deleting the local file created after upload
-                                if config.local_file_delete is True:
-                                    log.info(
-                                        "deleting local file created after the upload"
-                                    )
-                                    utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
+                                executor.submit(
+                                    reusable.upload_object_task,
+                                    s3_object_name,
+                                    bucket_name_to_create,
+                                    TEST_DATA_PATH,
+                                    config,
+                                    each_user,
+                                    conn_args,
+                                    size,
+                                    user=each_user["user_id"],
+                                    group=group,
+                                )
+                                uploaded_paths.append(s3_object_path)
+
+                    executor.run().raise_on_failure()
+                    # deleting the local files created after upload
+                    if config.local_file_delete is True:
+                        log.info("deleting local files created after the upload")
+                        for s3_object_path in uploaded_paths:
+                            utils.remove_path(s3_object_path)
 
                 # listing bucket with only pseudo directories ; Bug allows ordered bucket listing to get stuck -- 4.1 https://bugzilla.redhat.com/show_bug.cgi?id=1853052#c0
                 if config.test_ops["create_object"] is False:
@@ -197,12 +199,11 @@ def test_exec(config, ssh_con):
                 # radoslist listing of the bucket
                 if config.test_ops["radoslist"] is True:
                     log.info("executing the command radosgw-admin bucket radoslist ")
-                    radoslist = utils.exec_shell_cmd(
+                    # streamed, the radoslist of a large bucket is not buffered
+                    admin_stream.count_lines(
                         "radosgw-admin bucket radoslist --bucket %s"
                         % bucket_name_to_create
                     )
-                    if radoslist is False:
-                        raise TestExecError("Radoslist command execution failed")
 
                 # get the configuration parameter - rgw_bucket_index_max_aio
                 ceph_version_id, ceph_version_name = utils.get_ceph_version()
@@ -278,6 +279,27 @@ def test_exec(config, ssh_con):
                 else:
                     raise TestExecError("object listing via boto failed")
 
+                # paginated listing benchmark, results appended to a json file
+                benchmark_conf = config.test_ops.get("listing_benchmark")
+                if benchmark_conf:
+                    for method in benchmark_conf.get("methods", ["boto"]):
+                        results = bucket_listing.benchmark(
+                            bucket_name_to_create,
+                            client=rgw_conn.meta.client,
+                            method=method,
+                            ordered=config.test_ops["radosgw_listing_ordered"],
+                            max_keys=benchmark_conf.get(
+                                "max_keys", bucket_listing.DEFAULT_MAX_KEYS
+                            ),
+                            repetitions=benchmark_conf.get(
+                                "repetitions", bucket_listing.DEFAULT_REPETITIONS
+                            ),
+                        )
+                        latency.write_results(
+                            results,
+                            benchmark_conf.get("result_file", "listing_benchmark.json"),
+                        )
+
         # radoslist on all buckets. BZ:https://bugzilla.redhat.com/show_bug.cgi?id=1892265
         if config.radoslist_all is True:
             log.info(
@@ -15,6 +15,7 @@ Usage: test_bucket_notification.py -c <input_yaml>
     test_bucket_notification_kafka_none_delete.yaml
     test_bucket_notification_kafka_none_copy.yaml
     test_bucket_notification_kafka_none_mulitpart.yaml
+    test_bucket_notification_http_endpoint_delete.yaml
 Operation:
     Create topic 
     put bucket notifcation and get bucket notification
@@ -45,6 +46,7 @@ from v2.lib.s3.auth import Auth
 from v2.lib.s3.write_io_info import BasicIOInfoStructure, BucketIoInfo, IOInfoInitialize
 from v2.tests.s3_swift import reusable
 from v2.tests.s3_swift.reusables import bucket_notification as notification
+from v2.tests.s3_swift.reusables import notification_consumer
 from v2.utils.log import configure_logging
 from v2.utils.test_desc import AddTestInfo
 from v2.utils.utils import RGWService
@@ -79,6 +81,16 @@ def test_exec(config, ssh_con):
         ceph_version_id, ceph_version_name = utils.get_ceph_version()
 
         objects_created_list = []
+        # object name and time its upload completed, for the notification latency
+        put_times = {}
+        validators = {}
+        consumer = None
+        if config.test_ops.get("consumer", "console") != "console":
+            # in process consumers receive the events while the objects are written
+            consumer = notification_consumer.get_consumer(
+                config, pattern="^cephci-kafka-.*"
+            )
+            consumer.start()
         if config.test_ops["create_bucket"] is True:
             log.info("no of buckets to create: %s" % config.bucket_count)
             for bc in range(config.bucket_count):
@@ -100,7 +112,7 @@ def test_exec(config, ssh_con):
                     ack_type = config.test_ops.get("ack_type")
                     topic_id = str(uuid.uuid4().hex[:16])
                     persistent = False
-                    topic_name = "cephci-kafka-" + ack_type + "-ack-type-" + topic_id
+                    topic_name = f"cephci-{endpoint}-{ack_type}-ack-type-{topic_id}"
                     log.info(
                         f"creating a topic with {endpoint} endpoint with ack type {ack_type}"
                     )
@@ -108,7 +120,12 @@ def test_exec(config, ssh_con):
                         log.info("topic with peristent flag enabled")
                         persistent = config.test_ops.get("persistent_flag")
                     topic = notification.create_topic(
-                        rgw_sns_conn, endpoint, ack_type, topic_name, persistent
+                        rgw_sns_conn,
+                        endpoint,
+                        ack_type,
+                        topic_name,
+                        persistent,
+                        push_endpoint=getattr(consumer, "push_endpoint", None),
                     )
 
                 # get topic attributes
@@ -137,6 +154,11 @@ def test_exec(config, ssh_con):
                     notification.get_bucket_notification(
                         rgw_s3_client, bucket_name_to_create
                     )
+                    validators[
+                        bucket_name_to_create
+                    ] = notification.EventRecordValidator(
+                        event, bucket_name_to_create, ceph_version_name
+                    )
 
                 # create objects
                 if config.test_ops["create_object"] is True:
@@ -168,6 +190,7 @@ def test_exec(config, ssh_con):
                                 config,
                                 each_user,
                             )
+                        put_times[s3_object_name] = time.time()
                 # copy objects
                 if config.test_ops.get("copy_object", False):
                     log.info("copy object")
@@ -181,6 +204,7 @@ def test_exec(config, ssh_con):
                     )
                     if status is None:
                         raise TestExecError("copy object failed")
+                    put_times["copy_of_object" + s3_object_name] = time.time()
 
             # delete objects
             if config.test_ops.get("delete_bucket_object", False):
@@ -192,23 +216,21 @@ def test_exec(config, ssh_con):
                 else:
                     reusable.delete_objects(bucket)
 
-            # start kafka broker and consumer
-            event_record_path = "/tmp/event_record"
-            start_consumer = notification.start_kafka_broker_consumer(
-                topic_name, event_record_path
-            )
-            if start_consumer is False:
-                raise TestExecError("Kafka consumer not running")
+            # start kafka consumer, only the last topic is consumed
+            if consumer is None:
+                consumer = notification_consumer.get_consumer(config, topic_name)
 
             # verify all the attributes of the event record. if event not received abort testcase
             log.info("verify event record attributes")
-            verify = notification.verify_event_record(
-                event, bucket_name_to_create, event_record_path, ceph_version_name
-            )
-            if verify is False:
-                raise EventRecordDataError(
-                    "Event record is empty! notification is not seen"
+            try:
+                events_summary = notification.verify_events(
+                    consumer, validators, put_times, persistent
                 )
+            finally:
+                consumer.stop()
+            if config.test_ops.get("notification_result_file"):
+                with open(config.test_ops["notification_result_file"], "a") as fp:
+                    fp.write(json.dumps(events_summary) + "\n")
         # put empty bucket notification to remove existing configuration
         if config.test_ops.get("put_empty_bucket_notification", False):
             notification.put_empty_bucket_notification(
@@ -217,7 +239,8 @@ def test_exec(config, ssh_con):
             )
 
         # delete topic logs on kafka broker
-        notification.del_topic_from_kafka_broker(topic_name)
+        if endpoint == "kafka":
+            notification.del_topic_from_kafka_broker(topic_name)
 
     # check sync status if a multisite cluster
     reusable.check_sync_status()
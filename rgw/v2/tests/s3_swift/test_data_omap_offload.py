@@ -73,8 +73,7 @@ def test_exec(config, ssh_con):
             log.info(
                 "restart the rgw daemons and sleep of 30secs for rgw daemon to be up "
             )
-            srv_restarted = rgw_service.restart(ssh_con)
-            time.sleep(30)
+            srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
             if srv_restarted is False:
                 raise TestExecError("RGW service restart failed")
             else:
@@ -130,7 +129,7 @@ def test_exec(config, ssh_con):
                         # deleting the local file created after upload
                         if config.local_file_delete is True:
                             log.info("deleting local file created after the upload")
-                            utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
+                            utils.remove_path(s3_object_path)
 
         # delete  object and bucket
         if config.test_ops.get("delete_bucket_object", False):
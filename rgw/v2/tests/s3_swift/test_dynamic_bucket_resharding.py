@@ -27,6 +27,7 @@ import logging
 import time
 import traceback
 
+import v2.lib.reshard as reshard
 import v2.lib.resource_op as s3lib
 import v2.utils.utils as utils
 from v2.lib.exceptions import RGWBaseException, TestExecError
@@ -66,7 +67,6 @@ def test_exec(config, ssh_con):
         # the number of shards  should be greater than   [ (no of objects)/(max objects per shard) ]
         # example: objects = 500 ; max object per shard = 10
         # then no of shards should be at least 50 or more
-        time.sleep(15)
         log.info("making changes to ceph.conf")
         ceph_conf.set_to_ceph_conf(
             "global",
@@ -95,8 +95,7 @@ def test_exec(config, ssh_con):
         num_shards_expected = config.objects_count / config.max_objects_per_shard
         log.info("num_shards_expected: %s" % num_shards_expected)
         log.info("trying to restart services ")
-        srv_restarted = rgw_service.restart(ssh_con)
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
@@ -131,11 +130,16 @@ def test_exec(config, ssh_con):
             )
         objects_created_list.append((s3_object_name, s3_object_path))
 
+    # client io during the reshard window, to measure the impact of resharding
+    background_io = None
+    if config.test_ops.get("background_io", False):
+        background_io = reshard.BackgroundIO(rgw_conn.meta.client, bucket.name)
+        background_io.start()
+
     if config.sharding_type == "manual":
         log.info("sharding type is manual")
         # for manual.
         # the number of shards will be the value set in the command.
-        time.sleep(15)
         log.info("in manual sharding")
         cmd_exec = utils.exec_shell_cmd(
             "radosgw-admin bucket reshard --bucket=%s --num-shards=%s "
@@ -144,12 +148,19 @@ def test_exec(config, ssh_con):
         if cmd_exec is False:
             raise TestExecError("manual resharding command execution failed")
 
-    sleep_time = 600
-    log.info(f"verification starts after waiting for {sleep_time} seconds")
-    time.sleep(sleep_time)
-    op = utils.exec_shell_cmd("radosgw-admin bucket stats --bucket %s" % bucket.name)
-    json_doc = json.loads(op)
-    num_shards_created = json_doc["num_shards"]
+    if config.sharding_type == "manual":
+        target_shards = config.shards
+    else:
+        target_shards = int(num_shards_expected)
+    reshard_result = reshard.wait_for_reshard(
+        bucket.name, target_shards, timeout=config.test_ops.get("reshard_timeout", 900)
+    )
+    if background_io:
+        reshard_result["background_io"] = background_io.stop()
+    if config.test_ops.get("reshard_result_file"):
+        with open(config.test_ops["reshard_result_file"], "w") as fp:
+            json.dump(reshard_result, fp, indent=4)
+    num_shards_created = reshard_result["num_shards"]
     log.info("no_of_shards_created: %s" % num_shards_created)
     if config.sharding_type == "manual":
         if config.shards != num_shards_created:
@@ -58,8 +58,7 @@ def test_exec(config, ssh_con):
         ceph_conf.set_to_ceph_conf(
             "global", ConfigOpts.rgw_crypt_require_ssl, "false", ssh_con
         )
-        srv_restarted = rgw_service.restart(ssh_con)
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
@@ -88,10 +87,8 @@ def test_exec(config, ssh_con):
         str(config.rgw_gc_obj_min_wait),
         ssh_con,
     )
-    sleep_time = 10
-    log.info(f"Restarting RGW service and waiting for {sleep_time} seconds")
-    srv_restarted = rgw_service.restart(ssh_con)
-    time.sleep(sleep_time)
+    log.info("Restarting RGW service and waiting for it to be ready")
+    srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
     if srv_restarted is False:
         raise TestExecError("RGW service restart failed")
     else:
@@ -153,7 +150,7 @@ def test_exec(config, ssh_con):
                 # deleting the local file created after upload
                 if config.local_file_delete is True:
                     log.info("deleting local file created after the upload")
-                    utils.exec_shell_cmd("rm -rf %s" % s3_object_path)
+                    utils.remove_path(s3_object_path)
 
                 # listing the objects
                 if config.test_ops.get("list_objects", False):
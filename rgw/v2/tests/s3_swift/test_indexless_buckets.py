@@ -57,11 +57,9 @@ def test_exec(config, ssh_con):
     )
 
     log.info("restart the rgw daemons")
-    restart_service = rgw_service.restart(ssh_con)
+    restart_service = rgw_service.restart(ssh_con, wait_ready=True)
     if restart_service is False:
         raise TestExecError("RGW service restart failed")
-    log.info("sleep for 20 seconds after RGW service restart")
-    time.sleep(20)
 
     # perform s3 operations
     all_users_info = s3lib.create_users(config.user_count)
@@ -133,11 +131,9 @@ def test_exec(config, ssh_con):
     )
 
     log.info("restart the rgw daemons")
-    restart_service = rgw_service.restart(ssh_con)
+    restart_service = rgw_service.restart(ssh_con, wait_ready=True)
     if restart_service is False:
         raise TestExecError("RGW service restart failed")
-    log.info("sleep for 20 seconds after RGW service restart")
-    time.sleep(20)
 
     # check for any crashes during the execution
     crash_info = reusable.check_for_crash()
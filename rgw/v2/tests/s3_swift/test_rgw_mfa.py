@@ -40,8 +40,7 @@ def test_exec(config, ssh_con):
         ceph_conf.set_to_ceph_conf(
             "global", ConfigOpts.rgw_crypt_require_ssl, "false", ssh_con
         )
-        srv_restarted = rgw_service.restart(ssh_con)
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
@@ -199,8 +198,7 @@ def test_exec(config, ssh_con):
                         # deleting the local file created after upload
                         if config.local_file_delete is True:
                             log.info("deleting local file created after the upload")
-                            cmd = f"rm -rf {s3_object_path}"
-                            utils.exec_shell_cmd(cmd)
+                            utils.remove_path(s3_object_path)
 
                         # bucket list to check the objects
                         cmd = f"radosgw-admin bucket list --bucket {bucket_name_to_create}"
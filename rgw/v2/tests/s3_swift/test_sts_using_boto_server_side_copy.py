@@ -75,8 +75,7 @@ def test_exec(config, ssh_con):
     ceph_config_set.set_to_ceph_conf(
         "global", ConfigOpts.rgw_s3_auth_use_sts, "True", ssh_con
     )
-    srv_restarted = rgw_service.restart(ssh_con)
-    time.sleep(30)
+    srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
     if srv_restarted is False:
         raise TestExecError("RGW service restart failed")
     else:
@@ -20,11 +20,9 @@ Operation:
     Delete objects from container
     Delete container
     Copy versioned object
-    Multipart upload
+    Large object upload, segments uploaded concurrently with a slo or dlo manifest
 """
 
-import glob
-
 # test swift basic ops
 import os
 import sys
@@ -48,6 +46,7 @@ from v2.lib.resource_op import Config
 from v2.lib.rgw_config_opts import CephConfOp, ConfigOpts
 from v2.lib.s3.write_io_info import BasicIOInfoStructure, IOInfoInitialize
 from v2.lib.swift.auth import Auth
+from v2.lib.swift.large_object import LargeObjectUploader
 from v2.tests.s3_swift import reusable
 from v2.utils.log import configure_logging
 from v2.utils.test_desc import AddTestInfo
@@ -73,44 +72,37 @@ def fill_container(
     multipart=False,
     split_size=0,
     header=None,
+    uploader=None,
+    manifest="slo",
 ):
     swift_object_name = utils.gen_s3_object_name("%s.container.%s" % (user_id, cc), oc)
     log.info("object name: %s" % swift_object_name)
     object_path = os.path.join(TEST_DATA_PATH, swift_object_name)
     log.info("object path: %s" % object_path)
     data_info = manage_data.io_generator(object_path, size)
+    if data_info is False:
+        raise TestExecError("data creation failed")
     # upload object
     if multipart == True:
-        mp_dir = os.path.join(TEST_DATA_PATH, swift_object_name + ".mp.parts")
-        log.info(f"mp part dir: {mp_dir}")
-        log.info("making multipart object part dir")
-        mkdir = utils.exec_shell_cmd("sudo mkdir %s" % mp_dir)
-        if mkdir is False:
-            raise TestExecError("mkdir failed creating mp_dir_name")
-        utils.split_file(object_path, split_size, mp_dir + "/")
-        parts_list = sorted(glob.glob(mp_dir + "/" + "*"))
-        log.info("parts_list: %s" % parts_list)
-        log.info("no of parts: %s" % len(parts_list))
-        for each_part in parts_list:
-            log.info("trying to upload part: %s" % each_part)
-            with open(each_part, "r") as fp:
-                etag = rgw.put_object(
-                    container_name,
-                    swift_object_name + "/" + each_part,
-                    contents=fp.read(),
-                    content_type="text/plain",
-                    headers=header,
-                )
+        # segments of split_size MB streamed from the file, named
+        # <object>/<index>, then a slo or dlo manifest named <object>
+        uploader.upload(
+            container_name,
+            swift_object_name,
+            object_path,
+            split_size * 1024 * 1024,
+            manifest=manifest,
+            headers=header,
+        )
         return swift_object_name
     else:
-        if data_info is False:
-            raise TestExecError("data creation failed")
         log.info("uploading object: %s" % object_path)
-        with open(object_path, "r") as fp:
+        with open(object_path, "rb") as fp:
             rgw.put_object(
                 container_name,
                 swift_object_name,
-                contents=fp.read(),
+                contents=fp,
+                content_length=os.stat(object_path).st_size,
                 content_type="text/plain",
                 headers=header,
             )
@@ -143,8 +135,7 @@ def test_exec(config, ssh_con):
                 "global", ConfigOpts.rgw_swift_versioning_enabled, "True", ssh_con
             )
             log.info("trying to restart services ")
-            srv_restarted = rgw_service.restart(ssh_con)
-            time.sleep(30)
+            srv_restarted = rgw_service.restart(ssh_con, wait_ready=True)
             if srv_restarted is False:
                 raise TestExecError("RGW service restart failed")
             else:
@@ -277,6 +268,7 @@ def test_exec(config, ssh_con):
                 raise TestExecError(
                     "Resource execution failed: container creation failed"
                 )
+            uploader = LargeObjectUploader(auth, workers=config.multipart_concurrency)
             for oc, size in list(config.mapped_sizes.items()):
                 swift_object_name = fill_container(
                     rgw,
@@ -287,6 +279,8 @@ def test_exec(config, ssh_con):
                     size,
                     multipart=True,
                     split_size=config.split_size,
+                    uploader=uploader,
+                    manifest=config.swift_manifest,
                 )
                 container_name_new = utils.gen_bucket_name_from_userid(
                     user_info["user_id"], rand_no=str(cc) + "New"
@@ -344,9 +338,10 @@ def test_exec(config, ssh_con):
                     log.info("s3_object_uploaded_md5: %s" % downloaded_obj)
                     if str(old_object) == str(downloaded_obj):
                         log.info("md5 match")
-                        utils.exec_shell_cmd("rm -rf %s" % swift_object_download_path)
+                        utils.remove_path(swift_object_download_path)
                     else:
                         raise TestExecError("md5 mismatch")
+            log.info("large object upload summary: %s" % uploader.summary())
 
         else:
             container_name = utils.gen_bucket_name_from_userid(
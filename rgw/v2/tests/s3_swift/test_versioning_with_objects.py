@@ -470,7 +470,7 @@ def test_exec(config, ssh_con):
                                     )
                         if config.local_file_delete is True:
                             log.info("deleting local file")
-                            utils.exec_shell_cmd("sudo rm -rf %s" % s3_object_path)
+                            utils.remove_path(s3_object_path)
                 if config.test_ops["suspend_version"] is True:
                     log.info("suspending versioning")
                     # suspend_version_status = s3_ops.resource_op(bucket_versioning, 'suspend')
@@ -619,7 +619,7 @@ def test_exec(config, ssh_con):
                         "s3_object_uploaded_md5: %s" % non_version_data_info["md5"]
                     )
                     if config.local_file_delete is True:
-                        utils.exec_shell_cmd("sudo rm -rf %s" % s3_object_path)
+                        utils.remove_path(s3_object_path)
             if config.test_ops.get("delete_bucket") is True:
                 reusable.delete_bucket(bucket)
 
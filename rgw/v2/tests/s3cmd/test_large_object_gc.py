@@ -93,8 +93,7 @@ def test_exec(config):
             str(config.rgw_gc_obj_min_wait),
         )
         log.info("trying to restart services")
-        srv_restarted = rgw_service.restart()
-        time.sleep(30)
+        srv_restarted = rgw_service.restart(wait_ready=True)
         if srv_restarted is False:
             raise TestExecError("RGW service restart failed")
         else:
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import zlib
+
+log = logging.getLogger()
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class CRC32(object):
+    """
+    hashlib like wrapper over zlib.crc32
+    """
+
+    name = "crc32"
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return "%08x" % (self.value & 0xFFFFFFFF)
+
+
+class CRC32C(CRC32):
+    """
+    hashlib like wrapper over crc32c, needs the optional crc32c package
+    """
+
+    name = "crc32c"
+
+    def __init__(self):
+        super(CRC32C, self).__init__()
+        try:
+            import crc32c
+        except ImportError:
+            raise ValueError("crc32c checksum needs the crc32c package installed")
+        self.crc32c = crc32c.crc32c
+
+    def update(self, data):
+        self.value = self.crc32c(data, self.value)
+
+
+def new_hasher(algorithm):
+    """
+    Returns a hasher for the algorithm, ex: md5, sha256, crc32, crc32c
+    """
+    if algorithm == "crc32":
+        return CRC32()
+    if algorithm == "crc32c":
+        return CRC32C()
+    return hashlib.new(algorithm)
+
+
+class MultiHasher(object):
+    """
+    Computes several checksums over the same data in a single pass.
+    The functions in this class are
+    1. update(): feed data to every hasher
+    2. hexdigests(): dict of algorithm and hex digest
+    """
+
+    def __init__(self, algorithms=("md5",)):
+        self.hashers = {algorithm: new_hasher(algorithm) for algorithm in algorithms}
+
+    def update(self, data):
+        for hasher in self.hashers.values():
+            hasher.update(data)
+
+    def hexdigests(self):
+        return {
+            algorithm: hasher.hexdigest() for algorithm, hasher in self.hashers.items()
+        }
+
+
+class ChecksumCache(object):
+    """
+    Checksums of files keyed by (device, inode, size, mtime, ctime), so the
+    same unmodified file is hashed only once within a run.
+    The cache is in memory and, if fname is given, also persisted as json
+    lines, each store() appending one line instead of rewriting the file.
+    """
+
+    def __init__(self, fname=None):
+        self.fname = fname
+        self.lock = threading.Lock()
+        self.entries = {}
+        if fname and os.path.exists(fname):
+            with open(fname, "r") as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn last line of an interrupted run
+                        continue
+                    self.entries.setdefault(record["id"], {}).update(record["digests"])
+
+    @staticmethod
+    def file_id(fname):
+        st = os.stat(fname)
+        return "%s:%s:%s:%s:%s" % (
+            st.st_dev,
+            st.st_ino,
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_ctime_ns,
+        )
+
+    def get(self, fname, algorithms):
+        """
+        Returns the cached checksums of fname if all algorithms are cached
+        """
+        entry = self.entries.get(self.file_id(fname), {})
+        if all(algorithm in entry for algorithm in algorithms):
+            return {algorithm: entry[algorithm] for algorithm in algorithms}
+
+    def store(self, fname, digests):
+        """
+        Adds the checksums of fname, ex: {"md5": "..."}
+        """
+        with self.lock:
+            file_id = self.file_id(fname)
+            self.entries.setdefault(file_id, {}).update(digests)
+            if self.fname:
+                with open(self.fname, "a") as fp:
+                    fp.write(json.dumps({"id": file_id, "digests": digests}) + "\n")
+
+
+cache = ChecksumCache()
+# default file of the on-disk cache, see enable_disk_cache()
+DISK_CACHE_FNAME = os.path.expanduser("~/.rgw_checksum_cache.jsonl")
+
+
+def enable_disk_cache(fname=DISK_CACHE_FNAME):
+    """
+    Persists the checksum cache to fname, keeping what is already cached
+
+    Parameters:
+        fname(char): json lines file for the cache
+    """
+    global cache
+    entries = cache.entries
+    cache = ChecksumCache(fname)
+    cache.entries.update(entries)
+
+
+def read_chunks(fname, chunk_size=CHUNK_SIZE):
+    """
+    Yields the content of fname in chunks, through mmap for non empty files
+
+    Parameters:
+        fname(char): file to read
+        chunk_size(int): size of each chunk in bytes
+    """
+    with open(fname, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for offset in range(0, len(buf), chunk_size):
+                yield buf[offset : offset + chunk_size]
+
+
+def file_checksums(fname, algorithms=("md5",), use_cache=True):
+    """
+    Computes the checksums of a file in a single chunked pass
+
+    Parameters:
+        fname(char): file to hash
+        algorithms(tuple): ex: ("md5", "sha256", "crc32c")
+        use_cache(bool): reuse checksums of an unmodified file
+
+    Returns:
+        dict of algorithm and hex digest
+    """
+    if use_cache:
+        digests = cache.get(fname, algorithms)
+        if digests:
+            log.info(f"checksums of {fname} found in cache")
+            return digests
+    hasher = MultiHasher(algorithms)
+    for chunk in read_chunks(fname):
+        hasher.update(chunk)
+    digests = hasher.hexdigests()
+    if use_cache:
+        cache.store(fname, digests)
+    return digests
+
+
+def multipart_etag(fname, part_size):
+    """
+    Computes the S3 ETag of a multipart upload of fname, md5 of the part
+    md5s with the number of parts as suffix, ex: 9b2cf535f27731c974343645a3985328-3
+
+    Parameters:
+        fname(char): file uploaded
+        part_size(int): part size in bytes
+    """
+    part_md5s = []
+    part_hasher, part_len = hashlib.md5(), 0
+    for chunk in read_chunks(fname, min(part_size, CHUNK_SIZE)):
+        while len(chunk):
+            take = chunk[: part_size - part_len]
+            part_hasher.update(take)
+            part_len += len(take)
+            chunk = chunk[len(take) :]
+            if part_len == part_size:
+                part_md5s.append(part_hasher.digest())
+                part_hasher, part_len = hashlib.md5(), 0
+    if part_len or not part_md5s:
+        part_md5s.append(part_hasher.digest())
+    return "%s-%s" % (hashlib.md5(b"".join(part_md5s)).hexdigest(), len(part_md5s))
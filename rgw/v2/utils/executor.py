@@ -0,0 +1,210 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger()
+
+DEFAULT_WORKERS = 8
+
+
+def command_name(cmd):
+    """
+    Returns the name under which the latency of cmd is recorded,
+    ex: 'radosgw-admin bucket' for 'sudo radosgw-admin bucket stats --bucket=b1'
+    """
+    words = [
+        w
+        for w in cmd.split()
+        if w != "sudo" and not w.startswith("-") and "/" not in w and "=" not in w
+    ]
+    return " ".join(words[:2])
+
+
+class CommandStats(object):
+    """
+    Per-command latency of the commands executed in this run.
+    The functions in this class are
+    1. record(): add one execution
+    2. summary(): count, failures, total, avg and max seconds per command
+    3. log_summary(): log the summary, slowest commands first
+    4. dump(): write the summary as json
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.failures = {}
+
+    def record(self, cmd, duration, ok=True):
+        name = command_name(cmd)
+        with self.lock:
+            self.latencies.setdefault(name, []).append(duration)
+            if not ok:
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            return {
+                name: {
+                    "count": len(durations),
+                    "failures": self.failures.get(name, 0),
+                    "total": round(sum(durations), 3),
+                    "avg": round(sum(durations) / len(durations), 3),
+                    "max": round(max(durations), 3),
+                }
+                for name, durations in self.latencies.items()
+            }
+
+    def log_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        log.info("command latency summary (seconds):")
+        for name, s in sorted(summary.items(), key=lambda x: -x[1]["total"]):
+            log.info(
+                f"{name}: count={s['count']} failures={s['failures']} total={s['total']} avg={s['avg']} max={s['max']}"
+            )
+
+    def dump(self, fname):
+        with open(fname, "w") as fp:
+            json.dump(self.summary(), fp, indent=4)
+
+
+stats = CommandStats()
+atexit.register(stats.log_summary)
+
+
+def run(cmd):
+    """
+    Runs a shell command and records its latency
+
+    Parameters:
+        cmd(char): command to execute
+
+    Returns:
+        (returncode, stdout, stderr)
+    """
+    start = time.perf_counter()
+    pr = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        shell=True,
+    )
+    out, err = pr.communicate()
+    stats.record(cmd, time.perf_counter() - start, pr.returncode == 0)
+    return pr.returncode, out, err
+
+
+def run_batch(cmds, workers=DEFAULT_WORKERS):
+    """
+    Runs independent shell commands concurrently with a bounded pool
+
+    Parameters:
+        cmds(list): commands to execute
+        workers(int): max commands running at a time
+
+    Returns:
+        list of (returncode, stdout, stderr), in the order of cmds
+    """
+    log.info(f"executing {len(cmds)} cmds with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, cmds))
+
+
+def stream_lines(cmd):
+    """
+    Runs a shell command and yields its stdout line by line as it is
+    produced, without buffering the whole output
+
+    Parameters:
+        cmd(char): command to execute
+
+    Returns:
+        generator of lines, raises CalledProcessError if the command fails
+    """
+    log.info(f"streaming output of cmd: {cmd}")
+    start = time.perf_counter()
+    # stderr goes to a file, a full stderr pipe would block the command
+    with tempfile.TemporaryFile(mode="w+") as err_fp:
+        pr = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=err_fp,
+            universal_newlines=True,
+            shell=True,
+        )
+        try:
+            for line in pr.stdout:
+                yield line
+            pr.wait()
+        finally:
+            if pr.poll() is None:
+                pr.kill()
+                pr.wait()
+            pr.stdout.close()
+            stats.record(cmd, time.perf_counter() - start, pr.returncode == 0)
+        if pr.returncode != 0:
+            err_fp.seek(0)
+            raise subprocess.CalledProcessError(
+                pr.returncode, cmd, stderr=err_fp.read()
+            )
+
+
+def remove_path(path):
+    """
+    Removes files or directories, path can be a glob pattern, ex: /mnt/*.
+    Uses native calls and falls back to 'sudo rm -rf' on permission errors.
+    Returns False if the path could not be removed.
+
+    Parameters:
+        path(char): path to remove
+    """
+    start = time.perf_counter()
+    try:
+        for each_path in glob.glob(path) if glob.has_magic(path) else [path]:
+            if os.path.isdir(each_path) and not os.path.islink(each_path):
+                shutil.rmtree(each_path)
+            elif os.path.lexists(each_path):
+                os.unlink(each_path)
+    except PermissionError:
+        log.info(f"no permission to remove {path}, using sudo")
+        return run(f"sudo rm -rf {path}")[0] == 0
+    except OSError as e:
+        log.error(f"unable to remove {path}: {e}")
+        stats.record("remove_path", time.perf_counter() - start, False)
+        return False
+    stats.record("remove_path", time.perf_counter() - start)
+    return True
+
+
+def make_dirs(path):
+    """
+    Creates a directory and its parents.
+    Uses native calls and falls back to 'sudo mkdir -p' on permission errors.
+    Returns False if the directory could not be created.
+
+    Parameters:
+        path(char): directory to create
+    """
+    start = time.perf_counter()
+    try:
+        os.makedirs(path, exist_ok=True)
+    except PermissionError:
+        log.info(f"no permission to create {path}, using sudo")
+        return run(f"sudo mkdir -p {path}")[0] == 0
+    except OSError as e:
+        log.error(f"unable to create {path}: {e}")
+        stats.record("make_dirs", time.perf_counter() - start, False)
+        return False
+    stats.record("make_dirs", time.perf_counter() - start)
+    return True
@@ -0,0 +1,79 @@
+import json
+import logging
+import math
+import os
+import threading
+
+log = logging.getLogger()
+
+
+def percentile(sorted_values, p):
+    """
+    Returns the p-th percentile (nearest rank) of already sorted values
+
+    Parameters:
+        sorted_values(list): values in ascending order
+        p(float): percentile, 0 to 100
+    """
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values):
+    """
+    Returns count, min, max, avg, p50, p95 and p99 of latencies in seconds
+    """
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min": round(values[0], 6),
+        "max": round(values[-1], 6),
+        "avg": round(sum(values) / len(values), 6),
+        "p50": round(percentile(values, 50), 6),
+        "p95": round(percentile(values, 95), 6),
+        "p99": round(percentile(values, 99), 6),
+    }
+
+
+def write_results(results, fname):
+    """
+    Appends benchmark results to a json file, to compare runs across builds
+
+    Parameters:
+        results(list): results of the benchmark
+        fname(char): json file, created if missing
+    """
+    existing = []
+    if os.path.exists(fname):
+        with open(fname, "r") as fp:
+            existing = json.load(fp)
+    with open(fname, "w") as fp:
+        json.dump(existing + results, fp, indent=4)
+    log.info(f"{len(results)} benchmark results written to {fname}")
+
+
+class LatencyRecorder(object):
+    """
+    Thread safe collection of latencies per operation.
+    The functions in this class are
+    1. record(): add the latency of one operation
+    2. summary(): summarize() of every operation
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+
+    def record(self, name, duration):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(duration)
+
+    def summary(self):
+        with self.lock:
+            return {
+                name: summarize(durations) for name, durations in self.latencies.items()
+            }
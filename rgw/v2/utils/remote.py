@@ -0,0 +1,271 @@
+import atexit
+import logging
+import select
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+from v2.utils import executor
+from v2.utils.executor import DEFAULT_WORKERS, stats
+
+log = logging.getLogger()
+
+SSH_USER = "root"
+SSH_PASSWORD = "passwd"
+CONNECT_TIMEOUT = 10
+KEEPALIVE_SECS = 30
+RECV_BYTES = 32768
+
+
+class RemoteHost(object):
+    """
+    Pooled ssh connection to a host, each command runs on its own channel of
+    the same transport, so concurrent commands share one connection.
+    The functions in this class are
+    1. run(): run a command and return its exit code and output
+    2. stream_lines(): yield the stdout of a command line by line
+    3. get(), put(): copy files over sftp
+    exec_command() and open_sftp() of paramiko.SSHClient are available as well
+    """
+
+    def __init__(self, host, user=SSH_USER, password=SSH_PASSWORD):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.lock = threading.Lock()
+        self.client = None
+        self.connect()
+
+    def connect(self):
+        log.info(f"connecting to {self.user}@{self.host}")
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            self.host,
+            port=22,
+            username=self.user,
+            password=self.password,
+            timeout=CONNECT_TIMEOUT,
+            banner_timeout=CONNECT_TIMEOUT,
+        )
+        client.get_transport().set_keepalive(KEEPALIVE_SECS)
+        self.client = client
+
+    def transport(self):
+        """
+        Returns the transport of the connection, reconnecting if it dropped
+        """
+        with self.lock:
+            transport = self.client.get_transport()
+            if transport is None or not transport.is_active():
+                log.info(f"connection to {self.host} dropped, reconnecting")
+                self.client.close()
+                self.connect()
+                transport = self.client.get_transport()
+            return transport
+
+    def __getattr__(self, name):
+        # exec_command, open_sftp, ... of the underlying paramiko client
+        if name == "client" or name.startswith("__"):
+            raise AttributeError(name)
+        self.transport()
+        return getattr(self.client, name)
+
+    def run(self, cmd, timeout=None):
+        """
+        Runs a command on the host and records its latency
+
+        Parameters:
+            cmd(char): command to execute
+            timeout(int): seconds after which the command is abandoned
+
+        Returns:
+            (returncode, stdout, stderr)
+        """
+        start = time.perf_counter()
+        chan = self.transport().open_session()
+        try:
+            chan.exec_command(cmd)
+            out, err = [], []
+            # read stdout and stderr as they come, a full stderr window would
+            # otherwise block the command
+            while True:
+                select.select([chan], [], [], 1)
+                while chan.recv_ready():
+                    out.append(chan.recv(RECV_BYTES))
+                while chan.recv_stderr_ready():
+                    err.append(chan.recv_stderr(RECV_BYTES))
+                if (
+                    chan.exit_status_ready()
+                    and not chan.recv_ready()
+                    and not chan.recv_stderr_ready()
+                ):
+                    break
+                if timeout and time.perf_counter() - start > timeout:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+            returncode = chan.recv_exit_status()
+        finally:
+            chan.close()
+        stats.record(cmd, time.perf_counter() - start, returncode == 0)
+        return (
+            returncode,
+            b"".join(out).decode(errors="replace"),
+            b"".join(err).decode(errors="replace"),
+        )
+
+    def stream_lines(self, cmd):
+        """
+        Runs a command on the host and yields its stdout line by line as it is
+        produced, without buffering the whole output
+
+        Returns:
+            generator of lines, raises CalledProcessError if the command fails
+        """
+        log.info(f"streaming output of cmd on {self.host}: {cmd}")
+        start = time.perf_counter()
+        chan = self.transport().open_session()
+        returncode = None
+        err = []
+        try:
+            chan.exec_command(cmd)
+            partial = b""
+            # stderr is drained along with stdout, a full stderr window would
+            # otherwise block the command
+            while True:
+                select.select([chan], [], [], 1)
+                while chan.recv_stderr_ready():
+                    err.append(chan.recv_stderr(RECV_BYTES))
+                if chan.recv_ready():
+                    *lines, partial = (partial + chan.recv(RECV_BYTES)).split(b"\n")
+                    for line in lines:
+                        yield line.decode(errors="replace") + "\n"
+                elif chan.exit_status_ready() and not chan.recv_stderr_ready():
+                    break
+            if partial:
+                yield partial.decode(errors="replace")
+            returncode = chan.recv_exit_status()
+        finally:
+            chan.close()
+            stats.record(cmd, time.perf_counter() - start, returncode == 0)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(
+                returncode, cmd, stderr=b"".join(err).decode(errors="replace")
+            )
+
+    def get(self, remote_path, local_path):
+        """
+        Copies a file of the host to local_path
+        """
+        sftp = self.open_sftp()
+        try:
+            sftp.get(remote_path, local_path)
+        finally:
+            sftp.close()
+
+    def put(self, local_path, remote_path):
+        """
+        Copies local_path to the host
+        """
+        sftp = self.open_sftp()
+        try:
+            sftp.put(local_path, remote_path)
+        finally:
+            sftp.close()
+
+    def close(self):
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+
+
+class SSHPool(object):
+    """
+    One pooled connection per host and user, reused by every caller.
+    The functions in this class are
+    1. get(): connection to a host, opened on first use
+    2. close_all(): close every connection
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def get(self, host, user=SSH_USER, password=SSH_PASSWORD):
+        key = (host, user)
+        with self.lock:
+            if key in self.hosts:
+                return self.hosts[key]
+        # connect out of the lock, not to serialize connecting to many hosts
+        remote_host = RemoteHost(host, user, password)
+        with self.lock:
+            pooled = self.hosts.setdefault(key, remote_host)
+        if pooled is not remote_host:
+            remote_host.close()
+        return pooled
+
+    def close_all(self):
+        with self.lock:
+            hosts, self.hosts = self.hosts, {}
+        for remote_host in hosts.values():
+            remote_host.close()
+
+
+pool = SSHPool()
+atexit.register(pool.close_all)
+
+
+def connect(host, user=SSH_USER, password=SSH_PASSWORD):
+    """
+    Returns the pooled connection to the host
+    """
+    return pool.get(host, user, password)
+
+
+def run(ssh_con, cmd):
+    """
+    Runs a command on the host of ssh_con, locally if ssh_con is None
+
+    Returns:
+        (returncode, stdout, stderr)
+    """
+    if ssh_con is None:
+        return executor.run(cmd)
+    return ssh_con.run(cmd)
+
+
+def fan_out(hosts, cmd, workers=DEFAULT_WORKERS):
+    """
+    Runs the same command on every host concurrently
+
+    Parameters:
+        hosts(list): host names, or RemoteHost connections, the command runs
+            locally on the local host
+        cmd(char): command to execute
+        workers(int): max hosts running the command at a time
+
+    Returns:
+        {host: (returncode, stdout, stderr)}, (-1, "", error) for the hosts
+        which could not be reached
+    """
+
+    local_names = {socket.gethostname(), socket.gethostname().split(".")[0]}
+
+    def run_on(host):
+        if host in local_names:
+            return executor.run(cmd)
+        try:
+            remote_host = host if isinstance(host, RemoteHost) else connect(host)
+            return remote_host.run(cmd)
+        except Exception as e:
+            log.error(f"{cmd} failed on {host}: {e}")
+            return -1, "", str(e)
+
+    if not hosts:
+        return {}
+    log.info(f"executing on {len(hosts)} hosts: {cmd}")
+    with ThreadPoolExecutor(max_workers=min(workers, len(hosts))) as pool_executor:
+        results = list(pool_executor.map(run_on, hosts))
+    return {getattr(h, "host", h): result for h, result in zip(hosts, results)}
@@ -1,21 +1,23 @@
 import configparser
-import datetime
-import hashlib
 import json
 import logging
 import os
 import random
 import shutil
 import socket
+import ssl
 import string
 import subprocess
 import time
+import urllib.error
+import urllib.request
 from random import randint
 from re import S
 
-import paramiko
 import yaml
 from v2.lib.exceptions import SyncFailedError
+from v2.utils import checksum, executor, remote
+from v2.utils.executor import make_dirs, remove_path, stream_lines
 
 BUCKET_NAME_PREFIX = "bucky" + "-" + str(random.randrange(1, 5000))
 S3_OBJECT_NAME_PREFIX = "key"
@@ -25,15 +27,9 @@ log = logging.getLogger()
 def exec_shell_cmd(cmd, debug_info=False):
     try:
         log.info("executing cmd: %s" % cmd)
-        pr = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            shell=True,
-        )
-        out, err = pr.communicate()
-        if pr.returncode == 0:
+        returncode, out, err = executor.run(cmd)
+        invalidate_facts_changed_by(cmd)
+        if returncode == 0:
             log.info("cmd excuted")
             if out is not None:
                 log.info(out)
@@ -43,7 +39,7 @@ def exec_shell_cmd(cmd, debug_info=False):
                 else:
                     return out
         else:
-            raise Exception("error: %s \nreturncode: %s" % (err, pr.returncode))
+            raise Exception("error: %s \nreturncode: %s" % (err, returncode))
     except Exception as e:
         log.error("cmd execution failed")
         log.error(e)
@@ -51,32 +47,57 @@ def exec_shell_cmd(cmd, debug_info=False):
         return False
 
 
+def exec_shell_cmds(cmds, workers=executor.DEFAULT_WORKERS):
+    """
+    Executes independent commands concurrently
+
+    Parameters:
+        cmds(list): commands to execute
+        workers(int): max commands running at a time
+
+    Returns:
+        list with the output of each command, False for the failed ones
+    """
+    results = []
+    for cmd, (returncode, out, err) in zip(
+        cmds, executor.run_batch(cmds, workers=workers)
+    ):
+        invalidate_facts_changed_by(cmd)
+        if returncode == 0:
+            results.append(out)
+        else:
+            log.error("cmd execution failed: %s\nerror: %s" % (cmd, err))
+            results.append(False)
+    return results
+
+
 def connect_remote(rgw_host, user_nm="root", passw="passwd"):
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(rgw_host, port=22, username=user_nm, password=passw, timeout=3)
-    if ssh is None:
-        raise Exception("Connection with remote machine failed")
-    else:
-        return ssh
+    """
+    Returns the pooled ssh connection to the host, see remote.RemoteHost
+    """
+    try:
+        return remote.connect(rgw_host, user_nm, passw)
+    except Exception as e:
+        raise Exception(f"Connection with remote machine failed: {e}")
 
 
 def remote_exec_shell_cmd(ssh, cmd):
     try:
         log.info("executing cmd on remote node: %s" % cmd)
-        stdin, stdout, stderr = ssh.exec_command(cmd)
-        cmd_output = stdout.read()
-        cmd_error = stderr.read().decode()
-        print(cmd_output)
-        if len(cmd_error) == 0:
-            return True
-        else:
-            return False
+        # output logged line by line as it comes, not buffered as a whole
+        for line in ssh.stream_lines(cmd):
+            log.info(line.rstrip("\n"))
+        return True
+    except subprocess.CalledProcessError as e:
+        log.error("error: %s \nreturncode: %s" % (e.stderr, e.returncode))
+        return False
     except Exception as e:
         log.error("cmd execution failed on remote machine")
         log.error(e)
         get_crash_log()
         return False
+    finally:
+        invalidate_facts_changed_by(cmd)
 
 
 def get_crash_log():
@@ -95,8 +116,7 @@ def get_crash_log():
 
 def get_md5(fname):
     log.info("fname: %s" % fname)
-    return hashlib.md5(open(fname, "rb").read()).hexdigest()
-    # return "@424242"
+    return checksum.file_checksums(fname)["md5"]
 
 
 def get_file_size(min, max):
@@ -170,9 +190,7 @@ class FileOps(object):
                     destination = "/etc/ceph/ceph.conf"
                     data.write(fp)
                     fp.close()
-                    sftp_client = ssh_con.open_sftp()
-                    sftp_client.put(self.fname, destination)
-                    sftp_client.close()
+                    ssh_con.put(self.fname, destination)
                 else:
                     data.write(fp)
             elif self.type is None:
@@ -188,9 +206,7 @@ class ConfigParse(object):
         self.cfg = configparser.ConfigParser()
         if ssh_con is not None:
             tmp_file = fname + ".rgw.tmp"
-            sftp_client = ssh_con.open_sftp()
-            fname = sftp_client.get(fname, tmp_file)
-            sftp_client.close()
+            ssh_con.get(fname, tmp_file)
             self.cfg.read(tmp_file)
             self.fname = tmp_file
         else:
@@ -228,10 +244,21 @@ def make_copy_of_file(f1, f2):
 
 
 def get_cluster_fsid():
+    return cluster_facts.get("fsid", _get_cluster_fsid)
+
+
+def _get_cluster_fsid():
     cluster_fsid = exec_shell_cmd("sudo ceph config get mon fsid")
     return cluster_fsid.rstrip("\n")
 
 
+# seconds for the rgw daemons to serve requests after a restart
+RGW_READY_TIMEOUT = 300
+# seconds after a restart before rgw is taken as ready, when the daemon state
+# is unknown and the endpoint was not seen going down
+RGW_MIN_RESTART_WAIT = 10
+
+
 class CephOrch:
     """
     class for constructing ceph orch command
@@ -283,6 +310,25 @@ class SystemCTL:
         """
         return f"sudo systemctl {option} {self.unit}"
 
+    def daemons(self, run):
+        """
+        Returns {unit: (running, start marker)} of the service
+
+        Args:
+            run: function returning the output of a command
+        """
+        out = run(
+            "sudo systemctl show -p ActiveState -p ActiveEnterTimestampMonotonic "
+            f"{self.unit}"
+        )
+        props = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+        return {
+            self.unit: (
+                props.get("ActiveState") == "active",
+                props.get("ActiveEnterTimestampMonotonic"),
+            )
+        }
+
 
 class CephOrchRGWSrv:
     """
@@ -317,6 +363,23 @@ class CephOrchRGWSrv:
         cmd = self.ceph_orch.cmd([option, self.unit])
         return cmd
 
+    def daemons(self, run):
+        """
+        Returns {daemon: (running, start marker)} of the daemons of the service
+
+        Args:
+            run: function returning the output of a command
+        """
+        options = ["ps", "--service_name", self.unit, "--refresh", "-f", "json"]
+        out = run(self.ceph_orch.cmd(options))
+        return {
+            d.get("daemon_name", f"{d.get('daemon_type')}.{d.get('daemon_id')}"): (
+                d.get("status_desc") == "running",
+                d.get("started"),
+            )
+            for d in json.loads(out)
+        }
+
 
 class RGWService:
     """
@@ -331,17 +394,132 @@ class RGWService:
         else:
             log.info("using ceph orch")
             self.srv = CephOrchRGWSrv()
+        # seconds from the last restart(wait_ready=True) to the service ready
+        self.ready_time = None
 
-    def restart(self, ssh_con=None):
+    def restart(self, ssh_con=None, wait_ready=False, timeout=RGW_READY_TIMEOUT):
         """
         restarts the service
+
+        Parameters:
+            ssh_con: ssh connection to the rgw node, None for the local node
+            wait_ready(bool): wait until the daemons restarted and the endpoint
+                serves requests, instead of returning once the restart is accepted
+            timeout(int): seconds to wait at most for the service to be ready
+
+        Returns:
+            False if the restart failed or the service was not ready in time
         """
         log.info("restarting service")
         cmd = self.srv.cmd("restart")
+        if wait_ready:
+            before = self.daemons(ssh_con)
+        started = time.time()
+        cluster_facts.invalidate(*RGW_CONFIG_FACTS)
         if ssh_con is not None:
-            return remote_exec_shell_cmd(ssh_con, cmd)
+            restarted = remote_exec_shell_cmd(ssh_con, cmd)
         else:
-            return exec_shell_cmd(cmd)
+            restarted = exec_shell_cmd(cmd)
+        if not wait_ready or restarted is False:
+            return restarted
+        if not self.wait_ready(ssh_con, before, started, timeout):
+            return False
+        return restarted
+
+    def _output(self, ssh_con, cmd):
+        """
+        Returns the output of a probe command, not logged as it runs on every poll
+        """
+        returncode, out, err = remote.run(ssh_con, cmd)
+        if returncode != 0:
+            raise Exception(f"{cmd} failed: {err}")
+        return out
+
+    def daemons(self, ssh_con=None):
+        """
+        Returns {daemon: (running, start marker)} of the rgw daemons, an empty
+        dict if the state is not available
+        """
+        try:
+            return self.srv.daemons(lambda cmd: self._output(ssh_con, cmd))
+        except Exception as e:
+            log.info(f"rgw daemons state not available: {e}")
+            return {}
+
+    def is_serving(self, ssh_con=None):
+        """
+        Returns True if the endpoint answers an anonymous GET / with 200 or 403
+        """
+        try:
+            _, ip = get_hostname_ip(ssh_con)
+            port = get_radosgw_port_no(ssh_con)
+            proto = "https" if is_rgw_secure() else "http"
+            context = ssl._create_unverified_context() if proto == "https" else None
+            with urllib.request.urlopen(
+                f"{proto}://{ip}:{port}/", timeout=5, context=context
+            ) as resp:
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception as e:
+            log.info(f"rgw endpoint not serving yet: {e}")
+            return False
+        log.info(f"rgw endpoint answered {status}")
+        return status in (200, 403)
+
+    def wait_ready(self, ssh_con=None, before=None, started=None, timeout=None):
+        """
+        Waits until the rgw daemons restarted and the endpoint serves requests
+
+        Parameters:
+            ssh_con: ssh connection to the rgw node, None for the local node
+            before(dict): daemons() state before the restart, a daemon is restarted
+                once its start marker changed
+            started(float): time of the restart, for the restart to ready time
+            timeout(int): seconds to wait at most
+
+        Returns:
+            True if ready in time
+        """
+        before = before or {}
+        started = started or time.time()
+        went_down = False
+
+        def daemons_restarted():
+            daemons = self.daemons(ssh_con)
+            if not before or not daemons:
+                # nothing to compare, the old daemon may still be serving
+                return None
+            pending = [
+                name
+                for name, (running, marker) in daemons.items()
+                if not running or (name in before and before[name][1] == marker)
+            ]
+            if pending:
+                log.info(f"rgw daemons not restarted yet: {pending}")
+            return not pending
+
+        def ready():
+            nonlocal went_down
+            restarted = daemons_restarted()
+            if restarted is False:
+                return False
+            serving = self.is_serving(ssh_con)
+            if restarted is None:
+                if not serving:
+                    went_down = True
+                    return False
+                if not went_down and time.time() - started < RGW_MIN_RESTART_WAIT:
+                    log.info("rgw daemon state unknown, waiting for the restart")
+                    return False
+            return serving
+
+        if not poll(ready, timeout or RGW_READY_TIMEOUT, delay=1, max_delay=8):
+            log.error(f"rgw not ready {time.time() - started:.1f} secs after restart")
+            return False
+        self.ready_time = time.time() - started
+        log.info(f"rgw ready {self.ready_time:.1f} secs after restart")
+        return True
 
     def stop(self, ssh_con=None):
         """
@@ -349,6 +527,7 @@ class RGWService:
         """
         log.info("stopping service")
         cmd = self.srv.cmd("stop")
+        cluster_facts.invalidate(*RGW_CONFIG_FACTS)
         if ssh_con is not None:
             return remote_exec_shell_cmd(ssh_con, cmd)
         else:
@@ -360,6 +539,7 @@ class RGWService:
         """
         log.info("starting service")
         cmd = self.srv.cmd("start")
+        cluster_facts.invalidate(*RGW_CONFIG_FACTS)
         if ssh_con is not None:
             return remote_exec_shell_cmd(ssh_con, cmd)
         else:
@@ -377,8 +557,94 @@ class RGWService:
             return exec_shell_cmd(cmd)
 
 
+# cluster facts derived from the rgw config, changed by restarts and config sets
+RGW_CONFIG_FACTS = ("rgw_frontends", "radosgw_port", "rgw_ssl")
+CLUSTER_FACTS_TTL = 600
+# cluster facts changed by commands, the multisite role by period and zone
+# changes, the ceph version by upgrades
+FACTS_CHANGED_BY = {
+    "period update": ("multisite_role",),
+    "period pull": ("multisite_role",),
+    "realm pull": ("multisite_role",),
+    "zone create": ("multisite_role",),
+    "zone delete": ("multisite_role",),
+    "zone modify": ("multisite_role",),
+    "zonegroup create": ("multisite_role",),
+    "zonegroup delete": ("multisite_role",),
+    "zonegroup modify": ("multisite_role",),
+    "orch upgrade": ("ceph_version",),
+    "yum update": ("ceph_version",),
+    "yum upgrade": ("ceph_version",),
+    "dnf update": ("ceph_version",),
+    "dnf upgrade": ("ceph_version",),
+}
+
+
+class ClusterFacts(object):
+    """
+    TTL cache of cluster facts: ceph version, rgw frontends, port, ssl,
+    multisite role and fsid, so that they are not recomputed by forking
+    ceph/radosgw-admin on every call.
+    The functions in this class are
+    1. get(): cached value of a fact, computed if missing or expired
+    2. invalidate(): drop some or all facts
+    """
+
+    def __init__(self, ttl=CLUSTER_FACTS_TTL):
+        self.ttl = ttl
+        self.facts = {}
+
+    def get(self, name, compute):
+        """
+        Returns the cached value of the fact, calling compute() if missing or expired
+
+        Parameters:
+            name(char): name of the fact
+            compute: function returning the value of the fact
+        """
+        value, expires = self.facts.get(name, (None, 0))
+        if time.time() < expires:
+            return value
+        value = compute()
+        if value is not None:
+            self.facts[name] = (value, time.time() + self.ttl)
+        return value
+
+    def invalidate(self, *names):
+        """
+        Drops the given facts, all facts if no name is given
+        """
+        log.info("invalidating cluster facts: %s" % (list(names) or "all"))
+        if not names:
+            self.facts.clear()
+        for name in names:
+            self.facts.pop(name, None)
+
+
+cluster_facts = ClusterFacts()
+
+
+def invalidate_facts_changed_by(cmd):
+    """
+    Drops the cached cluster facts the command may have changed, ex: the
+    multisite role after 'radosgw-admin period update --commit'
+    """
+    names = {
+        name
+        for marker, facts in FACTS_CHANGED_BY.items()
+        if marker in cmd
+        for name in facts
+    }
+    if names:
+        cluster_facts.invalidate(*sorted(names))
+
+
 def get_rgw_frontends():
     """Retrieve RGW's frontend configuration."""
+    return cluster_facts.get("rgw_frontends", _get_rgw_frontends)
+
+
+def _get_rgw_frontends():
     try:
         out = exec_shell_cmd("sudo ceph config dump --format json")
         configs = json.loads(out)
@@ -398,6 +664,12 @@ def get_radosgw_port_no(ssh_con=None):
         - Using `ceph config dump`. (Supported from 5.0)
         - Using netstat
     """
+    if ssh_con is not None:
+        return _get_radosgw_port_no(ssh_con)
+    return cluster_facts.get("radosgw_port", _get_radosgw_port_no)
+
+
+def _get_radosgw_port_no(ssh_con=None):
     frontend_values = get_rgw_frontends()
     if frontend_values:
         configs = frontend_values.split()
@@ -405,10 +677,8 @@ def get_radosgw_port_no(ssh_con=None):
             if "port" in config:
                 return config.split("=")[-1]
     if ssh_con is not None:
-        stdin, stdout, stderr = ssh_con.exec_command(
-            "sudo netstat -nltp | grep radosgw"
-        )
-        op = stdout.readline().strip()
+        out = ssh_con.run("sudo netstat -nltp | grep radosgw")[1]
+        op = out.partition("\n")[0].strip()
     else:
         op = exec_shell_cmd("sudo netstat -nltp | grep radosgw")
     log.info(f"output: {op}")
@@ -425,6 +695,10 @@ def get_radosgw_port_no(ssh_con=None):
 
 def is_rgw_secure():
     """Check if RGW endpoint is secure."""
+    return cluster_facts.get("rgw_ssl", _is_rgw_secure)
+
+
+def _is_rgw_secure():
     frontend_values = get_rgw_frontends()
     if frontend_values:
         configs = frontend_values.split()
@@ -613,6 +887,29 @@ def get_realm_source_zone_info():
     return realm, source_zone
 
 
+def poll(check, timeout, delay=5, max_delay=60):
+    """
+    Calls check() with exponential backoff until it returns True or timeout
+
+    Parameters:
+        check: function returning True when done
+        timeout(int): seconds to wait at most
+        delay(int): first interval, doubled after every poll up to max_delay
+
+    Returns:
+        True if check() returned True in time
+    """
+    end_time = time.time() + timeout
+    while True:
+        if check():
+            return True
+        if time.time() + delay > end_time:
+            return False
+        log.info(f"sleep of {delay} secs before the next poll")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
 def check_bucket_sync(name):
     _, source_zone = get_realm_source_zone_info()
     log.info(f"Source zone name: {source_zone}")
@@ -622,22 +919,16 @@ def check_bucket_sync(name):
 
 
 def wait_till_bucket_synced(name, timeout=120, interval=5):
-    """Wait until the bucket reports synchronized."""
-    cmd = f"radosgw-admin bucket sync status --bucket {name}"
-    end_time = datetime.datetime.now() + datetime.timedelta(seconds=timeout)
-    while end_time > datetime.datetime.now():
-        time.sleep(interval)
-        result = exec_shell_cmd(cmd)
-        if not "behind shards" in result:
-            return True
-    return False
+    """Wait until the bucket reports synchronized, polling with backoff."""
+    from v2.lib.sync_status import wait_till_buckets_synced
+
+    return wait_till_buckets_synced([name], timeout, delay=interval)[name]
 
 
 def get_hostname_ip(ssh_con=None):
     try:
         if ssh_con is not None:
-            stdin, stdout, stderr = ssh_con.exec_command("hostname")
-            hostname = stdout.readline().strip()
+            hostname = ssh_con.run("hostname")[1].strip()
             ip = socket.gethostbyname(str(hostname))
         else:
             hostname = socket.gethostname()
@@ -658,6 +949,10 @@ def get_ceph_version():
     """
     get the current ceph version
     """
+    return cluster_facts.get("ceph_version", _get_ceph_version)
+
+
+def _get_ceph_version():
     log.info("get ceph version")
     ceph_version = exec_shell_cmd("sudo ceph version")
     version_id, version_name = ceph_version.split()[2], ceph_version.split()[4]
@@ -691,13 +986,33 @@ def check_dbr_support():
         return False
 
 
+def get_multisite_role():
+    """
+    returns the multisite role of the cluster from a single 'radosgw-admin sync status',
+    ex: {"primary": True, "multisite": False}
+    """
+    return cluster_facts.get("multisite_role", _get_multisite_role)
+
+
+def _get_multisite_role():
+    cmd = "sudo radosgw-admin sync status"
+    out = exec_shell_cmd(cmd)
+    if out is False:
+        return None
+    if "realm  ()" in out:
+        multisite = False
+    elif "data sync source" in out:
+        multisite = True
+    else:
+        multisite = None
+    return {"primary": "zone is master" in out, "multisite": multisite}
+
+
 def is_cluster_primary():
     # checks if the cluster is primary or not
     # if primary return True or return False if not, assume as secondary
     log.info("verify if cluster is primary or not")
-    cmd = "sudo radosgw-admin sync status"
-    out = exec_shell_cmd(cmd)
-    if "zone is master" in out:
+    if (get_multisite_role() or {}).get("primary"):
         log.info("cluster is primary")
         return True
     log.info("cluster is not primary")
@@ -710,12 +1025,11 @@ def is_cluster_multisite():
     return: True is multisite else False for single site
     """
     log.info("verify if the cluster is singlesite or multisite")
-    cmd = "sudo radosgw-admin sync status"
-    out = exec_shell_cmd(cmd)
-    if "realm  ()" in out:
+    multisite = (get_multisite_role() or {}).get("multisite")
+    if multisite is False:
         log.info("the cluster is single site")
         return False
-    elif "data sync source" in out:
+    elif multisite:
         log.info("the cluster is multisite")
         return True
     else:
@@ -723,16 +1037,61 @@ def is_cluster_multisite():
         return False
 
 
+def get_daemon_hosts(daemon_type="rgw"):
+    """
+    Returns the hosts running daemons of the type, ex: rgw or osd, from
+    ceph orch ps, None if the cluster is not managed by the orchestrator
+    """
+    return cluster_facts.get(
+        f"{daemon_type}_hosts", lambda: _get_daemon_hosts(daemon_type)
+    )
+
+
+def _get_daemon_hosts(daemon_type):
+    returncode, out, err = executor.run(
+        f"sudo ceph orch ps --daemon_type {daemon_type} -f json"
+    )
+    if returncode != 0:
+        log.info(f"unable to list the {daemon_type} hosts: {err}")
+        return None
+    return sorted({d["hostname"] for d in json.loads(out)})
+
+
+def exec_on_daemon_hosts(cmd, daemon_type="rgw"):
+    """
+    Runs the command on every host of the daemon type concurrently, over the
+    pooled ssh connections, locally if the hosts are not known
+
+    Returns:
+        {host: (returncode, stdout, stderr)}
+    """
+    hosts = get_daemon_hosts(daemon_type)
+    if not hosts:
+        return {socket.gethostname(): executor.run(cmd)}
+    return remote.fan_out(hosts, cmd)
+
+
 def disable_async_data_notifications():
     """
     This function will disable the async notification
     by setting rgw_data_notify_interval_msec=0. This will test at level 20,
     the rgw log does not show 'notifying datalog change' entries
+    The latest rgw log of every rgw host is checked
     """
-    rgw_log_path = "sudo ls -t /var/log/ceph/*/ceph-client.rgw* | head -1"
-    out = exec_shell_cmd(rgw_log_path)
-    rgw_log_file = out.rstrip("\n")
     search_string = "notifying datalog change"
-    if not (search_string in open(rgw_log_file, encoding="latin1").read()):
-        return True
-    return False
+    # without a log file grep would wait on stdin
+    cmd = (
+        "f=$(sudo ls -t /var/log/ceph/*/ceph-client.rgw* 2>/dev/null | head -1); "
+        "[ -n \"$f\" ] || { echo 'no rgw log found' >&2; exit 2; }; "
+        f"sudo grep -c '{search_string}' \"$f\""
+    )
+    found = False
+    for host, (returncode, out, err) in exec_on_daemon_hosts(cmd).items():
+        # grep exits with 1 when nothing matched
+        if returncode not in (0, 1):
+            log.error(f"unable to check the rgw log on {host}: {err}")
+            found = True
+        elif int(out.strip() or 0):
+            log.info(f"'{search_string}' found {out.strip()} times on {host}")
+            found = True
+    return not found